@@ -0,0 +1,152 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Rendering RML from asyncio
+
+The documents are rendered in an executor, so that the event loop is never
+blocked::
+
+  pdf = await z3c.rml.aio.render(rml)
+"""
+import asyncio
+import concurrent.futures
+import io
+import os
+import threading
+import weakref
+
+from lxml import etree
+
+from z3c.rml import document
+from z3c.rml import rml2pdf
+
+
+def _render(xml, removeEncodingLine, filename, maxPasses, strategy,
+            cancelled):
+    # Runs in the executor, which may be another process.
+    if isinstance(xml, str) and removeEncodingLine:
+        xml = rml2pdf._removeEncodingLine(xml)
+    doc = document.Document(etree.fromstring(xml))
+    if filename:
+        doc.filename = filename
+    doc.cancelled = cancelled
+    output = io.BytesIO()
+    doc.process(output, maxPasses=maxPasses, strategy=strategy)
+    return output.getvalue()
+
+
+async def _finish(future):
+    try:
+        await asyncio.wrap_future(future)
+    except Exception:
+        pass
+
+
+class Renderer:
+    """Renders documents in an executor.
+
+    At most ``maxConcurrency`` documents are rendered at the same time;
+    further calls wait for a free slot. If no executor is given, a thread
+    pool (or a process pool, if ``processes`` is set) of that size is
+    created and owned by the renderer.
+
+    Cancelling a rendering stops the layout of a document rendered in a
+    thread between two flowables. Process pools can only drop renderings
+    that did not start yet.
+    """
+
+    def __init__(self, maxConcurrency=None, executor=None, processes=False):
+        self.maxConcurrency = maxConcurrency or os.cpu_count() or 1
+        self._ownsExecutor = executor is None
+        if executor is None:
+            if processes:
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    self.maxConcurrency)
+            else:
+                executor = concurrent.futures.ThreadPoolExecutor(
+                    self.maxConcurrency, thread_name_prefix='z3c.rml')
+        self.executor = executor
+        self.processes = isinstance(
+            executor, concurrent.futures.ProcessPoolExecutor)
+        # Semaphores are bound to the loop they are used in.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _getSemaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self.maxConcurrency)
+        return semaphore
+
+    async def render(self, xml, removeEncodingLine=True, filename=None,
+                     maxPasses=2, strategy='passes'):
+        """Render the RML string and return the PDF as ``BytesIO``."""
+        async with self._getSemaphore():
+            cancelled = None if self.processes else threading.Event()
+            future = self.executor.submit(
+                _render, xml, removeEncodingLine, filename, maxPasses,
+                strategy, cancelled)
+            try:
+                data = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.cancel():
+                    if cancelled is not None:
+                        cancelled.set()
+                    # The slot is kept until the rendering stopped.
+                    await _finish(future)
+                raise
+        return io.BytesIO(data)
+
+    def close(self, wait=True):
+        """Shut down the executor, if it is owned by the renderer."""
+        if self._ownsExecutor:
+            self.executor.shutdown(wait)
+
+
+_defaultRenderer = None
+_defaultRendererLock = threading.Lock()
+
+
+def getDefaultRenderer():
+    """Return the renderer used by ``render()``."""
+    global _defaultRenderer
+    with _defaultRendererLock:
+        if _defaultRenderer is None:
+            _defaultRenderer = Renderer()
+        return _defaultRenderer
+
+
+def configure(maxConcurrency=None, executor=None, processes=False):
+    """Replace the renderer used by ``render()``.
+
+    The arguments are those of ``Renderer``. The executor of the previous
+    renderer is shut down once its renderings are done.
+    """
+    global _defaultRenderer
+    renderer = Renderer(maxConcurrency, executor, processes)
+    with _defaultRendererLock:
+        previous, _defaultRenderer = _defaultRenderer, renderer
+    if previous is not None:
+        previous.close(wait=False)
+    return renderer
+
+
+async def render(xml, removeEncodingLine=True, filename=None, maxPasses=2,
+                 strategy='passes'):
+    """Render the RML string using the default renderer.
+
+    This is the asynchronous version of ``rml2pdf.parseString()``.
+    """
+    return await getDefaultRenderer().render(
+        xml, removeEncodingLine, filename, maxPasses, strategy)
@@ -14,6 +14,8 @@
 """RML Attribute Implementation
 """
 import collections
+import copy
+import hashlib
 import io
 import logging
 import os
@@ -32,7 +34,9 @@ import zope.schema
 from lxml import etree
 
 from z3c.rml import SampleStyleSheet
+from z3c.rml import cache
 from z3c.rml import interfaces
+from z3c.rml import platypus
 
 
 MISSING = object()
@@ -51,18 +55,28 @@ def getFileInfo(directive):
         root.filename, directive.element.sourceline)
 
 
+MANAGER_INTERFACES = (
+    interfaces.IManager,
+    interfaces.ICanvasManager,
+    interfaces.IPostProcessorManager,
+)
+
+
+def providesManager(context, interface):
+    # Using interface.providedBy is much slower because it does many more
+    # checks
+    return interface in context.__class__.__dict__.get('__implemented__', {})
+
+
 def getManager(context, interface=None):
     if interface is None:
-        # Avoid circular imports
-        from z3c.rml import interfaces
         interface = interfaces.IManager
+    # Directives know their closest managers.
+    managers = getattr(context, 'managers', None)
+    if managers is not None and interface in managers:
+        return managers[interface]
     # Walk up the path until the manager is found
-    # Using interface.providedBy is much slower because it does many more
-    # checks
-    while (
-        context is not None and
-        interface not in context.__class__.__dict__.get('__implemented__', {})
-    ):
+    while context is not None and not providesManager(context, interface):
         context = context.parent
     # If no manager was found, raise an error
     if context is None:
@@ -70,6 +84,14 @@ def getManager(context, interface=None):
     return context
 
 
+def getXMLContent(element):
+    """Return the serialized content of the element without its own tag."""
+    # ReportLab's paragraph parser does not like attributes from other
+    # namespaces; sigh. So we have to improvize.
+    text = etree.tounicode(element, pretty_print=False)
+    return text[text.find('>') + 1:text.rfind('<')]
+
+
 def deprecated(oldName, attr, reason):
     zope.interface.directlyProvides(attr, interfaces.IDeprecated)
     attr.deprecatedName = oldName
@@ -426,24 +448,29 @@ class File(Text):
         self.doNotOpen = doNotOpen
         self.doNotModify = doNotModify
 
-    def fromUnicode(self, value):
+    def _resolvePackagePath(self, value):
+        result = self.packageExtract.match(value)
+        if result is None:
+            raise ValueError(
+                'The package-path-pair you specified was incorrect. %s' %
+                (getFileInfo(self.context))
+            )
+        modulepath, path = result.groups()
+        module = import_module(modulepath)
+        # PEP 420 namespace support means that a module can have
+        # multiple paths
+        for module_path in module.__path__:
+            value = os.path.join(module_path, path)
+            if os.path.exists(value):
+                break
+        return value
+
+    def getURL(self, value):
         # Check whether the value is of the form:
         #    [<module.path>]/rel/path/image.gif"
         if value.startswith('['):
-            result = self.packageExtract.match(value)
-            if result is None:
-                raise ValueError(
-                    'The package-path-pair you specified was incorrect. %s' %
-                    (getFileInfo(self.context))
-                )
-            modulepath, path = result.groups()
-            module = import_module(modulepath)
-            # PEP 420 namespace support means that a module can have
-            # multiple paths
-            for module_path in module.__path__:
-                value = os.path.join(module_path, path)
-                if os.path.exists(value):
-                    break
+            value = cache.packagePathCache.lookup(
+                value, lambda: self._resolvePackagePath(value))
         # In some cases ReportLab has its own mechanisms for finding a
         # file. In those cases, the filename should not be modified beyond
         # module resolution.
@@ -452,15 +479,28 @@ class File(Text):
         # Under Python 3 all platforms need a protocol for local files
         if not urllib.parse.urlparse(value).scheme:
             value = 'file:///' + os.path.abspath(value)
+        return value
+
+    def fromUnicode(self, value):
+        value = self.getURL(value)
         # If the file is not to be opened, simply return the path.
-        if self.doNotOpen:
+        if self.doNotOpen or self.doNotModify:
             return value
         # Open/Download the file
-        fileObj = reportlab.lib.utils.open_for_read(value)
-        sio = io.BytesIO(fileObj.read())
-        fileObj.close()
-        sio.seek(0)
-        return sio
+        return io.BytesIO(cache.readFile(value))
+
+
+class SVGMode(Choice):
+    """Determines how SVG images are embedded."""
+
+    def __init__(self, *args, **kw):
+        kw.setdefault('title', 'SVG Mode')
+        kw.setdefault(
+            'description',
+            'Determines how SVG images are embedded. They are either '
+            'rasterized into a bitmap or drawn as a reusable vector form.')
+        kw.setdefault('default', 'raster')
+        super().__init__(('raster', 'vector'), True, *args, **kw)
 
 
 class Image(File):
@@ -474,10 +514,9 @@ class Image(File):
     def fromUnicode(self, value):
         if value.lower().endswith('.svg') or value.lower().endswith('.svgz'):
             return self._load_svg(value)
-        fileObj = super().fromUnicode(value)
         if self.onlyOpen:
-            return fileObj
-        return reportlab.lib.utils.ImageReader(fileObj)
+            return super().fromUnicode(value)
+        return cache.getImageReader(self.getURL(value))
 
     def _load_svg(self, value):
         manager = getManager(self.context)
@@ -491,20 +530,40 @@ class Image(File):
         preserve = self.context.element.get('preserveAspectRatio')
         if preserve is not None:
             preserve = Boolean().fromUnicode(preserve)
+        vector = self.context.element.get('svgMode') == 'vector'
 
-        cache_key = f'{value}-{width}x{height}-{preserve}'
+        cache_key = f'{value}-{width}x{height}-{preserve}-{vector}'
         if cache_key in manager.svgs:
             return manager.svgs[cache_key]
 
+        url = self.getURL(value)
+        data = cache.readFile(url)
+        # The renderer resolves relative references in the SVG against its
+        # location, so the same SVG at another location is another drawing.
+        digest = hashlib.sha1(data)
+        digest.update(url.rsplit('/', 1)[0].encode())
+        digest = digest.hexdigest()
+        drawing = cache.svgCache.lookup(
+            digest, lambda: self._parse_svg(value, data))
+        width, height = self._svg_size(drawing, width, height, preserve)
+
+        if vector:
+            svg = platypus.SVGImage(drawing, 'svg-' + digest, width, height)
+        else:
+            svg = cache.imageCache.lookup(
+                ('svg', digest, width, height),
+                lambda: self._rasterize_svg(drawing, width, height))
+        manager.svgs[cache_key] = svg
+        return svg
+
+    def _parse_svg(self, value, data):
         from gzip import GzipFile
         from xml.etree import cElementTree
 
-        from reportlab.graphics import renderPM
         from svglib.svglib import SvgRenderer
 
-        fileObj = super().fromUnicode(value)
-        svg = fileObj.getvalue()
-        if svg[:2] == b'\037\213':
+        fileObj = io.BytesIO(data)
+        if data[:2] == b'\037\213':
             fileObj = GzipFile(fileobj=fileObj)
         parser = etree.XMLParser(
             remove_comments=True,
@@ -513,8 +572,9 @@ class Image(File):
         svg = cElementTree.parse(fileObj, parser=parser).getroot()
 
         renderer = SvgRenderer(value)
-        svg = renderer.render(svg)
+        return renderer.render(svg)
 
+    def _svg_size(self, svg, width, height, preserve):
         if preserve:
             if width is not None or height is not None:
                 if width is not None and height is None:
@@ -525,12 +585,17 @@ class Image(File):
                     width = svg.width * height / svg.height
                 else:
                     height = svg.height * width / svg.width
-        else:
-            if width is None:
-                width = svg.width
-            if height is None:
-                height = svg.height
+        if width is None:
+            width = svg.width
+        if height is None:
+            height = svg.height
+        return width, height
 
+    def _rasterize_svg(self, drawing, width, height):
+        from reportlab.graphics import renderPM
+
+        # The parsed drawing is shared, so only a copy is scaled.
+        svg = copy.copy(drawing)
         svg.scale(width / svg.width, height / svg.height)
         svg.width = width
         svg.height = height
@@ -540,7 +605,6 @@ class Image(File):
         # A hack to getImageReader through as an open Image when used with
         # imageAndFlowables
         svg.read = True
-        manager.svgs[cache_key] = svg
         return svg
 
 
@@ -721,11 +785,7 @@ class RawXMLContent(RMLAttribute):
         super().__init__(*args, **kw)
 
     def get(self):
-        # ReportLab's paragraph parser does not like attributes from other
-        # namespaces; sigh. So we have to improvize.
-        text = etree.tounicode(self.context.element, pretty_print=False)
-        text = text[text.find('>') + 1:text.rfind('<')]
-        return text
+        return getXMLContent(self.context.element)
 
 
 class XMLContent(RawXMLContent):
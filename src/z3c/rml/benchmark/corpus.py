@@ -0,0 +1,320 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Corpus Benchmarks
+
+Renders the documents of the test corpus and compares the timings against a
+saved baseline.
+
+Usage: python -m z3c.rml.benchmark.corpus [--repeat N] [--output FILE]
+                                          [--baseline FILE] [pattern ...]
+                                          [--workload KIND:SIZE ...]
+"""
+import argparse
+import collections
+import fnmatch
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+import pikepdf
+import reportlab
+from lxml import etree
+
+import z3c.rml.tests
+from z3c.rml import document
+from z3c.rml.benchmark import workloads
+
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows.
+    resource = None
+
+
+INPUT_DIR = os.path.join(os.path.dirname(z3c.rml.tests.__file__), 'input')
+
+# The metrics compared against the baseline.
+TIME_METRICS = ('wall', 'cpu')
+
+Regression = collections.namedtuple(
+    'Regression', ('document', 'metric', 'baseline', 'current'))
+
+
+def findDocuments(patterns=None, inputDir=INPUT_DIR):
+    """Return the paths of the RML files matching any of the patterns."""
+    paths = []
+    for filename in sorted(os.listdir(inputDir)):
+        if not filename.endswith('.rml'):
+            continue
+        if patterns and not any(
+                fnmatch.fnmatch(filename, pattern) for pattern in patterns):
+            continue
+        paths.append(os.path.join(inputDir, filename))
+    return paths
+
+
+def peakRSS():
+    """Return the peak resident set size of the process in bytes."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def renderDocument(path):
+    """Render the document and return the PDF and the number of passes."""
+    root = etree.parse(path).getroot()
+    doc = document.Document(root)
+    doc.filename = path
+    output = io.BytesIO()
+    doc.process(output)
+    passes = getattr(doc.doc, 'current_pass', 1)
+    return output.getvalue(), passes
+
+
+def _setUpWorker():
+    # Some documents call functions of these modules.
+    import z3c.rml.tests.module
+    sys.modules['module'] = z3c.rml.tests.module
+    sys.modules['mymodule'] = z3c.rml.tests.module
+    logging.disable(logging.WARNING)
+
+
+def _tearDownWorker():
+    del sys.modules['module']
+    del sys.modules['mymodule']
+    logging.disable(logging.NOTSET)
+
+
+def measureDocument(path, repeat=5, warmup=1):
+    """Render the document several times and return the measurements.
+
+    The first ``warmup`` renderings fill the process-wide caches and are
+    not measured. The peak RSS is that of the entire process.
+    """
+    result = {'wall': [], 'cpu': [], 'passes': None, 'pages': None,
+              'peakRss': None, 'error': None}
+    try:
+        for i in range(warmup):
+            renderDocument(path)
+        for i in range(repeat):
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            data, passes = renderDocument(path)
+            result['cpu'].append(time.process_time() - cpu)
+            result['wall'].append(time.perf_counter() - wall)
+        result['passes'] = passes
+        with pikepdf.open(io.BytesIO(data)) as pdf:
+            result['pages'] = len(pdf.pages)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['peakRss'] = peakRSS()
+    return result
+
+
+def _measureJob(args):
+    _setUpWorker()
+    return measureDocument(*args)
+
+
+def runBenchmark(paths, repeat=5, warmup=1, isolate=True, progress=None):
+    """Measure all documents and return the results.
+
+    If ``isolate`` is set, every document is rendered in a new process, so
+    that the peak RSS is that of the document and the caches filled by
+    other documents do not influence the timings. ``progress`` is called
+    with the name and the result of every document.
+    """
+    jobs = [(path, repeat, warmup) for path in paths]
+    if isolate:
+        pool = multiprocessing.Pool(1, maxtasksperchild=1)
+        try:
+            measurements = pool.imap(_measureJob, jobs)
+            documents = _collect(paths, measurements, progress)
+        finally:
+            pool.terminate()
+    else:
+        _setUpWorker()
+        try:
+            measurements = (measureDocument(*job) for job in jobs)
+            documents = _collect(paths, measurements, progress)
+        finally:
+            _tearDownWorker()
+    return {
+        'python': platform.python_version(),
+        'reportlab': reportlab.Version,
+        'repeat': repeat,
+        'warmup': warmup,
+        'isolate': isolate,
+        'documents': documents,
+    }
+
+
+def _collect(paths, measurements, progress):
+    documents = collections.OrderedDict()
+    for path, result in zip(paths, measurements):
+        name = os.path.basename(path)
+        for metric in TIME_METRICS:
+            result[metric + 'Median'] = (
+                statistics.median(result[metric]) if result[metric]
+                else None)
+        documents[name] = result
+        if progress is not None:
+            progress(name, result)
+    return documents
+
+
+def compare(baseline, results, threshold=0.1, rssThreshold=0.2,
+            minTime=0.005):
+    """Return the regressions of the results against the baseline.
+
+    A time is a regression if its median grew by more than ``threshold``
+    (relative) and by more than ``minTime`` seconds, which hides the noise
+    of very fast documents. The peak RSS is a regression if it grew by more
+    than ``rssThreshold``. Documents that fail to render but rendered in the
+    baseline are regressions, too.
+    """
+    regressions = []
+    for name, current in results['documents'].items():
+        base = baseline['documents'].get(name)
+        if base is None:
+            continue
+        if current['error'] is not None:
+            if base['error'] is None:
+                regressions.append(Regression(name, 'error', None, None))
+            continue
+        if base['error'] is not None:
+            continue
+        for metric in TIME_METRICS:
+            before = base[metric + 'Median']
+            after = current[metric + 'Median']
+            if (after > before * (1 + threshold) and
+                    after - before > minTime):
+                regressions.append(Regression(name, metric, before, after))
+        before, after = base['peakRss'], current['peakRss']
+        if before and after and after > before * (1 + rssThreshold):
+            regressions.append(Regression(name, 'peakRss', before, after))
+    return regressions
+
+
+def formatResult(name, result):
+    if result['error'] is not None:
+        return '%-45s %s' % (name, result['error'].splitlines()[-1])
+    return '%-45s %9.1f %9.1f %9.1f %6i %6i' % (
+        name, result['wallMedian'] * 1000, result['cpuMedian'] * 1000,
+        (result['peakRss'] or 0) / 1024.0 / 1024.0, result['passes'],
+        result['pages'])
+
+
+def formatRegression(regression):
+    if regression.metric == 'error':
+        return '%-45s fails to render' % regression.document
+    if regression.metric == 'peakRss':
+        scale, unit = 1 / 1024.0 / 1024.0, 'MiB'
+    else:
+        scale, unit = 1000.0, 'ms'
+    return '%-45s %-8s %9.1f -> %9.1f %s (%+.0f%%)' % (
+        regression.document, regression.metric,
+        regression.baseline * scale, regression.current * scale, unit,
+        (regression.current / regression.baseline - 1) * 100)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='z3c.rml.benchmark.corpus',
+        description=('Renders the RML documents of the test corpus and '
+                     'compares the timings against a baseline.'))
+    parser.add_argument(
+        'patterns', nargs='*', metavar='pattern',
+        help='only measure the files matching one of the glob patterns')
+    parser.add_argument(
+        '--input-dir', default=INPUT_DIR,
+        help='the directory with the RML documents')
+    parser.add_argument(
+        '--workload', action='append', default=[], metavar='KIND:SIZE',
+        type=workloads.parseSpec,
+        help=('also measure a synthetic workload, e.g. story:100; without '
+              'patterns only the workloads are measured'))
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='the measured renderings of every document')
+    parser.add_argument(
+        '--warmup', type=int, default=1,
+        help='the renderings of every document before measuring')
+    parser.add_argument(
+        '--no-isolate', dest='isolate', action='store_false',
+        help='render all documents in this process')
+    parser.add_argument(
+        '--output', metavar='FILE',
+        help='write the results as JSON into FILE')
+    parser.add_argument(
+        '--baseline', metavar='FILE',
+        help='compare the results against the JSON results in FILE')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='the relative growth of a median time that is a regression')
+    parser.add_argument(
+        '--rss-threshold', type=float, default=0.2,
+        help='the relative growth of the peak RSS that is a regression')
+    parser.add_argument(
+        '--min-time', type=float, default=0.005,
+        help='the growth in seconds below which times are never regressions')
+    pargs = parser.parse_args(args)
+
+    paths = []
+    if pargs.patterns or not pargs.workload:
+        paths = findDocuments(pargs.patterns, pargs.input_dir)
+    workloadDir = tempfile.mkdtemp('z3c.rml-workloads')
+    try:
+        for kind, size in pargs.workload:
+            paths.append(workloads.write(kind, size, workloadDir))
+        print('%-45s %9s %9s %9s %6s %6s' % (
+            'document', 'wall ms', 'cpu ms', 'rss MiB', 'passes', 'pages'))
+        results = runBenchmark(
+            paths, pargs.repeat, pargs.warmup, pargs.isolate,
+            progress=lambda name, result: print(formatResult(name, result)))
+    finally:
+        shutil.rmtree(workloadDir)
+
+    if pargs.output:
+        with open(pargs.output, 'w') as outputFile:
+            json.dump(results, outputFile, indent=2)
+
+    if pargs.baseline:
+        with open(pargs.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = compare(
+            baseline, results, pargs.threshold, pargs.rss_threshold,
+            pargs.min_time)
+        print()
+        print('%i regressions' % len(regressions))
+        for regression in regressions:
+            print(formatRegression(regression))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
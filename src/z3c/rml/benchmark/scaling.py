@@ -0,0 +1,75 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Long Table Scaling Benchmarks
+
+Usage: python -m z3c.rml.benchmark.scaling [--rows N ...] [--limit N]
+"""
+import argparse
+import time
+
+from z3c.rml import rml2pdf
+from z3c.rml.benchmark import workloads
+
+
+MODES = workloads.TABLE_MODES
+
+
+def tableRML(rows, mode='chunkRows', chunkRows=100):
+    """Return a document with a table of the given number of body rows."""
+    return workloads.bulkTable(rows, mode, chunkRows)
+
+
+def measure(rml):
+    """Render the document and return the page count and the seconds."""
+    start = time.perf_counter()
+    output = rml2pdf.parseString(rml)
+    duration = time.perf_counter() - start
+    return output.getvalue().count(b'/Type /Page\n'), duration
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='z3c.rml.benchmark.scaling',
+        description=('Measures how the rendering time of long tables grows '
+                     'with the number of rows.'))
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[1000, 10000, 100000],
+        help='the row counts to measure')
+    parser.add_argument(
+        '--modes', nargs='+', choices=sorted(MODES),
+        default=['table', 'longTable', 'chunkRows'],
+        help='the table layouts to measure')
+    parser.add_argument(
+        '--chunk-rows', type=int, default=100,
+        help='the rows of a chunk in the chunkRows mode')
+    parser.add_argument(
+        '--limit', type=int, default=10000,
+        help=('the largest row count measured for the table and longTable '
+              'modes, which need quadratic time'))
+    pargs = parser.parse_args(args)
+
+    print('%8s %10s %8s %10s %12s' % (
+        'rows', 'mode', 'pages', 'seconds', 'ms/100 rows'))
+    for rows in pargs.rows:
+        for mode in pargs.modes:
+            if mode != 'chunkRows' and rows > pargs.limit:
+                continue
+            pages, duration = measure(
+                tableRML(rows, mode, pargs.chunk_rows))
+            print('%8i %10s %8i %10.3f %12.2f' % (
+                rows, mode, pages, duration, duration * 1e5 / rows))
+
+
+if __name__ == '__main__':
+    main()
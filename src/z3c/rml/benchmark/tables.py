@@ -0,0 +1,82 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Block Table Benchmarks
+
+Usage: python -m z3c.rml.benchmark.tables [--rows N ...] [--cols N]
+"""
+import argparse
+import time
+
+import reportlab.platypus
+
+from z3c.rml import flowable
+from z3c.rml import rml2pdf
+from z3c.rml.benchmark import workloads
+
+
+def tableRML(rows, cols):
+    """Return a document with a table that styles every cell separately."""
+    return workloads.blockTable(rows, cols)
+
+
+class CountingTable(reportlab.platypus.Table):
+    """A table that counts the style commands it is given."""
+
+    commands = 0
+
+    def setStyle(self, tblstyle):
+        CountingTable.commands += len(tblstyle.getCommands())
+        super().setStyle(tblstyle)
+
+
+def measure(rml, coalesce):
+    """Render the document and return the command count and the seconds."""
+    klass = flowable.BlockTable.klass
+    coalesceCellStyles = flowable.BlockTable.coalesceCellStyles
+    flowable.BlockTable.klass = CountingTable
+    flowable.BlockTable.coalesceCellStyles = coalesce
+    CountingTable.commands = 0
+    try:
+        start = time.perf_counter()
+        rml2pdf.parseString(rml)
+        duration = time.perf_counter() - start
+    finally:
+        flowable.BlockTable.klass = klass
+        flowable.BlockTable.coalesceCellStyles = coalesceCellStyles
+    return CountingTable.commands, duration
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='z3c.rml.benchmark.tables',
+        description=('Compares the style command count and rendering time of '
+                     'tables with and without merging cell styles.'))
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[100, 1000, 5000],
+        help='the row counts to measure')
+    parser.add_argument(
+        '--cols', type=int, default=6, help='the number of columns')
+    pargs = parser.parse_args(args)
+
+    print('%8s %10s %10s %10s' % ('rows', 'coalesce', 'commands', 'seconds'))
+    for rows in pargs.rows:
+        rml = tableRML(rows, pargs.cols)
+        for coalesce in (False, True):
+            commands, duration = measure(rml, coalesce)
+            print('%8i %10s %10i %10.3f' % (
+                rows, coalesce, commands, duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Synthetic Workloads
+
+Generates RML documents of any size to measure how rendering scales.
+
+Usage: python -m z3c.rml.benchmark.workloads [--kinds KIND ...]
+                                             [--sizes N ...] [--write DIR]
+"""
+import argparse
+import math
+import os
+import time
+
+import pikepdf
+
+from z3c.rml import rml2pdf
+
+
+DOCUMENT_RML = '''\
+<!DOCTYPE document SYSTEM "rml.dtd">
+<document filename="%(name)s.pdf" invariant="1">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="36" y1="36" width="523" height="770"/>
+    </pageTemplate>
+  </template>
+  <stylesheet>
+%(stylesheet)s
+  </stylesheet>
+  <story>
+%(story)s
+  </story>
+</document>
+'''
+
+TEXT = (
+    'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do '
+    'eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim ad '
+    'minim veniam, quis nostrud exercitation ullamco laboris nisi ut '
+    'aliquip ex ea commodo consequat. ')
+
+IMAGES = (
+    '[z3c.rml.tests]/input/images/replogo.gif',
+    '[z3c.rml.tests]/input/images/cylinder.png',
+    '[z3c.rml.tests]/input/zope3logo.gif',
+    '[z3c.rml.tests]/input/logo_no_bar.png',
+)
+
+INCLUDE_PDF = '[z3c.rml.tests]/input/data/include2.pdf'
+MERGE_PDF = '[z3c.rml.tests]/input/data/fw2.pdf'
+
+
+def document(name, story, stylesheet=''):
+    return DOCUMENT_RML % dict(name=name, story=story, stylesheet=stylesheet)
+
+
+CELL_RML = (
+    '<td fontName="%(font)s" background="%(background)s" '
+    'lineBelowThickness="0.5" lineBelowColor="grey">%(row)i-%(col)i</td>')
+
+
+def blockTable(rows, cols=6):
+    """A table that styles every cell separately."""
+    lines = ['    <blockTable repeatRows="1">']
+    for row in range(rows):
+        cells = []
+        for col in range(cols):
+            cells.append(CELL_RML % dict(
+                font='Helvetica-Bold' if row == 0 else 'Helvetica',
+                background='lightgrey' if row % 2 else 'white',
+                row=row, col=col))
+        lines.append('      <tr>%s</tr>' % ''.join(cells))
+    lines.append('    </blockTable>')
+    return document('blockTable', '\n'.join(lines))
+
+
+BULK_TABLE_STYLE = '''\
+    <blockTableStyle id="table">
+      <lineStyle kind="GRID" colorName="grey" thickness="0.5"
+                 start="0,0" stop="-1,-1"/>
+      <blockFont name="Helvetica-Bold" start="0,0" stop="-1,0"/>
+      <blockBackground colorsByRow="white;lightgrey"
+                       start="0,1" stop="-1,-1"/>
+    </blockTableStyle>'''
+
+BULK_TABLE_RML = '''\
+    <blockTable style="table" repeatRows="1" %(options)s>
+      <bulkData><![CDATA[
+%(data)s
+]]></bulkData>
+    </blockTable>'''
+
+TABLE_MODES = {
+    'table': '',
+    'longTable': 'longTable="1"',
+    'chunkRows': 'chunkRows="%(chunkRows)i"',
+}
+
+
+def bulkTable(rows, mode='chunkRows', chunkRows=100):
+    """A table styled as a whole whose body rows come from ``bulkData``."""
+    lines = ['Number,Name,Amount']
+    for row in range(rows):
+        lines.append('%i,Item %i,%.2f' % (row, row, row * 3.14))
+    story = BULK_TABLE_RML % dict(
+        options=TABLE_MODES[mode] % dict(chunkRows=chunkRows),
+        data='\n'.join(lines))
+    return document('bulkTable', story, BULK_TABLE_STYLE)
+
+
+def story(pages, paragraphs=4):
+    """Chapters of one page each, referring to names defined later.
+
+    Every chapter refers to the page of the next chapter and to the last
+    page, which are only known after the layout.
+    """
+    lines = []
+    for page in range(1, pages + 1):
+        lines.append('    <h1>Chapter %i</h1>' % page)
+        lines.append(
+            '    <namedString id="chapter-%i"><pageNumber/></namedString>'
+            % page)
+        lines.append(
+            '    <para>Page <pageNumber/> of '
+            '<getName id="lastPage" default="0000"/>. The next chapter '
+            'starts on page <getName id="chapter-%i" default="0000"/>.'
+            '</para>' % (page + 1))
+        for paragraph in range(paragraphs):
+            lines.append('    <para>%s</para>' % (TEXT * 3))
+        lines.append('    <nextPage/>')
+    lines.append(
+        '    <namedString id="chapter-%i"><pageNumber/></namedString>'
+        % (pages + 1))
+    lines.append(
+        '    <namedString id="lastPage"><pageNumber/></namedString>')
+    return document('story', '\n'.join(lines))
+
+
+LINE_PLOT_RML = '''\
+    <illustration width="523" height="300">
+      <linePlot dx="0" dy="0" dwidth="523" dheight="300"
+                x="30" y="30" width="480" height="250" joinedLines="true">
+        <lines>
+          <line strokeColor="red"/>
+          <line strokeColor="blue"/>
+          <line strokeColor="green"/>
+        </lines>
+        <data>
+%s
+        </data>
+      </linePlot>
+    </illustration>'''
+
+
+def linePlot(points, series=2):
+    """A line plot with ``series`` series of ``points`` points each."""
+    data = []
+    for number in range(series):
+        values = [
+            '%i %.3f' % (point, math.sin(point / 50.0 + number) * 100)
+            for point in range(points)]
+        data.append('          <series>%s</series>' % ' '.join(values))
+    return document('linePlot', LINE_PLOT_RML % '\n'.join(data))
+
+
+def imageCatalogue(images):
+    """A catalogue of images, each with a caption."""
+    lines = []
+    for number in range(images):
+        lines.append(
+            '    <img src="%s" width="3cm" height="3cm"/>'
+            % IMAGES[number % len(IMAGES)])
+        lines.append('    <para>Image %i. %s</para>' % (number, TEXT))
+    return document('imageCatalogue', '\n'.join(lines))
+
+
+def includePdfPages(documents):
+    """Includes the pages of a PDF ``documents`` times."""
+    lines = []
+    for number in range(documents):
+        lines.append('    <para>Document %i</para>' % number)
+        lines.append(
+            '    <includePdfPages filename="%s"/>' % INCLUDE_PDF)
+    return document('includePdfPages', '\n'.join(lines))
+
+
+MERGE_PAGE_RML = '''\
+  <pageDrawing>
+    <mergePage filename="%(filename)s" page="1"/>
+    <setFont name="Times-Roman" size="12"/>
+    <drawString x="62mm" y="265mm">Form %(number)i</drawString>
+  </pageDrawing>'''
+
+
+def mergePage(pages):
+    """Fills ``pages`` copies of a PDF form page."""
+    drawings = [MERGE_PAGE_RML % dict(filename=MERGE_PDF, number=number)
+                for number in range(pages)]
+    return ('<!DOCTYPE document SYSTEM "rml.dtd">\n'
+            '<document filename="mergePage.pdf" invariant="1">\n'
+            '%s\n</document>\n' % '\n'.join(drawings))
+
+
+# The workloads by name; each takes its size as the first argument.
+WORKLOADS = {
+    'blockTable': blockTable,
+    'bulkTable': bulkTable,
+    'story': story,
+    'linePlot': linePlot,
+    'imageCatalogue': imageCatalogue,
+    'includePdfPages': includePdfPages,
+    'mergePage': mergePage,
+}
+
+
+def generate(kind, size):
+    """Return the RML of the workload of the given kind and size."""
+    if kind not in WORKLOADS:
+        raise ValueError(
+            'Unknown workload %r, expected one of %s.' % (
+                kind, ', '.join(sorted(WORKLOADS))))
+    return WORKLOADS[kind](size)
+
+
+def parseSpec(spec):
+    """Parse a ``kind:size`` workload specification."""
+    kind, sep, size = spec.partition(':')
+    if kind not in WORKLOADS or not sep or not size.isdigit():
+        raise ValueError(
+            'Invalid workload %r, expected KIND:SIZE with one of the kinds '
+            '%s.' % (spec, ', '.join(sorted(WORKLOADS))))
+    return kind, int(size)
+
+
+def write(kind, size, directory):
+    """Write the workload into the directory and return its path."""
+    path = os.path.join(directory, 'workload-%s-%i.rml' % (kind, size))
+    with open(path, 'w') as rmlFile:
+        rmlFile.write(generate(kind, size))
+    return path
+
+
+def measure(rml):
+    """Render the document and return the page count and the seconds."""
+    start = time.perf_counter()
+    output = rml2pdf.parseString(rml)
+    duration = time.perf_counter() - start
+    with pikepdf.open(output) as pdf:
+        return len(pdf.pages), duration
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='z3c.rml.benchmark.workloads',
+        description=('Measures how the rendering time of synthetic '
+                     'documents grows with their size.'))
+    parser.add_argument(
+        '--kinds', nargs='+', choices=sorted(WORKLOADS),
+        default=['story'],
+        help='the workloads to measure')
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10, 100, 1000],
+        help='the sizes to measure, e.g. the pages of a story')
+    parser.add_argument(
+        '--write', metavar='DIR',
+        help='only write the RML documents into DIR')
+    pargs = parser.parse_args(args)
+
+    if pargs.write:
+        for kind in pargs.kinds:
+            for size in pargs.sizes:
+                print(write(kind, size, pargs.write))
+        return
+
+    print('%16s %8s %8s %10s %10s' % (
+        'workload', 'size', 'pages', 'seconds', 'ms/page'))
+    for kind in pargs.kinds:
+        for size in pargs.sizes:
+            pages, duration = measure(generate(kind, size))
+            print('%16s %8i %8i %10.3f %10.2f' % (
+                kind, size, pages, duration, duration * 1000 / pages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Process-wide Caches
+"""
+import collections
+import io
+import os
+import threading
+import urllib.parse
+import urllib.request
+
+import reportlab.lib.utils
+from reportlab.pdfbase import ttfonts
+
+
+MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe, size-bounded least-recently-used cache.
+
+    The cache holds at most ``maxsize`` entries. If ``weigh`` is given, it is
+    called with every stored value and the total weight of all entries is
+    additionally kept below ``maxweight``. Hits and misses are counted, so
+    that the effectiveness of the cache can be monitored.
+    """
+
+    def __init__(self, maxsize=128, maxweight=None, weigh=None):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value[0]
+
+    def set(self, key, value):
+        weight = self.weigh(value) if self.weigh is not None else 0
+        with self._lock:
+            if key in self._data:
+                self.weight -= self._data.pop(key)[1]
+            # Values heavier than the entire cache are never stored.
+            if self.maxweight is not None and weight > self.maxweight:
+                return value
+            self._data[key] = (value, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (
+                    self.maxweight is not None and
+                    self.weight > self.maxweight):
+                self.weight -= self._data.popitem(last=False)[1][1]
+        return value
+
+    def lookup(self, key, factory):
+        """Return the cached value for ``key``.
+
+        If the key is not cached yet, ``factory()`` is called and its result
+        is stored.
+        """
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = self.set(key, factory())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': float(self.hits) / lookups if lookups else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'weight': self.weight,
+            'maxweight': self.maxweight,
+        }
+
+
+# Parsed TrueType fonts keyed by name, resolved path and modification time.
+fontCache = LRUCache(maxsize=64)
+
+
+def _resolveFontFile(filename):
+    try:
+        path, f = ttfonts.TTFOpenFile(filename)
+    except ttfonts.TTFError:
+        # Let the font itself raise the proper error.
+        return filename, None
+    f.close()
+    try:
+        return path, os.path.getmtime(path)
+    except (OSError, TypeError):
+        return path, None
+
+
+def getTTFont(name, filename, validate=0, subfontIndex=0):
+    """Return a TrueType font, parsing the font file only once per process.
+
+    Font objects are shared by all documents. ReportLab keeps the subset
+    state of a font per document, so sharing them is safe.
+    """
+    path, mtime = _resolveFontFile(filename)
+    key = (name, path, mtime, validate, subfontIndex)
+    return fontCache.lookup(
+        key,
+        lambda: ttfonts.TTFont(
+            name, path, validate=validate, subfontIndex=subfontIndex))
+
+
+def _imageSize(reader):
+    # The decoded size of the image, which is what the reader keeps around
+    # once it was drawn.
+    image = reader._image
+    width, height = image.size
+    return max(1, len(image.mode)) * width * height
+
+
+# Resolved ``[package]/path`` references.
+packagePathCache = LRUCache(maxsize=1024)
+
+# Contents of local files and the decoded images made from them, keyed by
+# their URL and modification time.
+fileCache = LRUCache(maxsize=256, maxweight=64 * 1024 * 1024, weigh=len)
+imageCache = LRUCache(
+    maxsize=128, maxweight=256 * 1024 * 1024, weigh=_imageSize)
+
+
+# Parsed SVG drawings keyed by the hash of the SVG source. Rasterized SVGs
+# are kept in the image cache keyed by the hash and their size.
+svgCache = LRUCache(maxsize=64)
+
+
+def getModificationTime(url):
+    """Return the modification time of a local file URL.
+
+    ``None`` is returned for remote URLs and files that do not exist; those
+    are never cached.
+    """
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme != 'file':
+        return None
+    try:
+        return os.path.getmtime(urllib.request.url2pathname(parsed.path))
+    except OSError:
+        return None
+
+
+def _read(url):
+    fileObj = reportlab.lib.utils.open_for_read(url)
+    try:
+        return fileObj.read()
+    finally:
+        fileObj.close()
+
+
+def readFile(url):
+    """Return the contents of the file at ``url`` as bytes."""
+    mtime = getModificationTime(url)
+    if mtime is None:
+        return _read(url)
+    return fileCache.lookup((url, mtime), lambda: _read(url))
+
+
+def getImageReader(url):
+    """Return an ``ImageReader`` for the image at ``url``.
+
+    Readers of local files are shared by all documents, so that every image
+    is only decoded once.
+    """
+    mtime = getModificationTime(url)
+    if mtime is None:
+        return reportlab.lib.utils.ImageReader(io.BytesIO(_read(url)))
+    return imageCache.lookup((url, mtime), lambda: _sharedImageReader(url))
+
+
+def _sharedImageReader(url):
+    data = readFile(url)
+    reader = reportlab.lib.utils.ImageReader(io.BytesIO(data))
+    # Documents rendered in other threads may use the reader at the same
+    # time. JPEG images are embedded from the raw data, so every caller gets
+    # its own file handle; all other images are decoded right away.
+    if reader.jpeg_fh() is not None:
+        reader.jpeg_fh = lambda: io.BytesIO(data)
+    else:
+        reader.getRGBData()
+    return reader
@@ -14,6 +14,7 @@
 """Page Drawing Related Element Processing
 """
 import reportlab.pdfgen.canvas  # noqa: F401 imported but unused
+from reportlab.lib import boxstuff
 
 from z3c.rml import attr
 from z3c.rml import chart
@@ -23,6 +24,7 @@ from z3c.rml import form
 from z3c.rml import interfaces
 from z3c.rml import occurence
 from z3c.rml import page
+from z3c.rml import platypus
 from z3c.rml import special
 from z3c.rml import stylesheet  # noqa: F401 imported but unused
 
@@ -107,12 +109,42 @@ class IDrawString(interfaces.IRMLDirectiveSignature):
 class DrawString(CanvasRMLDirective, special.TextFlowables):
     signature = IDrawString
     callable = 'drawString'
+    # The anchor of the string for drawing deferred names; 0 is left, 1 is
+    # right.
+    anchor = 0
 
     def process(self):
         canvas = attr.getManager(self, interfaces.ICanvasManager).canvas
         kwargs = dict(self.getAttributeValues(attrMapping=self.attrMapping))
+        manager = self._getManager()
+        self.deferredNames = []
+        if self.anchor is not None and getattr(
+                manager, 'deferredNames', None) is not None:
+            self.deferredNames = [
+                elem for elem in self.element.iterchildren('getName')
+                if manager.isDeferredName(elem.get('id'))]
         kwargs['text'] = self._getText(self.element, canvas).strip()
-        getattr(canvas, self.callable)(**kwargs)
+        if self.deferredNames:
+            self.drawDeferred(canvas, manager.deferredNames, **kwargs)
+        else:
+            getattr(canvas, self.callable)(**kwargs)
+
+    def drawDeferred(self, canvas, deferredNames, x, y, text, **kwargs):
+        fontName, fontSize = canvas._fontname, canvas._fontsize
+        parts = text.split(self.deferredMarker)
+        widths = [deferredNames.getWidth(elem.get('default'), fontName,
+                                         fontSize)
+                  for elem in self.deferredNames]
+        x -= self.anchor * (
+            sum(canvas.stringWidth(part) for part in parts) + sum(widths))
+        for part, elem in zip(parts, self.deferredNames + [None]):
+            if part:
+                canvas.drawString(x, y, part, **kwargs)
+                x += canvas.stringWidth(part)
+            if elem is not None:
+                x += deferredNames.drawName(
+                    canvas, elem.get('id'), elem.get('default'), x, y,
+                    fontName, fontSize, canvas._fillColorObj)
 
 
 class IDrawRightString(IDrawString):
@@ -123,6 +155,7 @@ class IDrawRightString(IDrawString):
 class DrawRightString(DrawString):
     signature = IDrawRightString
     callable = 'drawRightString'
+    anchor = 1
 
 
 class IDrawCenteredString(IDrawString):
@@ -133,6 +166,7 @@ class IDrawCenteredString(IDrawString):
 class DrawCenteredString(DrawString):
     signature = IDrawCenteredString
     callable = 'drawCentredString'
+    anchor = 0.5
 
 
 class IDrawAlignedString(IDrawString):
@@ -151,6 +185,8 @@ class IDrawAlignedString(IDrawString):
 class DrawAlignedString(DrawString):
     signature = IDrawAlignedString
     callable = 'drawAlignedString'
+    # The pivot character may be part of a name.
+    anchor = None
 
 
 class IEllipse(IShape):
@@ -384,18 +420,31 @@ class IImage(interfaces.IRMLDirectiveSignature):
                 sw   s   se'''.split(),
         required=False)
 
+    svgMode = attr.SVGMode(required=False)
+
 
 class Image(CanvasRMLDirective):
     signature = IImage
     callable = 'drawImage'
     attrMapping = {'file': 'image'}
 
+    def drawSVG(self, canvas, image, x, y, width=None, height=None,
+                preserveAspectRatio=False, anchor='c', **kwargs):
+        iw, ih = image.getSize()
+        x, y, width, height, scaled = boxstuff.aspectRatioFix(
+            preserveAspectRatio, anchor, x, y, width, height, iw, ih)
+        image.drawForm(canvas, x, y, width, height)
+
     def process(self):
         kwargs = dict(self.getAttributeValues(attrMapping=self.attrMapping))
         show = kwargs.pop('showBoundary')
+        kwargs.pop('svgMode', None)
 
         canvas = attr.getManager(self, interfaces.ICanvasManager).canvas
-        getattr(canvas, self.callable)(**kwargs)
+        if isinstance(kwargs['image'], platypus.SVGImage):
+            self.drawSVG(canvas, **kwargs)
+        else:
+            getattr(canvas, self.callable)(**kwargs)
 
         if show:
             width = kwargs.get('width', kwargs['image'].getSize()[0])
@@ -1047,6 +1096,7 @@ class PageDrawing(Drawing):
     })
 
     def process(self):
+        attr.getManager(self)._checkCancelled()
         super(Drawing, self).process()
         canvas = attr.getManager(self, interfaces.ICanvasManager).canvas
         canvas.showPage()
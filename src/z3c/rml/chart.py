@@ -1454,6 +1454,7 @@ class BarChart(Chart):
     def createChart(self, attrs):
         direction = attrs.pop('direction')
         # Setup sub-elements based on direction
+        self.factories = self.factories.copy()
         if direction == 'horizontal':
             self.factories['categoryAxis'] = YCategoryAxis
             self.factories['valueAxis'] = XValueAxis
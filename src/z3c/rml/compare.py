@@ -0,0 +1,286 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Visual Comparison of PDF Files
+
+The pages are rasterized with Ghostscript and compared pixel by pixel.
+
+Usage: python -m z3c.rml.compare [--workers N] [--tolerance RATIO]
+                                 [--cache-dir DIR] EXPECTED_DIR OUTPUT_DIR
+"""
+import argparse
+import collections
+import concurrent.futures
+import functools
+import glob
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from PIL import Image
+from PIL import ImageChops
+
+
+GS_COMMAND = 'gs'
+GS_DEVICE = 'png256'
+
+PageDiff = collections.namedtuple('PageDiff', ('page', 'ratio', 'same'))
+
+Comparison = collections.namedtuple(
+    'Comparison', ('base', 'test', 'pages', 'basePages', 'testPages',
+                   'error'))
+
+
+class RasterizeError(Exception):
+    """A PDF file could not be rasterized."""
+
+
+def gsCommand(path, outputPattern, device=GS_DEVICE, resolution=None):
+    command = [GS_COMMAND, '-q', '-dNOPAUSE', '-dBATCH', '-dSAFER',
+               '-sDEVICE=%s' % device]
+    if resolution is not None:
+        command.append('-r%i' % resolution)
+    command += ['-sOutputFile=%s' % outputPattern, path]
+    return command
+
+
+@functools.lru_cache()
+def _gsVersion(command):
+    try:
+        return subprocess.check_output(
+            [command, '--version'], stderr=subprocess.DEVNULL,
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError) as err:
+        raise RasterizeError('Cannot run Ghostscript: %s' % err)
+
+
+def gsVersion():
+    """Return the version of the Ghostscript used to rasterize pages."""
+    return _gsVersion(GS_COMMAND)
+
+
+def _pageNumber(path):
+    return int(path.rsplit('[Page-', 1)[1].split(']', 1)[0])
+
+
+def _pageImages(prefix):
+    return sorted(glob.glob(glob.escape(prefix) + '[[]Page-*[]].png'),
+                  key=_pageNumber)
+
+
+def _runGhostscript(path, prefix, resolution):
+    try:
+        status = subprocess.call(
+            gsCommand(path, prefix + '[Page-%d].png', resolution=resolution),
+            stdout=subprocess.DEVNULL)
+    except OSError as err:
+        raise RasterizeError('Cannot run Ghostscript: %s' % err)
+    if status:
+        raise RasterizeError(
+            'Ghostscript failed to rasterize %s (status %i).' % (
+                path, status))
+
+
+class RasterCache:
+    """Rasterized pages stored in a directory, keyed by the PDF content.
+
+    The pages of a file are only rasterized again if the content of the
+    file, the resolution, the Ghostscript version or the device changed, so
+    the expected files of a regression test are rasterized once. Several
+    processes may share the directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def key(self, path, resolution):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as pdfFile:
+            for chunk in iter(lambda: pdfFile.read(1 << 20), b''):
+                digest.update(chunk)
+        return '%s-%s-gs%s-%s' % (
+            digest.hexdigest(), resolution or 'default', gsVersion(),
+            GS_DEVICE)
+
+    def rasterize(self, path, resolution=None):
+        entry = os.path.join(self.directory, self.key(path, resolution))
+        if not os.path.isdir(entry):
+            os.makedirs(self.directory, exist_ok=True)
+            workDir = tempfile.mkdtemp(dir=self.directory)
+            try:
+                _runGhostscript(
+                    path, os.path.join(workDir, 'page'), resolution)
+                try:
+                    # Renaming is atomic, so other processes never see a
+                    # partial entry.
+                    os.rename(workDir, entry)
+                except OSError:
+                    # Another process stored the entry first.
+                    pass
+            finally:
+                if os.path.isdir(workDir):
+                    shutil.rmtree(workDir)
+        return _pageImages(os.path.join(entry, 'page'))
+
+
+def rasterize(path, cache=None, resolution=None):
+    """Rasterize all pages of the PDF and return the paths of the images.
+
+    Without a cache, the images are stored next to the PDF file as
+    ``name[Page-N].png``.
+    """
+    if cache is not None:
+        return cache.rasterize(path, resolution)
+    prefix = os.path.splitext(path)[0]
+    for image in _pageImages(prefix):
+        os.remove(image)
+    _runGhostscript(path, prefix, resolution)
+    return _pageImages(prefix)
+
+
+def diffRatio(base, test, pixelTolerance=0):
+    """Return the fraction of pixels that differ between the images.
+
+    A channel of a pixel may differ by ``pixelTolerance`` before the pixel
+    counts as different. Images of different sizes differ entirely.
+    """
+    if base.size != test.size:
+        return 1.0
+    # Palette indices of different images are not comparable.
+    diff = ImageChops.difference(base.convert('RGB'), test.convert('RGB'))
+    if diff.getbbox() is None:
+        return 0.0
+    red, green, blue = diff.split()
+    diff = ImageChops.lighter(ImageChops.lighter(red, green), blue)
+    mask = diff.point(lambda value: 255 if value > pixelTolerance else 0)
+    width, height = base.size
+    return mask.histogram()[255] / float(width * height)
+
+
+def diffImages(baseImage, testImage, tolerance=0.0, pixelTolerance=0):
+    """Compare two image files and return the ratio and whether it is within
+    the tolerance."""
+    with Image.open(baseImage) as base, Image.open(testImage) as test:
+        ratio = diffRatio(base, test, pixelTolerance)
+    return ratio, ratio <= tolerance
+
+
+def comparePDFs(basePath, testPath, tolerance=0.0, pixelTolerance=0,
+                cache=None, resolution=None):
+    """Compare the pages of two PDF files visually.
+
+    The pages of the base file are rasterized through the cache, if one is
+    given. Pages only one of the files has are not compared, but the page
+    counts are part of the result.
+    """
+    try:
+        baseImages = rasterize(basePath, cache, resolution)
+        testImages = rasterize(testPath, None, resolution)
+    except RasterizeError as err:
+        return Comparison(basePath, testPath, [], None, None, str(err))
+    pages = []
+    for number, (baseImage, testImage) in enumerate(
+            zip(baseImages, testImages), 1):
+        ratio, same = diffImages(
+            baseImage, testImage, tolerance, pixelTolerance)
+        pages.append(PageDiff(number, ratio, same))
+    return Comparison(
+        basePath, testPath, pages, len(baseImages), len(testImages), None)
+
+
+def isSame(comparison):
+    """Return whether all compared pages and the page counts are equal."""
+    return (comparison.error is None and
+            comparison.basePages == comparison.testPages and
+            all(page.same for page in comparison.pages))
+
+
+def compareMany(pairs, workers=None, tolerance=0.0, pixelTolerance=0,
+                cacheDir=None, resolution=None):
+    """Compare many pairs of PDF files in worker processes.
+
+    The result is a list of ``Comparison`` tuples in the order of the pairs.
+    """
+    cache = RasterCache(cacheDir) if cacheDir is not None else None
+    if workers == 1:
+        return [comparePDFs(base, test, tolerance, pixelTolerance, cache,
+                            resolution)
+                for base, test in pairs]
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(comparePDFs, base, test, tolerance,
+                            pixelTolerance, cache, resolution)
+            for base, test in pairs]
+        return [future.result() for future in futures]
+
+
+def formatComparison(comparison):
+    name = os.path.basename(comparison.test)
+    if comparison.error is not None:
+        return '%-45s ERROR %s' % (name, comparison.error)
+    worst = max([page.ratio for page in comparison.pages] or [0.0])
+    status = 'ok' if isSame(comparison) else 'DIFFERS'
+    line = '%-45s %-7s %3i pages, max diff %.4f%%' % (
+        name, status, comparison.testPages, worst * 100)
+    if comparison.basePages != comparison.testPages:
+        line += ' (expected %i pages)' % comparison.basePages
+    differing = [str(page.page) for page in comparison.pages
+                 if not page.same]
+    if differing:
+        line += ', pages %s' % ', '.join(differing)
+    return line
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='z3c.rml.compare',
+        description=('Compares the PDF files of the output directory with '
+                     'those of the same name in the expected directory.'))
+    parser.add_argument('expectedDir', help='the expected PDF files')
+    parser.add_argument('outputDir', help='the PDF files to check')
+    parser.add_argument(
+        '--workers', type=int, help='the number of worker processes')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.0,
+        help='the fraction of pixels of a page that may differ')
+    parser.add_argument(
+        '--pixel-tolerance', type=int, default=0,
+        help='the difference of a color channel that is ignored')
+    parser.add_argument(
+        '--resolution', type=int, help='the resolution in DPI')
+    parser.add_argument(
+        '--cache-dir',
+        help='the directory caching the rasterized expected files')
+    pargs = parser.parse_args(args)
+
+    pairs = []
+    for name in sorted(os.listdir(pargs.outputDir)):
+        expected = os.path.join(pargs.expectedDir, name)
+        if name.endswith('.pdf') and os.path.exists(expected):
+            pairs.append((expected, os.path.join(pargs.outputDir, name)))
+    results = compareMany(
+        pairs, pargs.workers, pargs.tolerance, pargs.pixel_tolerance,
+        pargs.cache_dir, pargs.resolution)
+    failed = 0
+    for comparison in results:
+        print(formatComparison(comparison))
+        failed += not isSame(comparison)
+    print('%i of %i files differ' % (failed, len(results)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,13 +14,17 @@
 """RML Directive Implementation
 """
 import logging
+import threading
 
 import zope.interface
 import zope.schema
 from lxml import etree
 
 from z3c.rml import interfaces
-from z3c.rml.attr import getManager
+from z3c.rml.attr import MANAGER_INTERFACES
+from z3c.rml.attr import RMLAttribute
+from z3c.rml.attr import getManager  # noqa: F401 imported but unused
+from z3c.rml.attr import providesManager
 
 
 logging.raiseExceptions = False
@@ -44,6 +48,86 @@ def getFileInfo(directive, element=None):
     return '(file %s, line %i)' % (root.filename, element.sourceline)
 
 
+class CompiledField:
+    """A signature field prepared for reading its value from an element.
+
+    Missing attributes resolve to the default without touching the field. The
+    field is bound once per thread and only its context is set for every
+    directive, instead of binding a copy of the field every time.
+    """
+    __slots__ = ('name', 'field', 'default', 'direct', 'bound')
+
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+        self.default = field.default
+        if self.default is None:
+            self.default = field.missing_value
+        # Fields that compute their value differently (i.e. from the text
+        # content) or that have a deprecated name use the regular API.
+        self.direct = (
+            isinstance(field, RMLAttribute) and
+            type(field).get is RMLAttribute.get and
+            not interfaces.IDeprecated.providedBy(field))
+        self.bound = threading.local()
+
+    def convert(self, directive, method, *args):
+        field = getattr(self.bound, 'field', None)
+        if field is None:
+            field = self.bound.field = self.field.bind(None)
+        # Converting a value may read the same field of another directive.
+        context = field.context
+        field.context = directive
+        try:
+            return getattr(field, method)(*args)
+        finally:
+            field.context = context
+
+    def get(self, directive):
+        if not self.direct:
+            return self.convert(directive, 'get')
+        value = directive.element.get(self.name)
+        if value is None:
+            return self.default
+        return self.convert(directive, 'fromUnicode', value)
+
+
+class CompiledSignature:
+    """The fields of a signature in order and by name."""
+
+    def __init__(self, signature):
+        self.fields = [
+            CompiledField(name, field)
+            for name, field in zope.schema.getFieldsInOrder(signature)]
+        self.byName = {field.name: field for field in self.fields}
+
+    def select(self, select=None, ignore=None):
+        if select is None:
+            fields = self.fields
+        else:
+            # Return the fields in the order of the selection.
+            fields = [self.byName[name] for name in dict.fromkeys(select)
+                      if name in self.byName]
+        if ignore is not None:
+            fields = [field for field in fields if field.name not in ignore]
+        return fields
+
+
+_compiledSignatures = {}
+_providedManagers = {}
+_noManagers = {}
+
+
+def compileSignature(signature):
+    """Return the compiled signature, compiling it on first use."""
+    try:
+        return _compiledSignatures[signature]
+    except KeyError:
+        compiled = _compiledSignatures[signature] = CompiledSignature(
+            signature)
+        return compiled
+
+
 @zope.interface.implementer(interfaces.IRMLDirective)
 class RMLDirective:
     signature = None
@@ -52,45 +136,37 @@ class RMLDirective:
     def __init__(self, element, parent):
         self.element = element
         self.parent = parent
+        # Remember the closest managers, so that ``getManager()`` does not
+        # have to walk up the directive tree.
+        self.managers = getattr(parent, 'managers', _noManagers)
+        provided = _providedManagers.get(self.__class__)
+        if provided is None:
+            provided = _providedManagers[self.__class__] = tuple(
+                iface for iface in MANAGER_INTERFACES
+                if providesManager(self, iface))
+        if provided:
+            self.managers = dict(self.managers)
+            for iface in provided:
+                self.managers[iface] = self
 
     def getAttributeValues(self, ignore=None, select=None, attrMapping=None,
                            includeMissing=False, valuesOnly=False):
         """See interfaces.IRMLDirective"""
-        manager = getManager(self)
-        cache = '{}.{}'.format(
-            self.signature.__module__,
-            self.signature.__name__)
-        if cache in manager.attributesCache:
-            fields = manager.attributesCache[cache]
-        else:
-            fields = []
-            for name, attr in zope.schema.getFieldsInOrder(self.signature):
-                fields.append((name, attr))
-            manager.attributesCache[cache] = fields
-
         items = []
-        for name, attr in fields:
-            # Only add the attribute to the list, if it is supposed there
-            if ((ignore is None or name not in ignore) and
-                    (select is None or name in select)):
-                # Get the value.
-                value = attr.bind(self).get()
-                # If no value was found for a required field, raise a value
-                # error
-                if attr.required and value is attr.missing_value:
-                    raise ValueError(
-                        'No value for required attribute "%s" '
-                        'in directive "%s" %s.' % (
-                            name, self.element.tag, getFileInfo(self)))
-                # Only add the entry if the value is not the missing value or
-                # missing values are requested to be included.
-                if value is not attr.missing_value or includeMissing:
-                    items.append((name, value))
-
-        # Sort the items based on the section
-        if select is not None:
-            select = list(select)
-            items = sorted(items, key=lambda n: select.index(n[0]))
+        for field in compileSignature(self.signature).select(select, ignore):
+            value = field.get(self)
+            missing = value is field.field.missing_value
+            # If no value was found for a required field, raise a value
+            # error
+            if missing and field.field.required:
+                raise ValueError(
+                    'No value for required attribute "%s" '
+                    'in directive "%s" %s.' % (
+                        field.name, self.element.tag, getFileInfo(self)))
+            # Only add the entry if the value is not the missing value or
+            # missing values are requested to be included.
+            if not missing or includeMissing:
+                items.append((field.name, value))
 
         # If the attribute name does not match the internal API
         # name, then convert the name to the internal one
@@ -105,6 +181,8 @@ class RMLDirective:
         return items
 
     def processSubDirectives(self, select=None, ignore=None):
+        manager = self.managers.get(interfaces.IManager)
+        profiler = getattr(manager, 'profiler', None)
         # Go through all children of the directive and try to process them.
         for element in self.element.getchildren():
             # Ignore all comments
@@ -124,7 +202,10 @@ class RMLDirective:
             if ignore is not None and element.tag in ignore:
                 continue
             directive = self.factories[element.tag](element, self)
-            directive.process()
+            if profiler is None:
+                directive.process()
+            else:
+                profiler.processDirective(directive)
 
     def process(self):
         self.processSubDirectives()
@@ -13,20 +13,25 @@
 ##############################################################################
 """RML ``document`` element
 """
+import contextlib
+import copy
 import io
 import logging
+import threading
 
 import reportlab.pdfgen.canvas
 import zope.interface
+from reportlab import rl_config
 from reportlab.lib import colors
 from reportlab.lib import fonts
 from reportlab.pdfbase import cidfonts
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase import ttfonts
 from reportlab.platypus import tableofcontents
+from reportlab.platypus.doctemplate import BaseDocTemplate
 from reportlab.platypus.doctemplate import IndexingFlowable
 
 from z3c.rml import attr
+from z3c.rml import cache
 from z3c.rml import canvas
 from z3c.rml import directive
 from z3c.rml import doclogic  # noqa: F401 imported but unused
@@ -34,6 +39,8 @@ from z3c.rml import interfaces
 from z3c.rml import list  # noqa: F401 imported but unused
 from z3c.rml import occurence
 from z3c.rml import pdfinclude  # noqa: F401 imported but unused
+from z3c.rml import postprocess
+from z3c.rml import rlfix
 from z3c.rml import special
 from z3c.rml import storyplace  # noqa: F401 imported but unused
 from z3c.rml import stylesheet
@@ -42,6 +49,13 @@ from z3c.rml import template
 
 LOGGER_NAME = 'z3c.rml.render'
 
+# The strategies to resolve forward references to names.
+REFERENCE_STRATEGIES = ('passes', 'deferred')
+
+
+class RenderingCancelled(Exception):
+    """The rendering of a document was cancelled."""
+
 
 class IRegisterType1Face(interfaces.IRMLDirectiveSignature):
     """Register a new Type 1 font face."""
@@ -153,7 +167,7 @@ class RegisterTTFont(directive.RMLDirective):
 
     def process(self):
         args = self.getAttributeValues(valuesOnly=True)
-        font = ttfonts.TTFont(*args)
+        font = cache.getTTFont(*args)
         pdfmetrics.registerFont(font)
 
 
@@ -640,6 +654,41 @@ class IDocument(interfaces.IRMLDirectiveSignature):
                      'the exact contents.'),
         required=False)
 
+    objectStreams = attr.Choice(
+        title='Object Streams',
+        description=('Determines how object streams are written when the '
+                     'PDF is post-processed, for example to include or '
+                     'merge pages. "generate" produces smaller files.'),
+        choices=postprocess.OBJECT_STREAM_MODES,
+        required=False)
+
+    compressStreams = attr.Boolean(
+        title='Compress Streams',
+        description=('A flag determining whether uncompressed streams are '
+                     'compressed when the PDF is post-processed.'),
+        required=False)
+
+
+class DirectOutput:
+    """Writes the PDF straight into the output file.
+
+    Directives that are not listed in ``Document.postProcessorDirectives``
+    may still register post-processors. If any are registered once ReportLab
+    writes the PDF, it is kept in ``buffer`` for them instead.
+    """
+
+    def __init__(self, document, outputFile):
+        self.document = document
+        self.outputFile = outputFile
+        self.buffer = None
+
+    def write(self, data):
+        if self.document.postProcessors:
+            if self.buffer is None:
+                self.buffer = io.BytesIO()
+            return self.buffer.write(data)
+        return self.outputFile.write(data)
+
 
 @zope.interface.implementer(interfaces.IManager,
                             interfaces.IPostProcessorManager,
@@ -647,6 +696,21 @@ class IDocument(interfaces.IRMLDirectiveSignature):
 class Document(directive.RMLDirective):
     signature = IDocument
 
+    # Directives that register post-processors. The output is buffered in
+    # memory from the start if one of them is used, otherwise only once
+    # post-processors have been registered.
+    postProcessorDirectives = ['includePdfPages', 'mergePage']
+
+    # The number of parsed paragraphs kept per document.
+    paragraphCacheSize = 1024
+
+    # How the post-processed PDF is saved, unless the ``objectStreams`` and
+    # ``compressStreams`` attributes of the document say otherwise: the
+    # object stream mode, one of ``postprocess.OBJECT_STREAM_MODES``, and
+    # whether streams are compressed.
+    postProcessObjectStreams = 'preserve'
+    postProcessCompression = True
+
     factories = {
         'docinit': DocInit,
         'stylesheet': stylesheet.Stylesheet,
@@ -669,7 +733,14 @@ class Document(directive.RMLDirective):
         self.pageMode = None
         self.logger = None
         self.svgs = {}
-        self.attributesCache = {}
+        self.doc = None
+        self.strategy = 'passes'
+        self.deferredNames = None
+        # An event-like object; once it is set, the layout stops.
+        self.cancelled = None
+        # A ``profiler.Profiler`` measuring the rendering.
+        self.profiler = None
+        self.paragraphCache = cache.LRUCache(self.paragraphCacheSize)
         for name in DocInit.viewerOptions:
             setattr(self, name, None)
         if not canvasClass:
@@ -682,6 +753,22 @@ class Document(directive.RMLDirective):
     def _beforeDocument(self):
         self._initCanvas(self.doc.canv)
         self.canvas = self.doc.canv
+        if self.deferredNames is not None:
+            # The forms are written by ``afterBuild()`` of every pass.
+            self.deferredNames.beforeBuild()
+            if self.deferredNames not in self.doc._indexingFlowables:
+                self.doc._indexingFlowables.append(self.deferredNames)
+
+    def _drawDeferredName(self, canvas, kind, frag):
+        info = canvas._curr_tx_info
+        x, y = info['cur_x'], info['cur_y'] + getattr(frag, 'rise', 0)
+        width = self.deferredNames.drawName(
+            canvas, frag.id, frag.default, x, y,
+            frag.fontName, frag.fontSize, frag.textColor)
+        if width:
+            # Continue the text behind the reserved space.
+            tx = info['tx']
+            tx.setXPos(x + width - tx._x0)
 
     def _initCanvas(self, canvas):
         # TODO: Remove the conditional once support for reportlab < 4.4.8
@@ -689,8 +776,10 @@ class Document(directive.RMLDirective):
         # security fix replacing direct canvas attribute assignment.
         if hasattr(canvas, 'setNamedCB'):
             canvas.setNamedCB('_indexAdd', self._indexAdd)
+            canvas.setNamedCB('_deferredName', self._drawDeferredName)
         else:
             canvas._indexAdd = self._indexAdd
+            canvas._deferredName = self._drawDeferredName
         canvas.manager = self
         if self.pageLayout:
             canvas._doc._catalog.setPageLayout(self.pageLayout)
@@ -707,42 +796,48 @@ class Document(directive.RMLDirective):
         canvas.setAuthor(data.get('author'))
         canvas.setCreator(data.get('creator'))
 
-    def process(self, outputFile=None, maxPasses=2):
-        """Process document"""
-        # Reset all reportlab global variables. This is very important for
-        # ReportLab not to fail.
-        reportlab.rl_config._reset()
-
+    def _setUp(self):
+        # Reset all reportlab global variables, unless other documents are
+        # rendered at the same time. This is very important for ReportLab not
+        # to fail. Our colors mapping is added to the default ones.
         debug = self.getAttributeValues(select=('debug',), valuesOnly=True)[0]
-        if not debug:
-            reportlab.rl_config.shapeChecking = 0
+        self._renderingState = rlfix.beginRendering(
+            self.colors, 1 if debug else 0)
 
-        # Add our colors mapping to the default ones.
-        colors.toColor.setExtraColorsNameSpace(self.colors)
+    def _tearDown(self):
+        rlfix.endRendering(self._renderingState)
 
-        if outputFile is None:
-            # TODO: This is relative to the input file *not* the CWD!!!
-            outputFile = open(self.element.get('filename'), 'wb')
+    def getParagraphCacheStats(self):
+        """Return the hits, misses and hit rate of the paragraph cache.
 
-        # Create a temporary output file, so that post-processors can
-        # massage the output
-        self.outputFile = tempOutput = io.BytesIO()
+        Paragraphs with dynamic fragments, like ``pageNumber`` or
+        ``getName``, are never cached and count as misses.
+        """
+        stats = self.paragraphCache.stats()
+        stats['hitRate'] *= 100
+        return stats
 
-        # Process common sub-directives
-        self.processSubDirectives(select=('docinit', 'stylesheet'))
+    def _processContent(self, maxPasses):
+        self.deferredNames = None
+        if self.strategy == 'deferred':
+            self.deferredNames = DeferredNames(self)
 
         # Handle Page Drawing Documents
         if self.element.find('pageDrawing') is not None:
             kwargs = dict(self.getAttributeValues(
-                select=('compression', 'debug'),
+                select=('compression', 'debug', 'invariant'),
                 attrMapping={'compression': 'pageCompression',
                              'debug': 'verbosity'}
             ))
             kwargs['cropMarks'] = self.cropMarks
 
-            self.canvas = self.canvasClass(tempOutput, **kwargs)
+            self.canvas = self.canvasClass(self.outputFile, **kwargs)
             self._initCanvas(self.canvas)
-            self.processSubDirectives(select=('pageInfo', 'pageDrawing'))
+            with self._phase('processing'):
+                self.processSubDirectives(
+                    select=('pageInfo', 'pageDrawing'))
+            if self.deferredNames is not None:
+                self.deferredNames.drawForms(self.canvas)
 
             if hasattr(self.canvas, 'AcroForm'):
                 # Makes default values appear in ReportLab >= 3.1.44
@@ -752,30 +847,131 @@ class Document(directive.RMLDirective):
 
         # Handle Flowable-based documents.
         elif self.element.find('template') is not None:
-            self.processSubDirectives(select=('template', 'story'))
+            with self._phase('processing'):
+                if self.doc is None:
+                    self.processSubDirectives(select=('template',))
+                self.processSubDirectives(select=('story',))
             self.doc.beforeDocument = self._beforeDocument
 
             def callback(event, value):
                 if event == 'PASS':
                     self.doc.current_pass = value
+                if self.profiler is not None:
+                    self.profiler.layoutEvent(event, value)
+                self._checkCancelled()
 
             self.doc.setProgressCallBack(callback)
-            self.doc.multiBuild(
-                self.flowables, maxPasses=maxPasses,
-                **{'canvasmaker': self.canvasClass})
+            with self._phase('layout'):
+                self.doc.multiBuild(
+                    self.flowables, maxPasses=maxPasses,
+                    **{'canvasmaker': self.canvasClass})
+                if self.profiler is not None:
+                    self.profiler.endLayout()
+
+    def _checkCancelled(self):
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise RenderingCancelled(
+                'Rendering of %s was cancelled.' % self.filename)
+
+    def _needsPostProcessing(self):
+        if not self.postProcessorDirectives:
+            return False
+        return next(
+            self.element.iter(*self.postProcessorDirectives), None) is not None
+
+    def _openOutput(self, outputFile):
+        """Return the real output file and a flag whether to close it.
+
+        The output file can also be a file descriptor. The PDF is only
+        buffered in memory when post-processors need to massage the output.
+        Otherwise it is written straight into the output file.
+        """
+        close = False
+        if outputFile is None:
+            # TODO: This is relative to the input file *not* the CWD!!!
+            outputFile = open(self.element.get('filename'), 'wb')
+            close = True
+        elif isinstance(outputFile, int):
+            outputFile = open(outputFile, 'wb', closefd=False)
+            close = True
+        if self._needsPostProcessing():
+            self.outputFile = io.BytesIO()
+        else:
+            self.outputFile = DirectOutput(self, outputFile)
+        return outputFile, close
+
+    def _postProcess(self, outputFile):
+        tempOutput = self.outputFile
+        if isinstance(tempOutput, DirectOutput):
+            tempOutput = tempOutput.buffer
+            if tempOutput is None:
+                return
 
         # Process all post processors
-        for name, processor in self.postProcessors:
-            tempOutput.seek(0)
-            tempOutput = processor.process(tempOutput)
+        options = dict(self.getAttributeValues(
+            select=('objectStreams', 'compressStreams', 'invariant')))
+        invariant = options.get('invariant')
+        if invariant is None:
+            invariant = rl_config.invariant
+        pipeline = postprocess.Pipeline(
+            self.postProcessors,
+            options.get('objectStreams', self.postProcessObjectStreams),
+            options.get('compressStreams', self.postProcessCompression),
+            self._phase, bool(invariant))
+        tempOutput = pipeline.process(tempOutput)
 
         # Save the result into our real output file
-        tempOutput.seek(0)
-        outputFile.write(tempOutput.getvalue())
-
-        # Cleanup.
-        colors.toColor.setExtraColorsNameSpace({})
-        reportlab.rl_config.shapeChecking = 1
+        with tempOutput.getbuffer() as data:
+            outputFile.write(data)
+
+    def process(self, outputFile=None, maxPasses=2, strategy='passes'):
+        """Process document
+
+        The strategy determines how forward references to names, for
+        example the page count, are resolved. ``passes`` lays out the
+        document again, up to ``maxPasses`` times. ``deferred`` draws the
+        names as forms, which are only written once the layout is done, so
+        that a single pass is needed. The deferred names take the width of
+        their default value, so the layout must not depend on their values.
+        """
+        self._setStrategy(strategy)
+        self._setUp()
+        if self.profiler is not None:
+            self.profiler.start()
+        try:
+            outputFile, close = self._openOutput(outputFile)
+
+            # Process common sub-directives
+            with self._phase('processing'):
+                self.processSubDirectives(select=('docinit', 'stylesheet'))
+
+            self._processContent(maxPasses)
+            with self._phase('postProcessing'):
+                self._postProcess(outputFile)
+
+            # Cleanup.
+            if close:
+                outputFile.close()
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop(self.filename)
+            self._tearDown()
+
+    def _phase(self, name):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(name)
+
+    def _setStrategy(self, strategy):
+        if strategy not in REFERENCE_STRATEGIES:
+            raise ValueError(
+                'Unknown reference strategy %r, expected one of %s.' % (
+                    strategy, ', '.join(REFERENCE_STRATEGIES)))
+        self.strategy = strategy
+
+    def isDeferredName(self, name):
+        """Return whether the name is drawn once its value is known."""
+        return self.deferredNames is not None and name not in self.names
 
     def get_name(self, name, default=None):
         if default is None:
@@ -801,3 +997,135 @@ class DummyIndexingFlowable(IndexingFlowable):
     def isSatisfied(self):
         self.i += 1
         return self.i
+
+
+class DeferredNames(IndexingFlowable):
+    """Forward references to names, which are drawn after the layout.
+
+    Every reference is drawn as a form XObject that is shared by all
+    references with the same name and text style. The forms are written once
+    the layout is done and the final values of all names are known.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.forms = {}
+
+    def beforeBuild(self):
+        self.forms = {}
+
+    def afterBuild(self):
+        self.drawForms(self.manager.canvas)
+
+    def getWidth(self, default, fontName, fontSize):
+        """Return the width reserved for a name."""
+        return pdfmetrics.stringWidth(default or '', fontName, fontSize)
+
+    def drawName(self, canvas, name, default, x, y, fontName, fontSize,
+                 color):
+        """Draw the name at the baseline position and return its width."""
+        key = (name, default or '', fontName, fontSize, repr(color))
+        if key not in self.forms:
+            self.forms[key] = ('deferredName%i' % len(self.forms), color)
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.doForm(self.forms[key][0])
+        canvas.restoreState()
+        return self.getWidth(default, fontName, fontSize)
+
+    def drawForms(self, canvas):
+        """Write the forms with the final values of the names."""
+        for key, (formName, color) in self.forms.items():
+            name, default, fontName, fontSize = key[:4]
+            value = self.manager.names.get(name, default)
+            width = pdfmetrics.stringWidth(value, fontName, fontSize)
+            canvas.beginForm(
+                formName, 0, -fontSize, max(width, 1), 2 * fontSize)
+            canvas.setFont(fontName, fontSize)
+            canvas.setFillColor(color)
+            canvas.drawString(0, 0, value)
+            canvas.endForm()
+
+
+def _saveFontRegistry():
+    return (
+        pdfmetrics._typefaces.copy(),
+        pdfmetrics._encodings.copy(),
+        pdfmetrics._fonts.copy(),
+        copy.deepcopy(fonts._tt2ps_map),
+        copy.deepcopy(fonts._ps2tt_map),
+    )
+
+
+def _restoreFontRegistry(registry):
+    typefaces, encodings, fonts_, tt2ps, ps2tt = registry
+    pdfmetrics._typefaces.update(typefaces)
+    pdfmetrics._encodings.update(encodings)
+    pdfmetrics._fonts.update(fonts_)
+    # Mappings of documents rendered at the same time are kept.
+    fonts._tt2ps_map.update(copy.deepcopy(tt2ps))
+    fonts._ps2tt_map.update(copy.deepcopy(ps2tt))
+
+
+class CompiledDocument:
+    """A document whose static parts are only processed once.
+
+    The ``docinit``, ``stylesheet`` and ``template`` directives are processed
+    when the compiled document is created. Every call to ``render()`` only
+    processes the ``story`` (or the page drawings) against that state. Note
+    that resources referenced by the static parts are not reloaded.
+    """
+
+    def __init__(self, element, filename=None, canvasClass=None):
+        self.document = doc = Document(element, canvasClass)
+        if filename:
+            doc.filename = filename
+        self._lock = threading.Lock()
+        doc._setUp()
+        try:
+            doc.outputFile = io.BytesIO()
+            doc.processSubDirectives(select=('docinit', 'stylesheet'))
+            if (element.find('pageDrawing') is None and
+                    element.find('template') is not None):
+                doc.processSubDirectives(select=('template',))
+                self._pageTemplates = doc.doc.pageTemplates
+            self._names = dict(doc.names)
+            self._fonts = _saveFontRegistry()
+        finally:
+            doc._tearDown()
+
+    def render(self, outputFile=None, maxPasses=2, strategy='passes'):
+        """Render the document into the output file.
+
+        See ``Document.process()`` for the strategies. The renderings of a
+        compiled document share its state, so they run one at a time; use
+        several compiled documents to render a template in parallel.
+        """
+        with self._lock:
+            doc = self.document
+            doc._setStrategy(strategy)
+            doc._setUp()
+            close = False
+            try:
+                _restoreFontRegistry(self._fonts)
+                outputFile, close = doc._openOutput(outputFile)
+
+                # Reset all state that is filled while rendering.
+                doc.names = dict(self._names)
+                doc.indexes = {}
+                doc.postProcessors = []
+                docinit = doc.element.find('docinit')
+                if docinit is not None:
+                    DocInit(docinit, doc).processSubDirectives(
+                        select=('startIndex',))
+                if doc.doc is not None:
+                    doc.doc = BaseDocTemplate(
+                        doc.outputFile, pageTemplates=self._pageTemplates,
+                        **doc.templateArgs)
+
+                doc._processContent(maxPasses)
+                doc._postProcess(outputFile)
+            finally:
+                if close:
+                    outputFile.close()
+                doc._tearDown()
@@ -13,9 +13,13 @@
 ##############################################################################
 """Flowable Element Processing
 """
-import copy
+import csv
+import decimal
+import io
 import logging
 import re
+import urllib.parse
+import urllib.request
 from xml.sax.saxutils import unescape
 
 import reportlab.lib.styles
@@ -338,17 +342,20 @@ class Paragraph(Flowable):
                 attrs.append(attrName)
         attrs = self.getAttributeValues(select=attrs)
         if attrs:
-            style = copy.deepcopy(style)
-            for name, value in attrs:
-                setattr(style, name, value)
+            style = stylesheet.StyleOverlay(style, **dict(attrs))
         return style
 
     def process(self):
-        args = dict(self.getAttributeValues(ignore=self.styleAttributes))
+        # The paragraph builds its fragments from the element, so that its
+        # content is not serialized and parsed again.
+        args = dict(self.getAttributeValues(
+            ignore=self.styleAttributes + ['text']))
         if 'style' not in args:
             args['style'] = attr._getStyle(self, self.defaultStyle)
         args['style'] = self.processStyle(args['style'])
         args['manager'] = attr.getManager(self)
+        args['text'] = None
+        args['element'] = self.element
         self.parent.flow.append(self.klass(**args))
 
 
@@ -712,21 +719,96 @@ class ITableBulkData(interfaces.IRMLDirectiveSignature):
         description='The bulk data.',
         splitre=re.compile('\n'),
         value_type=attr.Sequence(splitre=re.compile(','),
-                                 value_type=attr.Text())
-    )
+                                 value_type=attr.Text()),
+        required=False)
+
+    src = attr.File(
+        title='Source',
+        description=('A CSV file the rows are read from instead of the '
+                     'content of the element.'),
+        doNotOpen=True,
+        required=False)
+
+    fieldDelim = attr.Text(
+        title='Field Delimiter',
+        description=('The delimiter of the fields in the source file. Use '
+                     '"\\t" for tab separated files. Defaults to a comma or '
+                     'a tab for files ending with ".tsv".'),
+        required=False)
+
+    encoding = attr.Text(
+        title='Encoding',
+        description='The encoding of the source file.',
+        default='utf-8',
+        required=False)
+
+    headerRows = attr.Integer(
+        title='Header Rows',
+        description=('The number of rows at the start of the data that are '
+                     'headings. They are not converted by the column types.'),
+        default=0,
+        required=False)
+
+    columnTypes = attr.Sequence(
+        title='Column Types',
+        description=('The types the values of the columns are converted to. '
+                     'Columns without a type and empty values are kept as '
+                     'text.'),
+        value_type=attr.Choice(
+            choices={'str': str, 'int': int, 'float': float,
+                     'decimal': decimal.Decimal}),
+        required=False)
 
 
 class TableBulkData(directive.RMLDirective):
     signature = ITableBulkData
 
+    def openSource(self, url, encoding):
+        parsed = urllib.parse.urlparse(url)
+        if parsed.scheme == 'file':
+            fileObj = open(urllib.request.url2pathname(parsed.path), 'rb')
+        else:
+            fileObj = utils.open_for_read(url)
+        return io.TextIOWrapper(fileObj, encoding=encoding, newline='')
+
+    def readSource(self, src, fieldDelim=None, encoding='utf-8', **kw):
+        if fieldDelim is None:
+            fieldDelim = '\t' if src.lower().endswith('.tsv') else ','
+        fieldDelim = fieldDelim.replace('\\t', '\t')
+        with self.openSource(src, encoding) as file:
+            for row in csv.reader(file, delimiter=fieldDelim):
+                if row:
+                    yield [value.strip() for value in row]
+
+    def convertRows(self, rows, headerRows=0, columnTypes=None, **kw):
+        for index, row in enumerate(rows):
+            if index >= headerRows and columnTypes:
+                for col, (value, type) in enumerate(zip(row, columnTypes)):
+                    if not value:
+                        continue
+                    try:
+                        row[col] = type(value)
+                    except (ValueError, decimal.InvalidOperation):
+                        raise ValueError(
+                            'Cannot convert %r in row %i, column %i to %s. '
+                            '%s' % (value, index + 1, col + 1,
+                                    type.__name__, attr.getFileInfo(self)))
+            yield row
+
     def process(self):
-        self.parent.rows = self.getAttributeValues(valuesOnly=True)[0]
+        args = dict(self.getAttributeValues(ignore=('content',)))
+        if 'src' in args:
+            rows = self.readSource(**args)
+        else:
+            rows = self.getAttributeValues(
+                select=('content',), valuesOnly=True)[0]
+        self.parent.rows = list(self.convertRows(rows, **args))
 
 
 class BlockTableStyle(stylesheet.BlockTableStyle):
 
     def process(self):
-        self.style = copy.deepcopy(self.parent.style)
+        self.style = stylesheet.TableStyleOverlay(self.parent.style)
         attrs = self.getAttributeValues()
         for name, value in attrs:
             setattr(self.style, name, value)
@@ -780,14 +862,131 @@ class IBlockTable(interfaces.IRMLDirectiveSignature):
         description='Allow table rows to span multiple pages',
         required=False)
 
+    longTable = attr.Boolean(
+        title='Long Table',
+        description=('Use the long table of ReportLab, which only lays out '
+                     'the rows needed to fill a frame.'),
+        required=False)
+
+    chunkRows = attr.Integer(
+        title='Chunk Rows',
+        description=('Lay out the table a page at a time, starting with '
+                     'this many rows, so that the layout time grows '
+                     'linearly with the number of rows. Header rows are '
+                     'repeated on every page. Columns without a width get '
+                     'their natural width in the first rows. About the '
+                     'number of rows per page works best.'),
+        required=False)
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _cellRectangles(cells):
+    """Cover a set of ``(row, col)`` cells with rectangles.
+
+    Contiguous cells of a row are joined first, then equal column ranges of
+    consecutive rows. Returns ``((col0, row0), (col1, row1))`` corners.
+    """
+    byRow = {}
+    for row, col in sorted(cells):
+        byRow.setdefault(row, []).append(col)
+    rects = []
+    opened = {}
+    for row in sorted(byRow):
+        segments = []
+        for col in byRow[row]:
+            if segments and segments[-1][1] == col - 1:
+                segments[-1][1] = col
+            else:
+                segments.append([col, col])
+        extended = {}
+        for col0, col1 in segments:
+            start = opened.pop((col0, col1), None)
+            if start is None or start[1] != row - 1:
+                if start is not None:
+                    rects.append(((col0, start[0]), (col1, start[1])))
+                start = (row, row)
+            extended[(col0, col1)] = (start[0], row)
+        for (col0, col1), (row0, row1) in opened.items():
+            rects.append(((col0, row0), (col1, row1)))
+        opened = extended
+    for (col0, col1), (row0, row1) in opened.items():
+        rects.append(((col0, row0), (col1, row1)))
+    return rects
+
+
+def _mergeCellCommands(commands, actions):
+    groups = {}
+    for cmd in commands:
+        args = _freeze(cmd[3:])
+        try:
+            hash(args)
+        except TypeError:
+            args = id(cmd)
+        cells = groups.setdefault((cmd[0], args), (cmd, []))[1]
+        cells.append((cmd[1][1], cmd[1][0]))
+    merged = []
+    for cmd, cells in groups.values():
+        for start, end in _cellRectangles(cells):
+            merged.append((
+                actions.index(cmd[0]), len(merged),
+                (cmd[0], list(start), list(end)) + tuple(cmd[3:])))
+    merged.sort(key=lambda item: item[:2])
+    return [cmd for rank, index, cmd in merged]
+
+
+def coalesceCellCommands(commands, actions):
+    """Merge equal single-cell style commands into rectangular ranges.
+
+    Only runs of single-cell commands whose action is listed in ``actions``
+    are merged; any other command ends a run, so that the commands still
+    apply in the original order. Within a run every cell has at most one
+    command per action, so the merged commands are emitted in the order of
+    ``actions``, which must list the lines below and after a cell before the
+    lines above and before it, since the latter are drawn on top.
+    """
+    result = []
+    run = []
+    seen = set()
+    for cmd in commands:
+        cell = None
+        if len(cmd) >= 3 and cmd[0] in actions:
+            start, end = cmd[1], cmd[2]
+            if (tuple(start) == tuple(end) and
+                    all(isinstance(i, int) and i >= 0 for i in start)):
+                cell = (cmd[0], tuple(start))
+        if cell is None or cell in seen:
+            result.extend(_mergeCellCommands(run, actions))
+            run = []
+            seen = set()
+        if cell is None:
+            result.append(cmd)
+            continue
+        seen.add(cell)
+        run.append(cmd)
+    result.extend(_mergeCellCommands(run, actions))
+    return result
+
 
 class BlockTable(Flowable):
     signature = IBlockTable
     klass = reportlab.platypus.Table
+    longKlass = reportlab.platypus.LongTable
     factories = {
         'tr': TableRow,
         'bulkData': TableBulkData,
         'blockTableStyle': BlockTableStyle}
+    # Merge the style commands of single cells into ranges.
+    coalesceCellStyles = True
+    cellActions = (
+        'FONTNAME', 'FONTSIZE', 'TEXTCOLOR', 'LEADING', 'LEFTPADDING',
+        'RIGHTPADDING', 'TOPPADDING', 'BOTTOMPADDING', 'BACKGROUND',
+        'ALIGNMENT', 'VALIGN', 'LINEBELOW', 'LINEABOVE', 'LINEAFTER',
+        'LINEBEFORE')
 
     def process(self):
         attrs = dict(self.getAttributeValues())
@@ -796,14 +995,26 @@ class BlockTable(Flowable):
         if style is None:
             self.style = reportlab.platypus.tables.TableStyle()
         else:
-            self.style = copy.deepcopy(style)
+            self.style = stylesheet.TableStyleOverlay(style)
         hAlign = attrs.pop('alignment', None)
         # Extract all table rows and cells
         self.rows = []
         self.processSubDirectives(None)
+        if self.coalesceCellStyles:
+            self.style._cmds = coalesceCellCommands(
+                self.style._cmds, self.cellActions)
         # Create the table
         repeatRows = attrs.pop('repeatRows', None)
-        table = self.klass(self.rows, style=self.style, **attrs)
+        klass = self.klass
+        if attrs.pop('longTable', False):
+            klass = self.longKlass
+        chunkRows = attrs.pop('chunkRows', None)
+        if chunkRows:
+            table = platypus.ChunkedTable(
+                self.rows, self.style, chunkRows, repeatRows=repeatRows,
+                tableClass=klass, **attrs)
+        else:
+            table = klass(self.rows, style=self.style, **attrs)
         if repeatRows:
             table.repeatRows = repeatRows
         if hAlign:
@@ -1013,6 +1224,8 @@ class IImage(interfaces.IRMLDirectiveSignature):
         choices=interfaces.VALIGN_TEXT_CHOICES,
         required=False)
 
+    svgMode = attr.SVGMode(required=False)
+
 
 class Image(Flowable):
     signature = IImage
@@ -1021,10 +1234,14 @@ class Image(Flowable):
 
     def process(self):
         args = dict(self.getAttributeValues(attrMapping=self.attrMapping))
+        args.pop('svgMode', None)
         preserveAspectRatio = args.pop('preserveAspectRatio', False)
         if preserveAspectRatio:
-            img = utils.ImageReader(args['filename'])
-            args['filename'].seek(0)
+            if isinstance(args['filename'], platypus.SVGImage):
+                img = args['filename']
+            else:
+                img = utils.ImageReader(args['filename'])
+                args['filename'].seek(0)
             iw, ih = img.getSize()
             if 'width' in args and 'height' not in args:
                 args['height'] = args['width'] * ih / iw
@@ -1046,7 +1263,14 @@ class Image(Flowable):
 
         vAlign = args.pop('vAlign', None)
         hAlign = args.pop('hAlign', None)
-        img = self.klass(**args)
+        if isinstance(args['filename'], platypus.SVGImage):
+            svg = args['filename']
+            img = platypus.SVGImage(
+                svg.drawing, svg.name,
+                args.get('width', svg.imageWidth),
+                args.get('height', svg.imageHeight))
+        else:
+            img = self.klass(**args)
         if hAlign:
             img.hAlign = hAlign
         if vAlign:
@@ -1107,6 +1331,8 @@ class IImageAndFlowables(interfaces.IRMLDirectiveSignature):
         choices=('left', 'right'),
         required=False)
 
+    svgMode = attr.SVGMode(required=False)
+
 
 class ImageAndFlowables(Flowable):
     signature = IImageAndFlowables
@@ -1121,10 +1347,18 @@ class ImageAndFlowables(Flowable):
         args = dict(self.getAttributeValues(
             select=('imageName', 'imageWidth', 'imageHeight', 'imageMask'),
             attrMapping=self.attrMapping))
-        img = reportlab.platypus.flowables.Image(**args)
+        if isinstance(args['filename'], platypus.SVGImage):
+            svg = args['filename']
+            img = platypus.SVGImage(
+                svg.drawing, svg.name,
+                args.get('width', svg.imageWidth),
+                args.get('height', svg.imageHeight))
+        else:
+            img = reportlab.platypus.flowables.Image(**args)
         # Create the flowable and add it
         args = dict(self.getAttributeValues(
-            ignore=('imageName', 'imageWidth', 'imageHeight', 'imageMask'),
+            ignore=('imageName', 'imageWidth', 'imageHeight', 'imageMask',
+                    'svgMode'),
             attrMapping=self.attrMapping))
         self.parent.flow.append(
             self.klass(img, flow.flow, **args))
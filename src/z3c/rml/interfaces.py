@@ -84,17 +84,40 @@ LOG_LEVELS = collections.OrderedDict([
 class IRML2PDF(zope.interface.Interface):
     """This is the main public API of z3c.rml"""
 
-    def parseString(xml):
+    def parseString(xml, removeEncodingLine=True, filename=None,
+                    useCache=False):
         """Parse an XML string and convert it to PDF.
 
         The output is a ``StringIO`` object.
+
+        If ``useCache`` is set, the compiled document is taken from the
+        process-wide document cache (see ``compileString``).
+        """
+
+    def compileString(xml, removeEncodingLine=True, filename=None):
+        """Compile an XML string into a reusable document.
+
+        The static parts of the document (``docinit``, ``stylesheet`` and
+        ``template``) are only processed once. The compiled document is
+        stored in a process-wide LRU cache keyed by the hash of the source.
+        Calling ``render(outputFile)`` on the result produces the PDF.
         """
 
-    def go(xmlInputName, outputFileName=None, outDir=None, dtdDir=None):
+    def go(xmlInputName, outputFileName=None, outDir=None, dtdDir=None,
+           prof=None):
         """Convert RML 2 PDF.
 
         The generated file will be located in the ``outDir`` under the name
-        ``outputFileName``.
+        ``outputFileName``. If a ``profiler.Profiler`` is given as ``prof``,
+        it records where the time of the rendering is spent.
+        """
+
+    def renderMany(jobs, workers=None, outDir=None):
+        """Convert many RML files to PDF using a pool of worker processes.
+
+        A job is either the path of an RML file or a tuple of input and
+        output path. At most ``workers`` processes are used. A list of
+        ``(input, output, error)`` tuples is returned, one per job.
         """
 
 
@@ -112,6 +135,27 @@ class IPostProcessorManager(zope.interface.Interface):
         "List of tuples of the form: (name, processor)")
 
 
+class IPostProcessor(zope.interface.Interface):
+    """Massages the PDF generated by ReportLab."""
+
+    def process(inputFile):
+        """Process the PDF in the input file and return a new file."""
+
+
+class IPdfPostProcessor(IPostProcessor):
+    """A post processor working on an opened PDF.
+
+    All such post processors share a single parse and save of the PDF.
+    """
+
+    def processPdf(pdf, sources):
+        """Modify the opened ``pikepdf.Pdf`` in place.
+
+        Other PDFs are opened and copied through ``sources``, the
+        ``postprocess.SourcePdfs`` shared by all post processors of the run.
+        """
+
+
 class ICanvasManager(zope.interface.Interface):
     """A manager for the canvas."""
     canvas = zope.interface.Attribute("Canvas")
@@ -13,11 +13,12 @@
 ##############################################################################
 """Page Drawing Related Element Processing
 """
-import io
+import zope.interface
 
 from z3c.rml import attr
 from z3c.rml import directive
 from z3c.rml import interfaces
+from z3c.rml import postprocess
 
 
 try:
@@ -29,14 +30,16 @@ except ImportError:
     pikepdf = None
 
 
-def mergePage(layerPage, mainPage, pdf, name) -> None:
-    contentsForName = pdf.copy_foreign(
-        pikepdf.Page(layerPage).as_form_xobject()
-    )
+def mergePage(layerPage, mainPage, pdf, name, form=None) -> None:
+    if form is None:
+        form = pdf.copy_foreign(pikepdf.Page(layerPage).as_form_xobject())
     newContents = b'q\n %s Do\nQ\n' % (name.encode())
-    if not mainPage.Resources.get("/XObject"):
-        mainPage.Resources["/XObject"] = pikepdf.Dictionary({})
-    mainPage.Resources["/XObject"][name] = contentsForName
+    # Pages may share their resources, for example pages included several
+    # times, so the page gets its own resources before the form is added.
+    resources = pikepdf.Dictionary(mainPage.Resources)
+    resources["/XObject"] = pikepdf.Dictionary(resources.get("/XObject", {}))
+    resources["/XObject"][name] = form
+    mainPage.Resources = resources
     # Use the MediaBox from the merged page
     mainPage.MediaBox = pikepdf.Array(layerPage.MediaBox)
     mainPage.contents_add(
@@ -45,25 +48,28 @@ def mergePage(layerPage, mainPage, pdf, name) -> None:
     )
 
 
+@zope.interface.implementer(interfaces.IPdfPostProcessor)
 class MergePostProcessor:
 
     def __init__(self):
         self.operations = {}
 
     def process(self, inputFile1):
-        input1 = pikepdf.open(inputFile1)
+        return postprocess.Pipeline([('MERGE', self)]).process(inputFile1)
+
+    def processPdf(self, input1, sources):
+        # Every file is opened and every merged page copied only once.
         count = 0
         for (num, page) in enumerate(input1.pages):
             if num in self.operations:
                 for mergeFile, mergeNumber in self.operations[num]:
-                    mergePdf = pikepdf.open(mergeFile)
-                    toMerge = mergePdf.pages[mergeNumber]
+                    toMerge = sources.open(mergeFile).pages[mergeNumber]
+                    form = sources.copyForeign(
+                        mergeFile, ('form', mergeNumber),
+                        lambda source, number=mergeNumber:
+                            source.pages[number].as_form_xobject())
                     name = f"/Fx{count}"
-                    mergePage(toMerge, page, input1, name)
-
-        outputFile = io.BytesIO()
-        input1.save(outputFile)
-        return outputFile
+                    mergePage(toMerge, page, input1, name, form)
 
 
 class IMergePage(interfaces.IRMLDirectiveSignature):
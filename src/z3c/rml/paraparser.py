@@ -13,13 +13,16 @@
 ##############################################################################
 """Paragraph-internal XML parser extensions.
 """
+import re
 import sys
 
+import reportlab.lib.abag
 import reportlab.lib.fonts
 import reportlab.lib.styles
 import reportlab.lib.utils
 import reportlab.platypus.paragraph
 import reportlab.platypus.paraparser
+from lxml import etree
 
 
 class ParaFragWrapper(reportlab.platypus.paraparser.ParaFrag):
@@ -92,8 +95,19 @@ class GetNameFragment(ParaFragWrapper):
         reportlab.platypus.paraparser.ParaFrag.__init__(self, **attributes)
         self.id = attributes['id']
         self.default = attributes.get('default')
+        self.manager = attributes.get('manager')
 
     def _get_text(self):
+        manager = self.manager
+        if manager is not None and manager.isDeferredName(self.id):
+            # Names that are not known yet are drawn by a callback, which
+            # reserves the width of the default value.
+            self.cbDefn = reportlab.lib.abag.ABag(
+                kind='onDraw', name='_deferredName', label=self,
+                width=manager.deferredNames.getWidth(
+                    self.default, self.fontName, self.fontSize))
+            return ''
+        self.__dict__.pop('cbDefn', None)
         canvas = self._get_canvas()
         return canvas.manager.get_name(self.id, self.default)
 
@@ -137,6 +151,56 @@ class SpanStyle(reportlab.lib.styles.PropertySet):
     defaults = {}
 
 
+# The characters that are escaped when the paragraph is serialized and the
+# entity references the parser reports for them.
+ESCAPED = re.compile('([&<>])')
+ENTITIES = {'&': 'amp', '<': 'lt', '>': 'gt'}
+# Elements whose content the parser does not parse.
+RAW_TAGS = ('script', 'style')
+
+DATA, ENTITY, START, END = range(4)
+
+
+def collapseWhitespace(text):
+    """Collapse whitespace like `cleanBlockQuotedText()` does."""
+    words = text.split()
+    if not words:
+        return ' ' if text else ''
+    collapsed = ' '.join(words)
+    if text[0].isspace():
+        collapsed = ' ' + collapsed
+    if text[-1].isspace():
+        collapsed += ' '
+    return collapsed
+
+
+def walkContent(element, events):
+    """Append the parser events for the content of the element.
+
+    Return False if the content cannot be parsed like its serialization.
+    """
+    events.append((DATA, element.text))
+    for child in element:
+        if child.tag is etree.Entity:
+            events.append((ENTITY, child.name))
+        elif isinstance(child.tag, str):
+            tag = child.tag.lower()
+            if '{' in tag or tag in RAW_TAGS:
+                return False
+            attrs = []
+            for name, value in child.items():
+                if '{' in name:
+                    return False
+                attrs.append((name.lower(), collapseWhitespace(value)))
+            events.append((START, tag, attrs))
+            if not walkContent(child, events):
+                return False
+            events.append((END, tag))
+        # Comments and processing instructions are ignored by the parser.
+        events.append((DATA, child.tail))
+    return True
+
+
 class Z3CParagraphParser(reportlab.platypus.paraparser.ParaParser):
     """Extensions to paragraph-internal XML parsing."""
 
@@ -147,12 +211,74 @@ class Z3CParagraphParser(reportlab.platypus.paraparser.ParaParser):
             self, *args, **kwargs)
         self.manager = manager
         self.in_eval = False
+        # Whether the fragments can be reused for another paragraph with the
+        # same text and style.
+        self.cacheable = True
 
     def findSpanStyle(self, style):
         from z3c.rml import attr
         return attr._getStyle(self.manager, style)
 
+    def parseElement(self, element, style):
+        """Parse the content of the element like `parse()` parses its text.
+
+        The content is walked instead of being serialized and parsed again.
+        None is returned if that is not possible, for example because the
+        content uses namespaces.
+        """
+        if len(element) and element[0].tag == 'para' \
+                and not (element.text or '').strip():
+            # The inner paragraph replaces the outer one.
+            return None
+        events = []
+        if not walkContent(element, events):
+            return None
+        events = [
+            (DATA, collapseWhitespace(event[1] or ''))
+            if event[0] == DATA else event for event in events]
+        # The content is stripped as a whole.
+        events[0] = (DATA, events[0][1].lstrip())
+        if events[-1][0] == DATA:
+            events[-1] = (DATA, events[-1][1].rstrip())
+
+        self._setup_for_parse(style)
+        try:
+            self.handle_starttag('para', {})
+            for event in events:
+                if event[0] == DATA:
+                    self.handleText(event[1])
+                elif event[0] == ENTITY:
+                    self.handle_entityref(event[1])
+                elif event[0] == START:
+                    self.handle_starttag(event[1], event[2])
+                else:
+                    self.handle_endtag(event[1])
+            self.handle_endtag('para')
+        except Exception:
+            from z3c.rml import attr
+            reportlab.lib.utils.annotateException(
+                '\nparagraph text %s caused exception'
+                % ascii(attr.getXMLContent(element)))
+        return self._complete_parse()
+
+    def handleText(self, text):
+        # Report the escaped characters as entity references, like the
+        # parser does for the serialized text.
+        for index, part in enumerate(ESCAPED.split(text)):
+            if index % 2:
+                self.handle_entityref(ENTITIES[part])
+            elif part:
+                self.handle_data(part)
+
+    def handle_starttag(self, tag, attrs):
+        # Sequences are incremented while parsing.
+        if tag.lower().startswith('seq'):
+            self.cacheable = False
+        reportlab.platypus.paraparser.ParaParser.handle_starttag(
+            self, tag, attrs)
+
     def startDynamic(self, attributes, klass):
+        self.cacheable = False
         frag = klass(**attributes)
         frag.__dict__.update(self._stack[-1].__dict__)
         frag.__tag__ = klass.__tag__
@@ -163,6 +289,7 @@ class Z3CParagraphParser(reportlab.platypus.paraparser.ParaParser):
         else:
             self.fragList.append(frag)
             self._stack.append(frag)
+        return frag
 
     def endDynamic(self):
         if not self.in_eval:
@@ -222,7 +349,11 @@ class Z3CParagraphParser(reportlab.platypus.paraparser.ParaParser):
         self.endDynamic()
 
     def start_getname(self, attributes):
-        self.startDynamic(attributes, GetNameFragment)
+        in_eval = self.in_eval
+        frag = self.startDynamic(attributes, GetNameFragment)
+        if not in_eval:
+            # Evaluated names need their value, so they cannot be deferred.
+            frag.manager = self.manager
 
     def end_getname(self):
         self.endDynamic()
@@ -248,6 +379,34 @@ class Z3CParagraphParser(reportlab.platypus.paraparser.ParaParser):
             self._stack[-1].frags.append(data)
 
 
+def styleKey(style):
+    """Return a key that identifies the paragraph style.
+
+    Style overlays are created for every paragraph with style attributes, so
+    they are identified by their base style and their own properties.
+    """
+    properties = vars(style)
+    if '_base' not in properties:
+        return id(style)
+    return (styleKey(properties['_base']),) + tuple(sorted(
+        (name, repr(value)) for name, value in properties.items()
+        if name != '_base'))
+
+
+def elementKey(element):
+    """Return a key that identifies the content of the element."""
+    return (element.text,) + tuple(
+        (node.tag, tuple(node.items()), node.text, node.tail)
+        for node in element.iterdescendants())
+
+
+def elementText(element):
+    """Return the cleaned, serialized content of the element."""
+    from z3c.rml import attr
+    return reportlab.platypus.paragraph.cleanBlockQuotedText(
+        attr.getXMLContent(element))
+
+
 class Z3CParagraph(reportlab.platypus.paragraph.Paragraph):
     """Support for custom paraparser with sytles knowledge.
 
@@ -255,7 +414,8 @@ class Z3CParagraph(reportlab.platypus.paragraph.Paragraph):
     """
 
     def __init__(self, text, style, bulletText=None, frags=None,
-                 caseSensitive=1, encoding='utf8', manager=None):
+                 caseSensitive=1, encoding='utf8', manager=None,
+                 element=None):
         self.caseSensitive = caseSensitive
         self.encoding = encoding
         self._setup(
@@ -264,32 +424,38 @@ class Z3CParagraph(reportlab.platypus.paragraph.Paragraph):
             bulletText or getattr(style, 'bulletText', None),
             frags,
             reportlab.platypus.paragraph.cleanBlockQuotedText,
-            manager)
+            manager,
+            element)
 
-    def _setup(self, text, style, bulletText, frags, cleaner, manager):
+    def _setup(self, text, style, bulletText, frags, cleaner, manager,
+               element=None):
 
         # This used to be a global parser to save overhead.  In the interests
         # of thread safety it is being instantiated per paragraph.  On the
         # next release, we'll replace with a cElementTree parser
 
         if frags is None:
-            text = cleaner(text)
-            _parser = Z3CParagraphParser(manager)
-            _parser.caseSensitive = self.caseSensitive
-            style, frags, bulletTextFrags = _parser.parse(text, style)
-            if frags is None:
-                raise ValueError(
-                    "xml parser error (%s) in paragraph beginning\n'%s'"
-                    % (_parser.errors[0], text[:min(30, len(text))]))
-            # apply texttransform to paragraphs
-            reportlab.platypus.paragraph.textTransformFrags(frags, style)
-            # apply texttransform to paragraph fragments
-            for frag in frags:
-                if hasattr(frag, '_style') \
-                        and hasattr(frag._style, 'textTransform'):
-                    reportlab.platypus.paragraph.textTransformFrags(
-                        [frag], frag._style)
-
+            # The fragments are built from the element, if there is one.
+            if element is None:
+                text = cleaner(text)
+                content = text
+            else:
+                content = elementKey(element)
+            # Documents keep the fragments of parsed paragraphs, since the
+            # same text often recurs many times, for example in tables.
+            cache = getattr(manager, 'paragraphCache', None)
+            key = (content, styleKey(style), self.caseSensitive)
+            cached = cache.get(key) if cache is not None else None
+            if cached is None:
+                _parser = Z3CParagraphParser(manager)
+                parsed = self._parse(_parser, text, style, element)
+                if cache is not None and _parser.cacheable:
+                    # The style is kept, so that its id is not reused.
+                    cache.set(key, (style,) + parsed)
+            else:
+                parsed = cached[1:]
+            style, frags, bulletTextFrags = parsed
+            frags = list(frags)
             if bulletTextFrags:
                 bulletText = bulletTextFrags
 
@@ -300,6 +466,33 @@ class Z3CParagraph(reportlab.platypus.paragraph.Paragraph):
         self.bulletText = bulletText
         self.debug = 0
 
+    def _parse(self, _parser, text, style, element=None):
+        _parser.caseSensitive = self.caseSensitive
+        parsed = None
+        if element is not None:
+            parsed = _parser.parseElement(element, style)
+        if parsed is None:
+            # Parse the serialized content instead.
+            if text is None:
+                text = elementText(element)
+            parsed = _parser.parse(text, style)
+        style, frags, bulletTextFrags = parsed
+        if frags is None:
+            if text is None:
+                text = elementText(element)
+            raise ValueError(
+                "xml parser error (%s) in paragraph beginning\n'%s'"
+                % (_parser.errors[0], text[:min(30, len(text))]))
+        # apply texttransform to paragraphs
+        reportlab.platypus.paragraph.textTransformFrags(frags, style)
+        # apply texttransform to paragraph fragments
+        for frag in frags:
+            if hasattr(frag, '_style') \
+                    and hasattr(frag._style, 'textTransform'):
+                reportlab.platypus.paragraph.textTransformFrags(
+                    [frag], frag._style)
+        return style, frags, bulletTextFrags
+
     def breakLines(self, *args, **kwargs):
 
         # ReportLab 3.4.0 introduced caching to Paragraph which breaks how
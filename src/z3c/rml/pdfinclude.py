@@ -28,12 +28,14 @@ try:
     from pikepdf import Dictionary  # noqa: F401 imported but unused
 except ImportError:
     pikepdf = None
+import zope.interface
 from reportlab.platypus import flowables
 
 from z3c.rml import attr
 from z3c.rml import flowable
 from z3c.rml import interfaces
 from z3c.rml import occurence
+from z3c.rml import postprocess
 
 
 log = logging.getLogger(__name__)
@@ -83,13 +85,18 @@ def do(cmd, cwd=None, captureOutput=True, ignoreErrors=False):
     return stdout
 
 
+@zope.interface.implementer(interfaces.IPdfPostProcessor)
 class ConcatenationPostProcessor:
 
     def __init__(self):
         self.operations = []
 
     def process(self, inputFile1):
-        input1 = pikepdf.open(inputFile1)
+        return postprocess.Pipeline([('CONCAT', self)]).process(inputFile1)
+
+    def processPdf(self, input1, sources):
+        # Every file is opened and every included page copied only once.
+        # Pages included several times share their contents.
         offset = 0
         for (
                 start_page, inputFile2, page_ranges, num_pages, on_first_page
@@ -97,29 +104,28 @@ class ConcatenationPostProcessor:
             sp = start_page + offset
             for page_range in page_ranges:
                 prs, pre = page_range
-                input2 = pikepdf.open(inputFile2)
                 for i in range(num_pages):
+                    page = pikepdf.Page(sources.copyForeign(
+                        inputFile2, ('page', prs + i),
+                        lambda source, number=prs + i:
+                            source.pages[number].obj))
                     if on_first_page and i > 0:
                         # The platypus pipeline doesn't insert blank pages if
                         # we are including on the first page. So we need to
                         # insert our additional pages between start_page and
-                        # the next.
-                        input1.pages.insert(sp + i, input2.pages[prs + i])
+                        # the next. A page that is already part of the
+                        # document is copied by pikepdf.
+                        input1.pages.insert(sp + i, page)
                         offset += 1
                     else:
                         # Here, Platypus has added more blank pages, so we'll
                         # emplace our pages. Doing this copy will preserve
                         # references to the original pages if there is a
                         # TOC/Bookmarks.
-                        input1.pages.append(input2.pages[prs + i])
-                        input1.pages[sp + i].emplace(input1.pages[-1])
-                        del input1.pages[-1]
-
-        outputFile = io.BytesIO()
-        input1.save(outputFile)
-        return outputFile
+                        input1.pages[sp + i].emplace(page)
 
 
+@zope.interface.implementer(interfaces.IPostProcessor)
 class PdfTkConcatenationPostProcessor:
 
     EXECUTABLE = 'pdftk'
@@ -13,9 +13,15 @@
 ##############################################################################
 """Style Related Element Processing
 """
+import bisect
+import copy
+import threading
+
 import reportlab.platypus.flowables
+import reportlab.platypus.tables
 import reportlab.rl_config
 import zope.interface
+from reportlab.graphics import renderPDF
 from reportlab.rl_config import overlapAttachedSpace
 
 from z3c.rml import interfaces
@@ -81,6 +87,291 @@ class Illustration(reportlab.platypus.flowables.Flowable):
         self.canv.restoreState()
 
 
+# Rendering a drawing sets attributes on it, so drawings shared by documents
+# rendered at the same time are rendered one at a time.
+_drawingLock = threading.Lock()
+
+
+class SVGImage(reportlab.platypus.flowables.Flowable):
+    """An SVG drawing that is embedded as a reusable vector form.
+
+    The drawing is written into a document as a form the first time it is
+    drawn. Every image then only references the form and scales it to its
+    size.
+    """
+
+    def __init__(self, drawing, name, width=None, height=None):
+        reportlab.platypus.flowables.Flowable.__init__(self)
+        self.drawing = drawing
+        self.name = name
+        self.imageWidth = drawing.width if width is None else width
+        self.imageHeight = drawing.height if height is None else height
+        self.drawWidth = self.imageWidth
+        self.drawHeight = self.imageHeight
+
+    def getSize(self):
+        return (self.imageWidth, self.imageHeight)
+
+    def wrap(self, *args):
+        return (self.drawWidth, self.drawHeight)
+
+    # Allow the image to be used like a ReportLab image flowable, for
+    # example within ``ImageAndFlowables``.
+    _restrictSize = reportlab.platypus.flowables.Image._restrictSize
+    _unRestrictSize = reportlab.platypus.flowables.Image._unRestrictSize
+
+    def draw(self):
+        self.drawForm(self.canv, 0, 0, self.drawWidth, self.drawHeight)
+
+    def drawForm(self, canvas, x, y, width, height):
+        if not canvas.hasForm(self.name):
+            canvas.beginForm(
+                self.name, 0, 0, self.drawing.width, self.drawing.height)
+            with _drawingLock:
+                renderPDF.draw(self.drawing, canvas, 0, 0)
+            canvas.endForm()
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.scale(width / self.drawing.width,
+                     height / self.drawing.height)
+        canvas.doForm(self.name)
+        canvas.restoreState()
+
+
+class ChunkedTable(reportlab.platypus.flowables.Flowable):
+    """A long table that is laid out a page at a time.
+
+    ReportLab tables need quadratic time to lay out their rows. This flowable
+    only ever hands the rows of the current page to a table, so that the
+    layout time grows linearly with the number of rows. The table of a page
+    starts with ``chunkRows`` rows and is doubled until it fills the
+    available height. The first ``repeatRows`` rows are repeated at the top
+    of every page and the style commands are rebased onto the rows of each
+    page, so that boxes and grids are closed on every page like the ones of
+    a split table. Spanned rows are never separated.
+
+    Columns without a width get their natural width in the header and the
+    first ``chunkRows`` rows.
+    """
+
+    def __init__(self, rows, style, chunkRows, repeatRows=0,
+                 colWidths=None, rowHeights=None, tableClass=None, **kw):
+        reportlab.platypus.flowables.Flowable.__init__(self)
+        self.rows = rows
+        self.style = style
+        self.chunkRows = max(chunkRows, 1)
+        self.repeatRows = repeatRows or 0
+        self.colWidths = colWidths
+        self.rowHeights = rowHeights
+        self.tableClass = tableClass or reportlab.platypus.tables.Table
+        self.tableArgs = kw
+        self.spaceBefore = getattr(style, 'spaceBefore', 0)
+        self.spaceAfter = getattr(style, 'spaceAfter', 0)
+        self.hAlign = 'CENTER'
+        self.start = self.repeatRows
+        self._table = None
+        self._end = None
+        # State shared by all continuations of the table.
+        self._shared = {}
+
+    def _indexCommands(self):
+        if 'commands' in self._shared:
+            return self._shared['commands']
+        numRows = len(self.rows)
+        fixed, wide, narrow = [], [], []
+        for index, cmd in enumerate(self.style.getCommands()):
+            sr, er = cmd[1][1], cmd[2][1]
+            if isinstance(sr, str) or isinstance(er, str):
+                # Special rows, like "splitlast", apply to every chunk.
+                fixed.append((index, cmd))
+                continue
+            sr = sr + numRows if sr < 0 else sr
+            er = er + numRows if er < 0 else er
+            if er - sr < self.chunkRows:
+                narrow.append((sr, index, cmd, er))
+            else:
+                wide.append((sr, index, cmd, er))
+        narrow.sort(key=lambda entry: (entry[0], entry[1]))
+        starts = [entry[0] for entry in narrow]
+        result = self._shared['commands'] = (fixed, wide, narrow, starts)
+        return result
+
+    def _rebaseCommand(self, cmd, sr, er, start, end, header):
+        op, (sc, _), (ec, _) = cmd[:3]
+        args = cmd[3:]
+        last = end - 1
+        ranges = []
+        if sr < header:
+            if er >= start and op != 'ROWBACKGROUNDS':
+                # The range covers the header and the chunk without a gap.
+                ranges.append((sr, min(er, last) - start + header, 0))
+                er = -1
+            else:
+                ranges.append((sr, min(er, header - 1), 0))
+        first, final = max(sr, start), min(er, last)
+        if first <= final:
+            ranges.append(
+                (first - start + header, final - start + header, first - sr))
+        for first, final, offset in ranges:
+            if op == 'ROWBACKGROUNDS' and offset and args[0]:
+                colors = list(args[0])
+                offset = offset % len(colors)
+                args = (colors[offset:] + colors[:offset],) + args[1:]
+            yield (op, (sc, first), (ec, final)) + tuple(args)
+
+    def getCommands(self, start, end, header):
+        """Return the style commands of a chunk, rebased onto its rows."""
+        fixed, wide, narrow, starts = self._indexCommands()
+        selected = dict((index, (sr, cmd, er))
+                        for sr, index, cmd, er in wide)
+        # Narrow commands span less than a chunk, so only the ones starting
+        # shortly before the chunk or within the header can overlap it.
+        lower = bisect.bisect_left(starts, start - self.chunkRows)
+        upper = bisect.bisect_left(starts, end)
+        headerEnd = bisect.bisect_left(starts, header)
+        for sr, index, cmd, er in narrow[:headerEnd] + narrow[lower:upper]:
+            selected[index] = (sr, cmd, er)
+        commands = list(fixed)
+        for index, (sr, cmd, er) in selected.items():
+            commands.extend(
+                (index, rebased) for rebased in self._rebaseCommand(
+                    cmd, sr, er, start, end, header))
+        commands.sort(key=lambda entry: entry[0])
+        return [cmd for index, cmd in commands]
+
+    def _indexSpans(self):
+        if 'spans' in self._shared:
+            return self._shared['spans']
+        numRows = len(self.rows)
+        spans = []
+        for cmd in self.style.getCommands():
+            sr, er = cmd[1][1], cmd[2][1]
+            if (cmd[0] != 'SPAN' or
+                    isinstance(sr, str) or isinstance(er, str)):
+                continue
+            sr = sr + numRows if sr < 0 else sr
+            er = er + numRows if er < 0 else er
+            if sr > er:
+                sr, er = er, sr
+            if sr < er:
+                spans.append((sr, er))
+        spans.sort()
+        self._shared['spans'] = spans
+        return spans
+
+    def chunkEnd(self, end):
+        """Return the end of a chunk, moved past the spans crossing it."""
+        spans = self._indexSpans()
+        moved = True
+        while moved:
+            moved = False
+            for sr, er in spans[:bisect.bisect_left(spans, (end,))]:
+                if er >= end:
+                    end = er + 1
+                    moved = True
+        return min(end, len(self.rows))
+
+    def makeTable(self, start, end, colWidths):
+        """Create a table of the header and the rows from start to end."""
+        header = self.repeatRows
+        rows = self.rows[:header] + self.rows[start:end]
+        rowHeights = self.rowHeights
+        if rowHeights is not None:
+            rowHeights = (
+                list(rowHeights[:header]) + list(rowHeights[start:end]))
+        style = reportlab.platypus.tables.TableStyle(
+            self.getCommands(start, end, header))
+        table = self.tableClass(
+            rows, colWidths=colWidths, rowHeights=rowHeights, style=style,
+            **self.tableArgs)
+        table.repeatRows = header
+        table.spaceBefore = self.spaceBefore if start == header else 0
+        table.spaceAfter = self.spaceAfter if end >= len(self.rows) else 0
+        table.hAlign = self.hAlign
+        if end >= len(self.rows):
+            table.keepWithNext = getattr(self, 'keepWithNext', 0)
+        return table
+
+    def getColWidths(self, availWidth):
+        """Return column widths that are shared by all pages.
+
+        Columns without a width get their natural width in a table of the
+        header and the first chunk, so that the rows are not all laid out
+        up front.
+        """
+        if 'colWidths' in self._shared:
+            return self._shared['colWidths']
+        colWidths = self.colWidths
+        if colWidths is None or None in colWidths:
+            table = self.makeTable(
+                self.repeatRows,
+                self.chunkEnd(self.repeatRows + self.chunkRows), colWidths)
+            table.wrapOn(self.canv, availWidth, 0x7fffffff)
+            colWidths = list(table._colWidths)
+        self._shared['colWidths'] = colWidths
+        return colWidths
+
+    def getTable(self, availWidth, availHeight):
+        """Return the table of the rows filling the available height.
+
+        The table holds all remaining rows or is higher than the available
+        height, so that it is split at the end of the page.
+        """
+        colWidths = self.getColWidths(availWidth)
+        table, end = self._table, self._end
+        if table is None:
+            end = self.chunkEnd(self.start + self.chunkRows)
+            table = self.makeTable(self.start, end, colWidths)
+        while True:
+            width, height = table.wrapOn(self.canv, availWidth, availHeight)
+            if height > availHeight or end >= len(self.rows):
+                break
+            end = self.chunkEnd(end + (end - self.start))
+            table = self.makeTable(self.start, end, colWidths)
+        self._table, self._end = table, end
+        return table
+
+    def continuation(self, start):
+        chunk = copy.copy(self)
+        chunk.start = start
+        chunk._table = chunk._end = None
+        # Do not inherit the layout state of the document template.
+        chunk.__dict__.pop('_postponed', None)
+        return chunk
+
+    def wrap(self, availWidth, availHeight):
+        table = self.getTable(availWidth, availHeight)
+        self.width, self.height = table._width, table._height
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        table = self.getTable(availWidth, availHeight)
+        if table._height <= availHeight:
+            return [table]
+        parts = table.split(availWidth, availHeight)
+        body = 0
+        if len(parts) == 2:
+            body = len(parts[0]._cellvalues) - table.repeatRows
+        if body <= 0:
+            # Nothing fits here, so the table continues in the next frame.
+            return []
+        first, rest = parts
+        end = self._end
+        if (len(first._cellvalues) + len(rest._cellvalues) - rest.repeatRows
+                != len(table._cellvalues)):
+            # A row was split across the pages; keep the rest of the table.
+            parts = [first, rest]
+        else:
+            parts = [first]
+            end = self.start + body
+        if end < len(self.rows):
+            parts.append(self.continuation(end))
+        return parts
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
+
 class BookmarkPage(BaseFlowable):
     def draw(self):
         self.canv.bookmarkPage(*self.args, **self.kw)
@@ -0,0 +1,162 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Post-Processing of the Generated PDF
+"""
+import contextlib
+import io
+
+from z3c.rml import interfaces
+
+
+try:
+    import pikepdf
+except ImportError:
+    # We don't want to require pikepdf, if you do not want to use the features
+    # in this module.
+    pikepdf = None
+
+
+# The ways object streams are written, see ``pikepdf.ObjectStreamMode``.
+OBJECT_STREAM_MODES = ('preserve', 'disable', 'generate')
+
+
+def savePdf(pdf, objectStreams='preserve', compress=True, invariant=False):
+    """Save the PDF into a new in-memory file.
+
+    The ID of an ``invariant`` PDF is computed from its content, so that it
+    stays the same on every rendering.
+    """
+    if objectStreams not in OBJECT_STREAM_MODES:
+        raise ValueError(
+            'Unknown object stream mode %r, expected one of %s.' % (
+                objectStreams, ', '.join(OBJECT_STREAM_MODES)))
+    outputFile = io.BytesIO()
+    pdf.save(
+        outputFile, deterministic_id=invariant,
+        object_stream_mode=getattr(pikepdf.ObjectStreamMode, objectStreams),
+        compress_streams=compress)
+    return outputFile
+
+
+class SourcePdfs:
+    """The source PDFs of a post processor run, each opened once.
+
+    The sources are keyed by their content. The file cache hands out the
+    same ``bytes`` object for every reference to a file, so the lookup is
+    cheap. The objects copied into the target PDF are cached as well, so
+    that a page used many times is only copied once.
+
+    The sources must stay open until the target PDF is saved, since the
+    copied streams are read from them lazily. The pipeline creates one per
+    run and closes it after saving.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.sources = {}
+        self.copies = {}
+
+    def close(self):
+        for source in self.sources.values():
+            source.close()
+        self.sources.clear()
+        self.copies.clear()
+
+    def _key(self, inputFile):
+        if isinstance(inputFile, io.BytesIO):
+            return inputFile.getvalue()
+        return inputFile
+
+    def open(self, inputFile):
+        """Return the opened source PDF of the file."""
+        key = self._key(inputFile)
+        source = self.sources.get(key)
+        if source is None:
+            inputFile.seek(0)
+            source = self.sources[key] = pikepdf.open(inputFile)
+        return source
+
+    def copyForeign(self, inputFile, name, factory):
+        """Return the copy of a foreign object in the target PDF.
+
+        ``factory`` is called with the opened source PDF and returns the
+        object to copy. The copy is cached by the source and ``name``, which
+        must tell the kinds of copies of a source apart, e.g.
+        ``('page', 3)``.
+        """
+        key = (self._key(inputFile), name)
+        copy = self.copies.get(key)
+        if copy is None:
+            copy = self.copies[key] = self.pdf.copy_foreign(
+                factory(self.open(inputFile)))
+        return copy
+
+
+class Pipeline:
+    """Runs post processors over the PDF.
+
+    Consecutive post processors providing ``IPdfPostProcessor`` work on the
+    same opened PDF, which is only saved once they are done or a file based
+    post processor follows. They share the ``SourcePdfs`` of the run, so a
+    file that is both included and merged is opened once. ``phase`` returns
+    a context manager for the name of every post processor, e.g. to profile
+    it.
+    """
+
+    def __init__(self, processors, objectStreams='preserve', compress=True,
+                 phase=None, invariant=False):
+        self.processors = processors
+        self.objectStreams = objectStreams
+        self.compress = compress
+        self.phase = phase
+        self.invariant = invariant
+
+    def _phase(self, name):
+        if self.phase is None:
+            return contextlib.nullcontext()
+        return self.phase(name)
+
+    def process(self, inputFile):
+        pdf = sources = None
+        try:
+            for name, processor in self.processors:
+                with self._phase(name):
+                    if interfaces.IPdfPostProcessor.providedBy(processor):
+                        if pdf is None:
+                            inputFile.seek(0)
+                            pdf = pikepdf.open(inputFile)
+                            sources = SourcePdfs(pdf)
+                        processor.processPdf(pdf, sources)
+                        continue
+                    if pdf is not None:
+                        inputFile = self.save(pdf)
+                        self._close(pdf, sources)
+                        pdf = sources = None
+                    inputFile.seek(0)
+                    inputFile = processor.process(inputFile)
+            if pdf is not None:
+                with self._phase('save'):
+                    inputFile = self.save(pdf)
+        finally:
+            if pdf is not None:
+                self._close(pdf, sources)
+        return inputFile
+
+    def _close(self, pdf, sources):
+        sources.close()
+        pdf.close()
+
+    def save(self, pdf):
+        return savePdf(
+            pdf, self.objectStreams, self.compress, self.invariant)
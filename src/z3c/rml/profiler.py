@@ -0,0 +1,283 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Profiling the Rendering of Documents
+
+A profiler is enabled by assigning it to a document before processing it::
+
+  doc.profiler = Profiler(memory=True)
+  doc.process(output)
+  print(doc.profiler.report())
+
+With ``trace`` set, the profiler also records the timeline of the rendering,
+which ``writeTrace()`` saves in the Trace Event Format understood by
+``chrome://tracing`` and Perfetto.
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+class Stats:
+    """The accumulated measurements of a directive."""
+    __slots__ = ('calls', 'total', 'own', 'memory')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.own = 0.0
+        self.memory = 0
+
+    def add(self, total, own, memory):
+        self.calls += 1
+        self.total += total
+        self.own += own
+        self.memory += memory
+
+    def asDict(self):
+        return {
+            'calls': self.calls,
+            'total': self.total,
+            'own': self.own,
+            'memory': self.memory,
+        }
+
+
+class Profiler:
+    """Measures where the time of rendering a document is spent.
+
+    In the processing phase the wall time of every directive is recorded by
+    tag and by source line, both including (``total``) and excluding
+    (``own``) the time of its sub-directives. If ``memory`` is set, the
+    change of the memory traced by ``tracemalloc`` is recorded as well;
+    since ``tracemalloc`` traces the entire process, the numbers are only
+    meaningful if no other document is rendered at the same time.
+
+    In the layout phase the time of every pass and every page is recorded.
+
+    If ``trace`` is set, every phase, directive, pass and page is also kept
+    as a span in ``events``.
+    """
+
+    def __init__(self, memory=False, trace=False):
+        self.memory = memory
+        self.events = [] if trace else None
+        self._origin = time.perf_counter()
+        self._documentStart = None
+        self.phases = collections.OrderedDict()
+        self.directives = {}
+        self.lines = {}
+        self.passes = []
+        self.pages = []
+        self._children = []
+        self._pass = None
+        self._passStart = self._pageStart = None
+        self._stopTracing = False
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stopTracing = True
+        self._documentStart = time.perf_counter()
+
+    def stop(self, filename=None):
+        self.endLayout()
+        if self._stopTracing:
+            tracemalloc.stop()
+            self._stopTracing = False
+        if self._documentStart is not None:
+            self.addSpan(
+                'document', 'document', self._documentStart,
+                time.perf_counter() - self._documentStart,
+                filename=filename)
+            self._documentStart = None
+
+    def addSpan(self, name, category, start, duration, **args):
+        """Record a span of the timeline, if tracing is enabled."""
+        if self.events is None:
+            return
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': duration * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def _tracedMemory(self):
+        return tracemalloc.get_traced_memory()[0] if self.memory else 0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Measure a phase of the rendering.
+
+        Phases with the same name are added up.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            self.addSpan(name, 'phase', start, duration)
+
+    def processDirective(self, directive):
+        """Process the directive and record its measurements."""
+        children = [0.0]
+        self._children.append(children)
+        memory = self._tracedMemory()
+        start = time.perf_counter()
+        try:
+            directive.process()
+        finally:
+            duration = time.perf_counter() - start
+            delta = self._tracedMemory() - memory
+            self._children.pop()
+            if self._children:
+                self._children[-1][0] += duration
+            element = directive.element
+            self.addSpan(
+                element.tag, 'directive', start, duration,
+                line=element.sourceline)
+            for registry, key in (
+                    (self.directives, element.tag),
+                    (self.lines, (element.sourceline, element.tag))):
+                stats = registry.get(key)
+                if stats is None:
+                    stats = registry[key] = Stats()
+                stats.add(duration, duration - children[0], delta)
+
+    def layoutEvent(self, event, value):
+        """Record a progress event of the document template."""
+        now = time.perf_counter()
+        if event == 'PASS':
+            self.endLayout(now)
+            self._pass = value
+            self._passStart = self._pageStart = now
+        elif event == 'PAGE' and self._pass is not None:
+            self.pages.append((self._pass, value, now - self._pageStart))
+            self.addSpan(
+                'page %i' % value, 'layout', self._pageStart,
+                now - self._pageStart, **{'pass': self._pass, 'page': value})
+            self._pageStart = now
+
+    def endLayout(self, now=None):
+        """Finish the measurement of the current pass."""
+        if self._pass is None:
+            return
+        if now is None:
+            now = time.perf_counter()
+        self.passes.append((self._pass, now - self._passStart))
+        self.addSpan(
+            'pass %i' % self._pass, 'layout', self._passStart,
+            now - self._passStart, **{'pass': self._pass})
+        self._pass = None
+
+    def asDict(self):
+        """Return all measurements; times are in seconds, memory in bytes."""
+        directives = []
+        for tag, stats in self.directives.items():
+            data = stats.asDict()
+            data['tag'] = tag
+            directives.append(data)
+        lines = []
+        for (line, tag), stats in self.lines.items():
+            data = stats.asDict()
+            data.update(line=line, tag=tag)
+            lines.append(data)
+        return {
+            'phases': dict(self.phases),
+            'directives': sorted(directives, key=_byOwnTime),
+            'lines': sorted(lines, key=_byOwnTime),
+            'passes': [{'pass': number, 'time': duration}
+                       for number, duration in self.passes],
+            'pages': [{'pass': number, 'page': page, 'time': duration}
+                      for number, page, duration in self.pages],
+        }
+
+    def toJSON(self, indent=2):
+        return json.dumps(self.asDict(), indent=indent)
+
+    def asTrace(self):
+        """Return the timeline in the Trace Event Format."""
+        if self.events is None:
+            raise ValueError('The profiler does not trace.')
+        # Viewers nest spans of the same thread by their order, so longer
+        # spans have to come first when they start at the same time.
+        events = sorted(
+            self.events, key=lambda event: (event['ts'], -event['dur']))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def writeTrace(self, fileObj):
+        """Write the timeline as Trace Event Format JSON into the file."""
+        json.dump(self.asTrace(), fileObj)
+
+    def report(self, limit=20):
+        """Return a text report with the slowest entries first.
+
+        At most ``limit`` source lines and pages are listed.
+        """
+        data = self.asDict()
+        out = []
+        out.append('Phases')
+        for name, duration in data['phases'].items():
+            out.append('  %-20s %10.1f ms' % (name, duration * 1000))
+
+        header = '%8s %10s %10s %12s' % (
+            'calls', 'total ms', 'own ms', 'memory KiB')
+        out.append('')
+        out.append('Directives')
+        out.append('  %-24s %s' % ('tag', header))
+        for entry in data['directives']:
+            out.append('  %-24s %s' % (entry['tag'], _formatStats(entry)))
+
+        out.append('')
+        out.append('Source lines')
+        out.append('  %6s %-17s %s' % ('line', 'tag', header))
+        for entry in data['lines'][:limit]:
+            out.append('  %6s %-17s %s' % (
+                entry['line'], entry['tag'], _formatStats(entry)))
+
+        if data['passes']:
+            out.append('')
+            out.append('Passes')
+            for entry in data['passes']:
+                out.append('  %-20s %10.1f ms' % (
+                    'pass %i' % entry['pass'], entry['time'] * 1000))
+            pages = sorted(data['pages'], key=lambda entry: -entry['time'])
+            out.append('')
+            out.append('Pages')
+            for entry in pages[:limit]:
+                out.append('  %-20s %10.1f ms' % (
+                    'pass %i, page %i' % (entry['pass'], entry['page']),
+                    entry['time'] * 1000))
+        return '\n'.join(out) + '\n'
+
+
+def _byOwnTime(entry):
+    return -entry['own']
+
+
+def _formatStats(entry):
+    return '%8i %10.1f %10.1f %12.1f' % (
+        entry['calls'], entry['total'] * 1000, entry['own'] * 1000,
+        entry['memory'] / 1024.0)
@@ -13,6 +13,14 @@
 ##############################################################################
 """ReportLab fixups.
 """
+import collections.abc
+import contextvars
+import sys
+import threading
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib import sequencer
 from reportlab.lib.sequencer import _type2formatter
 from reportlab.platypus.flowables import LIIndenter
 from reportlab.platypus.flowables import ListFlowable
@@ -20,6 +28,7 @@ from reportlab.platypus.flowables import _computeBulletWidth
 from reportlab.platypus.flowables import _LIParams
 from reportlab.rl_config import register_reset
 
+from z3c.rml import cache
 from z3c.rml import num2words
 
 
@@ -28,33 +37,22 @@ import copy
 
 from reportlab.graphics import testshapes
 from reportlab.lib import fonts
-from reportlab.pdfbase import pdfform
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase import ttfonts
-from reportlab.pdfbase.pdfpattern import PDFPattern
 
 
 _ps2tt_map_original = copy.deepcopy(fonts._ps2tt_map)
 _tt2ps_map_original = copy.deepcopy(fonts._tt2ps_map)
 
 
-def resetPdfForm():
-    pdfform.PDFDOCENC = PDFPattern(pdfform.PDFDocEncodingPattern)
-    pdfform.ENCODING = PDFPattern(
-        pdfform.EncodingPattern, PDFDocEncoding=pdfform.PDFDOCENC)
-    pdfform.GLOBALFONTSDICTIONARY = pdfform.FormFontsDictionary()
-    pdfform.GLOBALRESOURCES = pdfform.FormResources()
-    pdfform.ZADB = PDFPattern(pdfform.ZaDbPattern)
-
-
 def resetFonts():
     # testshapes._setup registers the Vera fonts every time which is a little
     # slow on all platforms. On Windows it lists the entire system font
-    # directory and registers them all which is very slow.
-    pdfmetrics.registerFont(ttfonts.TTFont("Vera", "Vera.ttf"))
-    pdfmetrics.registerFont(ttfonts.TTFont("VeraBd", "VeraBd.ttf"))
-    pdfmetrics.registerFont(ttfonts.TTFont("VeraIt", "VeraIt.ttf"))
-    pdfmetrics.registerFont(ttfonts.TTFont("VeraBI", "VeraBI.ttf"))
+    # directory and registers them all which is very slow. The parsed fonts
+    # are cached, so that a reset does not read the font files again.
+    pdfmetrics.registerFont(cache.getTTFont("Vera", "Vera.ttf"))
+    pdfmetrics.registerFont(cache.getTTFont("VeraBd", "VeraBd.ttf"))
+    pdfmetrics.registerFont(cache.getTTFont("VeraIt", "VeraIt.ttf"))
+    pdfmetrics.registerFont(cache.getTTFont("VeraBI", "VeraBI.ttf"))
     for f in (
         'Times-Roman',
         'Courier',
@@ -65,8 +63,10 @@ def resetFonts():
             'VeraBI'):
         if f not in testshapes._FONTS:
             testshapes._FONTS.append(f)
-    fonts._ps2tt_map = copy.deepcopy(_ps2tt_map_original)
-    fonts._tt2ps_map = copy.deepcopy(_tt2ps_map_original)
+    fonts._ps2tt_map.clear()
+    fonts._ps2tt_map.update(copy.deepcopy(_ps2tt_map_original))
+    fonts._tt2ps_map.clear()
+    fonts._tt2ps_map.update(copy.deepcopy(_tt2ps_map_original))
 
 
 def setSideLabels():
@@ -77,10 +77,235 @@ def setSideLabels():
 setSideLabels()
 
 
-register_reset(resetPdfForm)
 register_reset(resetFonts)
 del register_reset
 
+
+def resetReportLab():
+    """Reset ReportLab like ``rl_config._reset()``.
+
+    The reset hook of ``testshapes`` parses the Vera font files again, which
+    ``resetFonts`` registers from the font cache, so it is skipped. On
+    Windows it also registers the system fonts and still runs. The hooks
+    registered with ReportLab are left alone.
+    """
+    rl_config._startUp()
+    for ref in rl_config._registered_resets[:]:
+        func = ref()
+        if func is None:
+            continue
+        if func is testshapes.resetFonts and sys.platform != 'win32':
+            continue
+        func()
+
+
+# ReportLab keeps some of the state of a rendering in globals. The state
+# below is kept per context instead, so that documents can be rendered in
+# several threads at once.
+
+_extraColors = contextvars.ContextVar('extraColors', default={})
+_shapeChecking = contextvars.ContextVar('shapeChecking', default=1)
+_sequencer = contextvars.ContextVar('sequencer', default=None)
+
+
+class ExtraColors(collections.abc.Mapping):
+    """The color names of the document rendered in the current context."""
+
+    def __getitem__(self, name):
+        return _extraColors.get()[name]
+
+    def __iter__(self):
+        return iter(_extraColors.get())
+
+    def __len__(self):
+        return len(_extraColors.get())
+
+
+class FontRegistry(collections.abc.MutableMapping):
+    """A registry of fonts with a layer for the rendered document.
+
+    Fonts and mappings registered while rendering a document are only seen
+    by that document. All others are shared.
+    """
+
+    _deleted = object()
+
+    def __init__(self, name, shared):
+        self.shared = shared
+        self.layer = contextvars.ContextVar(name, default=None)
+
+    def __getitem__(self, key):
+        layer = self.layer.get()
+        if layer:
+            value = layer.get(key, layer)
+            if value is not layer:
+                if value is self._deleted:
+                    raise KeyError(key)
+                return value
+        return self.shared[key]
+
+    def __setitem__(self, key, value):
+        layer = self.layer.get()
+        if layer is None:
+            self.shared[key] = value
+        else:
+            layer[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        layer = self.layer.get()
+        if layer is None:
+            del self.shared[key]
+        else:
+            layer[key] = self._deleted
+
+    def __iter__(self):
+        layer = self.layer.get()
+        if layer is None:
+            return iter(self.shared)
+        keys = dict.fromkeys(self.shared)
+        keys.update(layer)
+        return (key for key, value in keys.items()
+                if layer.get(key) is not self._deleted)
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __contains__(self, key):
+        layer = self.layer.get()
+        if layer is not None and key in layer:
+            return layer[key] is not self._deleted
+        return key in self.shared
+
+    def clear(self):
+        layer = self.layer.get()
+        if layer is None:
+            self.shared.clear()
+        else:
+            layer.update(dict.fromkeys(self.shared, self._deleted))
+            for key in [key for key in layer if key not in self.shared]:
+                del layer[key]
+
+    def copy(self):
+        return dict(self.items())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.copy(), memo)
+
+    def push(self):
+        """Start a new layer and return the token to remove it."""
+        return self.layer.set({})
+
+
+class ShapeChecking:
+    """Whether shapes are checked in the current context."""
+
+    def __bool__(self):
+        return bool(_shapeChecking.get())
+
+    def __repr__(self):
+        return repr(_shapeChecking.get())
+
+
+def getSequencer():
+    seq = _sequencer.get()
+    if seq is None:
+        seq = sequencer.Sequencer()
+        _sequencer.set(seq)
+    return seq
+
+
+def setSequencer(seq):
+    old = _sequencer.get()
+    _sequencer.set(seq)
+    return old
+
+
+# The globals of ReportLab replaced while documents are rendering, so that
+# ReportLab is left untouched outside of a rendering.
+FONT_REGISTRIES = (
+    (pdfmetrics, '_typefaces'), (pdfmetrics, '_encodings'),
+    (pdfmetrics, '_fonts'), (pdfmetrics, '_dynFaceNames'),
+    (fonts, '_tt2ps_map'), (fonts, '_ps2tt_map'))
+
+registries = []
+_originals = []
+
+
+def installContextState():
+    """Replace the globals of ReportLab with the per-context state."""
+    _originals.append((colors.toColor, 'extraColorsNS',
+                       colors.toColor.extraColorsNS))
+    colors.toColor.setExtraColorsNameSpace(ExtraColors())
+    _originals.append((rl_config, 'shapeChecking', rl_config.shapeChecking))
+    rl_config.shapeChecking = ShapeChecking()
+    for name, func in (('getSequencer', getSequencer),
+                       ('setSequencer', setSequencer)):
+        _originals.append((sequencer, name, getattr(sequencer, name)))
+        setattr(sequencer, name, func)
+    for module, name in FONT_REGISTRIES:
+        shared = getattr(module, name)
+        _originals.append((module, name, shared))
+        registry = FontRegistry(name, shared)
+        setattr(module, name, registry)
+        registries.append(registry)
+
+
+def uninstallContextState():
+    """Restore the globals of ReportLab."""
+    while _originals:
+        obj, name, value = _originals.pop()
+        setattr(obj, name, value)
+    del registries[:]
+
+
+def resetContextState():
+    # Resetting the configuration sets the shape checking flag again.
+    if registries:
+        rl_config.shapeChecking = ShapeChecking()
+
+
+rl_config.register_reset(resetContextState)
+
+_renderingLock = threading.Lock()
+_renderings = 0
+
+
+def beginRendering(extraColors, shapeChecking):
+    """Set up the ReportLab state for rendering a document.
+
+    The global state is only reset and replaced with the per-context state if
+    no other document is being rendered. Return the tokens to pass to
+    `endRendering()`.
+    """
+    global _renderings
+    with _renderingLock:
+        if not _renderings:
+            resetReportLab()
+            installContextState()
+        _renderings += 1
+        layers = [(registry.layer, registry.push())
+                  for registry in registries]
+    return [(_extraColors, _extraColors.set(extraColors)),
+            (_shapeChecking, _shapeChecking.set(shapeChecking)),
+            (_sequencer, _sequencer.set(None))] + layers
+
+
+def endRendering(tokens):
+    """Restore the ReportLab state after rendering a document.
+
+    The globals of ReportLab are restored once no document is rendering.
+    """
+    global _renderings
+    for var, token in reversed(tokens):
+        var.reset(token)
+    with _renderingLock:
+        _renderings -= 1
+        if not _renderings:
+            uninstallContextState()
+
+
 # Support more enumeration formats.
 
 
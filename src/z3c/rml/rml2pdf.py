@@ -14,45 +14,76 @@
 """RML to PDF Converter
 """
 import argparse
+import collections
+import concurrent.futures
+import hashlib
 import io
 import os
 import sys
+import traceback
 
 import zope.interface
 from lxml import etree
 
+from z3c.rml import cache
 from z3c.rml import document
 from z3c.rml import interfaces
+from z3c.rml import profiler
 
 
 zope.interface.moduleProvides(interfaces.IRML2PDF)
 
 
-def parseString(xml, removeEncodingLine=True, filename=None):
+# A cache of compiled documents keyed by the hash of their source.
+documentCache = cache.LRUCache(maxsize=32)
+
+
+def _removeEncodingLine(xml):
+    # RML is a unicode string, but oftentimes documents declare their
+    # encoding using <?xml ...>. Unfortuantely, I cannot tell lxml to
+    # ignore that directive. Thus we remove it.
+    if xml.startswith('<?xml'):
+        xml = xml.split('\n', 1)[-1]
+    return xml
+
+
+def compileString(xml, removeEncodingLine=True, filename=None):
+    if isinstance(xml, str) and removeEncodingLine:
+        xml = _removeEncodingLine(xml)
+    source = xml.encode('utf-8') if isinstance(xml, str) else xml
+    key = (hashlib.sha1(source).hexdigest(), filename)
+    return documentCache.lookup(
+        key,
+        lambda: document.CompiledDocument(
+            etree.fromstring(xml), filename=filename))
+
+
+def parseString(xml, removeEncodingLine=True, filename=None, useCache=False):
+    output = io.BytesIO()
+    if useCache:
+        compileString(xml, removeEncodingLine, filename).render(output)
+        output.seek(0)
+        return output
     if isinstance(xml, str) and removeEncodingLine:
-        # RML is a unicode string, but oftentimes documents declare their
-        # encoding using <?xml ...>. Unfortuantely, I cannot tell lxml to
-        # ignore that directive. Thus we remove it.
-        if xml.startswith('<?xml'):
-            xml = xml.split('\n', 1)[-1]
+        xml = _removeEncodingLine(xml)
     root = etree.fromstring(xml)
     doc = document.Document(root)
     if filename:
         doc.filename = filename
-    output = io.BytesIO()
     doc.process(output)
     output.seek(0)
     return output
 
 
-def go(xmlInputName, outputFileName=None, outDir=None, dtdDir=None):
+def go(xmlInputName, outputFileName=None, outDir=None, dtdDir=None,
+       prof=None):
     if hasattr(xmlInputName, 'read'):
         # it is already a file-like object
         xmlFile = xmlInputName
         xmlInputName = 'input.pdf'
     else:
         with open(xmlInputName, 'rb') as xmlFile:
-            return go(xmlFile, outputFileName, outDir, dtdDir)
+            return go(xmlFile, outputFileName, outDir, dtdDir, prof)
 
     # If an output filename is specified, create an output file for it
     outputFile = None
@@ -65,19 +96,74 @@ def go(xmlInputName, outputFileName=None, outDir=None, dtdDir=None):
             if outDir is not None:
                 outputFileName = os.path.join(outDir, outputFileName)
             with open(outputFileName, 'wb') as outputFile:
-                return go(xmlFile, outputFile, outDir, dtdDir)
+                return go(xmlFile, outputFile, outDir, dtdDir, prof)
 
     if dtdDir is not None:
         sys.stderr.write('The ``dtdDir`` option is not yet supported.\n')
 
-    root = etree.parse(xmlFile).getroot()
+    if prof is None:
+        root = etree.parse(xmlFile).getroot()
+    else:
+        with prof.phase('parse'):
+            root = etree.parse(xmlFile).getroot()
     doc = document.Document(root)
     doc.filename = xmlInputName
+    doc.profiler = prof
 
     # Create a Reportlab canvas by processing the document
     doc.process(outputFile)
 
 
+RenderResult = collections.namedtuple(
+    'RenderResult', ('input', 'output', 'error'))
+
+
+def _renderJob(xmlInputName, outputFileName):
+    try:
+        go(xmlInputName, outputFileName)
+    except Exception:
+        return RenderResult(xmlInputName, outputFileName,
+                            traceback.format_exc())
+    return RenderResult(xmlInputName, outputFileName, None)
+
+
+def renderMany(jobs, workers=None, outDir=None):
+    """Render many RML files using a pool of worker processes.
+
+    Every job is either the path to an RML file, in which case the PDF is
+    written next to it (or into ``outDir``), or a tuple of input and output
+    path. The result is a list of ``RenderResult`` tuples in the order of the
+    jobs; ``error`` contains the formatted traceback if rendering failed.
+    """
+    normalized = []
+    for job in jobs:
+        if isinstance(job, (tuple, list)):
+            xmlInputName, outputFileName = job
+        else:
+            xmlInputName = job
+            outputFileName = os.path.splitext(job)[0] + '.pdf'
+            if outDir is not None:
+                outputFileName = os.path.basename(outputFileName)
+        if outDir is not None:
+            outputFileName = os.path.join(outDir, outputFileName)
+        normalized.append((xmlInputName, outputFileName))
+
+    if workers == 1:
+        return [_renderJob(*job) for job in normalized]
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_renderJob, *job) for job in normalized]
+        results = []
+        for job, future in zip(normalized, futures):
+            try:
+                results.append(future.result())
+            except Exception:
+                # The worker process itself died.
+                results.append(RenderResult(
+                    job[0], job[1], traceback.format_exc()))
+        return results
+
+
 def main(args=None):
     if args is None:
         parser = argparse.ArgumentParser(
@@ -95,15 +181,82 @@ def main(args=None):
             'dtdDir',
             nargs='?',
             help='directory with XML DTD (not yet supported)')
-        pargs = parser.parse_args()
+        parser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            metavar='N',
+            help=('render all given RML files in parallel using N worker '
+                  'processes; every positional argument is an RML file'))
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help=('print the time spent in every directive, pass and page '
+                  'to stderr'))
+        parser.add_argument(
+            '--profile-json',
+            metavar='FILE',
+            help='write the profile as JSON into FILE')
+        parser.add_argument(
+            '--profile-memory',
+            action='store_true',
+            help='also trace the memory allocated by every directive')
+        parser.add_argument(
+            '--profile-trace',
+            metavar='FILE',
+            help=('write the timeline of the rendering into FILE in the '
+                  'Trace Event Format, e.g. for Perfetto'))
+        pargs, extra = parser.parse_known_args()
+        unknown = [arg for arg in extra if arg.startswith('-')]
+        if unknown or (extra and pargs.jobs is None):
+            parser.error('unrecognized arguments: %s' % ' '.join(extra))
+        profiling = (
+            pargs.profile or pargs.profile_json or pargs.profile_memory or
+            pargs.profile_trace)
+        if pargs.jobs is not None and profiling:
+            parser.error('profiling is not supported with --jobs')
+        if pargs.jobs is not None:
+            inputs = [name for name in (
+                pargs.xmlInputName, pargs.outputFileName, pargs.outDir,
+                pargs.dtdDir) if name is not None] + extra
+            return mainMany(inputs, pargs.jobs)
         args = (
             pargs.xmlInputName,
             pargs.outputFileName,
             pargs.outDir,
             pargs.dtdDir)
+        if profiling:
+            return mainProfile(
+                args, pargs.profile_json, pargs.profile_memory,
+                pargs.profile or not (
+                    pargs.profile_json or pargs.profile_trace),
+                pargs.profile_trace)
 
     go(*args)
 
 
+def mainProfile(args, jsonFileName=None, memory=False, report=True,
+                traceFileName=None):
+    prof = profiler.Profiler(memory=memory, trace=traceFileName is not None)
+    go(*args, prof=prof)
+    if report:
+        sys.stderr.write(prof.report())
+    if jsonFileName is not None:
+        with open(jsonFileName, 'w') as jsonFile:
+            jsonFile.write(prof.toJSON())
+    if traceFileName is not None:
+        with open(traceFileName, 'w') as traceFile:
+            prof.writeTrace(traceFile)
+
+
+def mainMany(inputs, workers):
+    failed = 0
+    for result in renderMany(inputs, workers=workers):
+        if result.error is not None:
+            failed += 1
+            sys.stderr.write('Failed to render {}:\n{}\n'.format(
+                result.input, result.error))
+    return 1 if failed else 0
+
+
 if __name__ == '__main__':
     canvas = go(sys.argv[1])
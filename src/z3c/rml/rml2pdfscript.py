@@ -13,11 +13,17 @@
 ##############################################################################
 """RML to PDF Converter
 """
+import logging
+import multiprocessing
 import os
 import subprocess
 import sys
+import threading
+import traceback
 
 
+log = logging.getLogger(__name__)
+
 _fileOpen = None
 
 
@@ -73,8 +79,8 @@ def goSubProcess(xmlInputName, outputFileName, testing=False):
     to a subprocess.
 
     Note: this method does not take care on how much process will started.
-    Probably it's a good idea to use a queue or a global utility which only
-    start a predefined amount of sub processes.
+    Use a ``WorkerPool`` to render with a predefined amount of warm sub
+    processes instead.
     """
     # get the sys path used for this python process
     env = os.environ
@@ -97,11 +103,11 @@ def goSubProcess(xmlInputName, outputFileName, testing=False):
     # run the subprocess in the rml input file folder, this will make it easy
     # to include images. If this doesn't fit, feel free to add a additional
     # home argument, and let this be the default, ri
-    os.chdir(os.path.dirname(xmlInputName))
+    cwd = os.path.dirname(xmlInputName) or None
 
     # start processing in a sub process, raise exception or return None
     try:
-        p = subprocess.Popen(program, executable=py, env=env,
+        p = subprocess.Popen(program, executable=py, env=env, cwd=cwd,
                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
                              stderr=subprocess.PIPE)
     except Exception as e:
@@ -115,6 +121,228 @@ def goSubProcess(xmlInputName, outputFileName, testing=False):
         raise Exception("Subprocess error: %s" % error)
 
 
+WARMUP_RML = '''\
+<document filename="warmup.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1in" y1="1in" width="6in" height="9in"/>
+    </pageTemplate>
+  </template>
+  <story><para>Warmup</para></story>
+</document>
+'''
+
+
+def _serve(conn, warmup):
+    # Import everything and register the default fonts and styles once, so
+    # that the first real request does not pay for it.
+    from z3c.rml import rml2pdf
+    if warmup:
+        rml2pdf.parseString(warmup)
+    home = os.getcwd()
+    conn.send(None)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        kind, args, cwd = request
+        try:
+            # A worker serves one request at a time, so changing the
+            # directory is safe here.
+            os.chdir(cwd or home)
+            if kind == 'file':
+                rml2pdf.go(*args)
+                result = None
+            else:
+                result = rml2pdf.parseString(*args).getvalue()
+        except Exception:
+            conn.send((False, traceback.format_exc()))
+        else:
+            conn.send((True, result))
+    conn.close()
+
+
+class Worker:
+    """A warm worker process that renders one document at a time."""
+
+    def __init__(self, context, warmup):
+        self.conn, childConn = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(childConn, warmup), daemon=True)
+        self.tasks = 0
+        try:
+            self.process.start()
+            childConn.close()
+            # Wait until the worker has warmed up.
+            self.conn.recv()
+        except BaseException:
+            if self.process.pid is not None:
+                self.process.kill()
+                self.process.join()
+            childConn.close()
+            self.conn.close()
+            raise
+
+    def render(self, request, timeout=None):
+        self.tasks += 1
+        self.conn.send(request)
+        if not self.conn.poll(timeout):
+            raise TimeoutError(
+                'Rendering did not finish within %s seconds.' % timeout)
+        return self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+# Forking a process with several threads is unsafe, so the workers are
+# started from a clean process.
+START_METHOD = (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+    else 'spawn')
+
+
+class WorkerPool:
+    """A pool of warm worker processes rendering RML documents.
+
+    Unlike ``goSubProcess``, the interpreter start, the imports and the font
+    registration are paid only once per worker. Each worker is replaced after
+    ``maxTasksPerChild`` renderings (if set) and when a rendering exceeds its
+    timeout. If a replacement cannot be started, it is started again by the
+    next call. The pool can be used from many threads at once; every call
+    blocks until a worker is available. The workers are started with the
+    ``START_METHOD`` of ``multiprocessing``, unless another ``context`` is
+    given.
+    """
+
+    def __init__(self, workers=None, maxTasksPerChild=None, timeout=None,
+                 warmup=WARMUP_RML, context=None):
+        self.size = workers or os.cpu_count() or 1
+        self.maxTasksPerChild = maxTasksPerChild
+        self.timeout = timeout
+        self.warmup = warmup
+        self.context = context or multiprocessing.get_context(START_METHOD)
+        self.closed = False
+        self._condition = threading.Condition()
+        self._idle = []
+        try:
+            for i in range(self.size):
+                self._idle.append(self._startWorker())
+        except BaseException:
+            self.close()
+            raise
+
+    def _startWorker(self):
+        return Worker(self.context, self.warmup)
+
+    def _restartWorker(self):
+        # Replace a worker that was stopped. If the new worker cannot be
+        # started, the slot stays empty and is filled by ``_acquire``.
+        try:
+            return self._startWorker()
+        except Exception:
+            log.exception('Cannot start a worker process.')
+            return None
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle:
+                if self.closed:
+                    raise ValueError('The worker pool is closed.')
+                self._condition.wait()
+            if self.closed:
+                raise ValueError('The worker pool is closed.')
+            worker = self._idle.pop()
+        if worker is None:
+            try:
+                worker = self._startWorker()
+            except BaseException:
+                self._release(None)
+                raise
+        return worker
+
+    def _release(self, worker):
+        # ``None`` releases an empty slot.
+        with self._condition:
+            if not self.closed:
+                self._idle.append(worker)
+                self._condition.notify()
+                return
+        if worker is not None:
+            worker.stop()
+
+    def _dispatch(self, request, timeout):
+        if timeout is None:
+            timeout = self.timeout
+        worker = self._acquire()
+        try:
+            success, result = worker.render(request, timeout)
+        except BaseException:
+            # The worker is in an unknown state, so it is replaced.
+            worker.kill()
+            worker = None
+            raise
+        finally:
+            if (worker is not None and self.maxTasksPerChild and
+                    worker.tasks >= self.maxTasksPerChild):
+                worker.stop()
+                worker = None
+            if worker is None:
+                worker = self._restartWorker()
+            self._release(worker)
+        if not success:
+            raise Exception("Subprocess error: %s" % result)
+        return result
+
+    def go(self, xmlInputName, outputFileName, timeout=None):
+        """Render the RML file into the PDF file in a worker.
+
+        The worker runs in the folder of the input file, so that relative
+        resources can be found.
+        """
+        xmlInputName = os.path.abspath(xmlInputName)
+        outputFileName = os.path.abspath(outputFileName)
+        request = ('file', (xmlInputName, outputFileName),
+                   os.path.dirname(xmlInputName))
+        self._dispatch(request, timeout)
+
+    def parseString(self, xml, filename=None, cwd=None, timeout=None):
+        """Render the RML string in a worker and return the PDF data."""
+        request = ('string', (xml, True, filename), cwd)
+        return self._dispatch(request, timeout)
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            workers, self._idle = self._idle, []
+            self._condition.notify_all()
+        for worker in workers:
+            if worker is not None:
+                worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 if __name__ == '__main__':
     if len(sys.argv) == 5:
         # testing support
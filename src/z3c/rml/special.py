@@ -76,7 +76,13 @@ class TextFlowables:
             canvas.getPageNumber() + int(elem.get('countingFrom', 1)) - 1
         )
 
+    # Names drawn after the layout are replaced by this marker.
+    deferredMarker = '\x00'
+    deferredNames = ()
+
     def getName(self, elem, canvas):
+        if elem in self.deferredNames:
+            return self.deferredMarker
         return self._getManager().get_name(
             elem.get('id'),
             elem.get('default')
@@ -13,11 +13,14 @@
 ##############################################################################
 """Style Related Element Processing
 """
+import collections.abc
 import copy
+import itertools
 
 import reportlab.lib.enums
 import reportlab.lib.styles
 import reportlab.platypus
+import reportlab.platypus.tables
 
 from z3c.rml import SampleStyleSheet
 from z3c.rml import attr
@@ -28,6 +31,79 @@ from z3c.rml import paraparser
 from z3c.rml import special
 
 
+class StyleOverlay:
+    """A style that only stores the properties that differ from its base.
+
+    All other properties are looked up on the base style, so creating an
+    overlay does not copy the base style.
+    """
+
+    def __init__(self, base, **overrides):
+        self.__dict__['_base'] = base
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name):
+        # Private and special names are never looked up on the base, which
+        # also keeps copying an overlay from recursing.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._base, name)
+
+    def __repr__(self):
+        return '<{} {!r} of {!r}>'.format(
+            self.__class__.__name__, self.__dict__, self._base)
+
+
+class CommandView(collections.abc.Sequence):
+    """An append-only view of the commands of a base table style followed by
+    the commands added on top of it."""
+
+    def __init__(self, base, added):
+        self.base = base
+        self.added = added
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if index < len(self.base):
+            return self.base[index]
+        return self.added[index - len(self.base)]
+
+    def __iter__(self):
+        return itertools.chain(self.base, self.added)
+
+
+class TableStyleOverlay(reportlab.platypus.tables.TableStyle):
+    """A table style that extends a base style without copying it.
+
+    Added commands and set options are stored on the overlay, while the
+    commands of the base style are only referenced.
+    """
+
+    def __init__(self, base, **kw):
+        self._base = base
+        self._cmds = []
+        self._opts = dict(base._opts)
+        self._opts.update(kw)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._base, name)
+
+    def __repr__(self):
+        return 'TableStyle(\n%s\n) # end TableStyle' % '  \n'.join(
+            map(repr, self.getCommands()))
+
+    def getCommands(self):
+        return CommandView(self._base.getCommands(), self._cmds)
+
+
 class IInitialize(interfaces.IRMLDirectiveSignature):
     """Do some RML processing initialization."""
     occurence.containing(
@@ -312,6 +312,9 @@ class Template(directive.RMLDirective):
             attrMapping={'debug': '_debug', 'compression': 'pageCompression'})
         args += (('cropMarks', self.parent.cropMarks),)
 
+        # Keep the arguments, so that the document template can be recreated
+        # for every rendering of a compiled document.
+        self.parent.templateArgs = dict(args)
         self.parent.doc = platypus.BaseDocTemplate(
-            self.parent.outputFile, **dict(args))
+            self.parent.outputFile, **self.parent.templateArgs)
         self.processSubDirectives()
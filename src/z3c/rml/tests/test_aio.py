@@ -0,0 +1,148 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test rendering RML from asyncio.
+"""
+import asyncio
+import io
+import threading
+import unittest
+from unittest import mock
+
+from lxml import etree
+
+from z3c.rml import aio
+from z3c.rml import document
+
+
+DOCUMENT_RML = """
+  <!DOCTYPE document SYSTEM "rml_1_0.dtd">
+  <document filename="test.pdf" invariant="1">
+    <template>
+      <pageTemplate id="main">
+        <frame id="first" x1="1in" y1="1in" width="7in" height="9in"/>
+      </pageTemplate>
+    </template>
+    <story>%s</story>
+  </document>
+""".strip()
+
+
+def documentRML(paragraphs=1):
+    return DOCUMENT_RML % ''.join(
+        '<para>Paragraph %i</para>' % i for i in range(paragraphs))
+
+
+class CancelTest(unittest.TestCase):
+
+    def test_process(self):
+        doc = document.Document(etree.fromstring(documentRML()))
+        doc.cancelled = threading.Event()
+        doc.cancelled.set()
+        self.assertRaises(
+            document.RenderingCancelled, doc.process, io.BytesIO())
+
+
+class RenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = aio.Renderer(maxConcurrency=2)
+
+    def tearDown(self):
+        self.renderer.close()
+
+    def test_render(self):
+        output = asyncio.run(self.renderer.render(documentRML()))
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+    def test_error(self):
+        self.assertRaises(
+            etree.XMLSyntaxError, asyncio.run, self.renderer.render('<doc'))
+
+    def test_concurrency(self):
+        active = []
+        maximum = []
+        lock = threading.Lock()
+        render = aio._render
+
+        def tracked(*args):
+            with lock:
+                active.append(None)
+                maximum.append(len(active))
+            try:
+                return render(*args)
+            finally:
+                with lock:
+                    active.pop()
+
+        async def renderAll():
+            return await asyncio.gather(*[
+                self.renderer.render(documentRML(20)) for i in range(6)])
+
+        with mock.patch('z3c.rml.aio._render', tracked):
+            outputs = asyncio.run(renderAll())
+        self.assertEqual(len(outputs), 6)
+        self.assertEqual(max(maximum), 2)
+
+    def test_cancel(self):
+        started = threading.Event()
+        results = []
+        render = aio._render
+
+        def tracked(*args):
+            started.set()
+            try:
+                results.append(render(*args))
+            except document.RenderingCancelled as err:
+                results.append(err)
+                raise
+
+        async def cancel():
+            task = asyncio.ensure_future(
+                self.renderer.render(documentRML(5000)))
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch('z3c.rml.aio._render', tracked):
+            asyncio.run(cancel())
+        # The layout was stopped before the cancelled task returned.
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0], document.RenderingCancelled)
+
+
+class ProcessRenderTest(unittest.TestCase):
+
+    def test_render(self):
+        renderer = aio.Renderer(maxConcurrency=1, processes=True)
+        try:
+            output = asyncio.run(renderer.render(documentRML()))
+        finally:
+            renderer.close()
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+
+class DefaultRendererTest(unittest.TestCase):
+
+    def tearDown(self):
+        aio.getDefaultRenderer().close()
+        aio._defaultRenderer = None
+
+    def test_configure(self):
+        renderer = aio.configure(maxConcurrency=3)
+        self.assertIs(aio.getDefaultRenderer(), renderer)
+        self.assertEqual(renderer.maxConcurrency, 3)
+        output = asyncio.run(aio.render(documentRML()))
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
@@ -0,0 +1,165 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the corpus benchmarks.
+"""
+import copy
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from z3c.rml.benchmark import corpus
+from z3c.rml.benchmark import workloads
+
+
+class CorpusBenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp('z3c.rml-benchmark')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_findDocuments(self):
+        paths = corpus.findDocuments(['tag-para.rml', 'tag-pageNumber*'])
+        self.assertEqual(
+            [os.path.basename(path) for path in paths],
+            ['tag-pageNumber.rml', 'tag-para.rml'])
+
+    def test_runBenchmark(self):
+        paths = corpus.findDocuments(
+            ['tag-para.rml', 'rml-examples-050-header-footer.rml'])
+        results = corpus.runBenchmark(paths, repeat=2, isolate=False)
+        result = results['documents']['tag-para.rml']
+        self.assertEqual(len(result['wall']), 2)
+        self.assertEqual(len(result['cpu']), 2)
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['pages'], 1)
+        self.assertEqual(result['passes'], 1)
+        self.assertGreater(result['peakRss'], 0)
+        # Forward references to names need a second pass.
+        result = results['documents']['rml-examples-050-header-footer.rml']
+        self.assertEqual(result['passes'], 2)
+
+    def test_isolate(self):
+        paths = corpus.findDocuments(['tag-para.rml'])
+        results = corpus.runBenchmark(paths, repeat=1, isolate=True)
+        self.assertIsNone(results['documents']['tag-para.rml']['error'])
+
+    def test_error(self):
+        path = os.path.join(self.tmpdir, 'broken.rml')
+        with open(path, 'w') as file:
+            file.write('<document filename="x.pdf"><template/></document>')
+        results = corpus.runBenchmark([path], repeat=1, isolate=False)
+        result = results['documents']['broken.rml']
+        self.assertIn('Traceback', result['error'])
+
+    def test_compare(self):
+        baseline = {'documents': {
+            'fast.rml': {'wallMedian': 0.001, 'cpuMedian': 0.001,
+                         'peakRss': 100, 'error': None},
+            'slow.rml': {'wallMedian': 0.1, 'cpuMedian': 0.1,
+                         'peakRss': 100, 'error': None},
+        }}
+        results = copy.deepcopy(baseline)
+        self.assertEqual(corpus.compare(baseline, results), [])
+        # Tiny absolute changes are noise.
+        results['documents']['fast.rml']['wallMedian'] = 0.002
+        results['documents']['slow.rml']['cpuMedian'] = 0.2
+        results['documents']['slow.rml']['peakRss'] = 150
+        self.assertEqual(
+            corpus.compare(baseline, results),
+            [('slow.rml', 'cpu', 0.1, 0.2),
+             ('slow.rml', 'peakRss', 100, 150)])
+        self.assertEqual(
+            corpus.compare(baseline, results, threshold=1.5,
+                           rssThreshold=0.5),
+            [])
+        results['documents']['fast.rml']['error'] = 'Traceback'
+        self.assertEqual(
+            corpus.compare(baseline, results, threshold=1.5,
+                           rssThreshold=0.5),
+            [('fast.rml', 'error', None, None)])
+
+    def test_main(self):
+        output = os.path.join(self.tmpdir, 'results.json')
+        args = ['--repeat', '1', '--no-isolate', '--output', output,
+                'tag-para.rml']
+        with mock.patch.object(sys, 'stdout', io.StringIO()):
+            self.assertEqual(corpus.main(args), 0)
+        with open(output) as file:
+            results = json.load(file)
+        # Make the baseline much faster than anything real.
+        baseline = os.path.join(self.tmpdir, 'baseline.json')
+        for metric in ('wallMedian', 'cpuMedian'):
+            results['documents']['tag-para.rml'][metric] = 1e-9
+        with open(baseline, 'w') as file:
+            json.dump(results, file)
+        args = ['--repeat', '1', '--no-isolate', '--baseline', baseline,
+                '--min-time', '0', 'tag-para.rml']
+        with mock.patch.object(sys, 'stdout', io.StringIO()) as stdout:
+            self.assertEqual(corpus.main(args), 1)
+        self.assertIn('2 regressions', stdout.getvalue())
+
+    def test_main_workload(self):
+        args = ['--repeat', '1', '--no-isolate', '--workload', 'story:2']
+        with mock.patch.object(sys, 'stdout', io.StringIO()) as stdout:
+            self.assertEqual(corpus.main(args), 0)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('workload-story-2.rml'))
+
+
+class WorkloadsTest(unittest.TestCase):
+
+    def test_generate(self):
+        for kind in sorted(workloads.WORKLOADS):
+            pages, duration = workloads.measure(workloads.generate(kind, 3))
+            self.assertGreater(pages, 0, kind)
+
+    def test_story(self):
+        # Every chapter starts a new page; the names need a second pass.
+        rml = workloads.story(5)
+        self.assertEqual(workloads.measure(rml)[0], 6)
+        self.assertEqual(rml.count('<getName'), 10)
+
+    def test_mergePage(self):
+        self.assertEqual(
+            workloads.measure(workloads.mergePage(4))[0], 4)
+
+    def test_parseSpec(self):
+        self.assertEqual(workloads.parseSpec('story:10'), ('story', 10))
+        self.assertRaises(ValueError, workloads.parseSpec, 'story')
+        self.assertRaises(ValueError, workloads.parseSpec, 'story:x')
+        self.assertRaises(ValueError, workloads.parseSpec, 'novel:10')
+        self.assertRaises(ValueError, workloads.generate, 'novel', 10)
+
+    def test_main(self):
+        tmpdir = tempfile.mkdtemp('z3c.rml-workloads')
+        try:
+            with mock.patch.object(sys, 'stdout', io.StringIO()):
+                workloads.main(['--kinds', 'linePlot', 'bulkTable',
+                                '--sizes', '5', '--write', tmpdir])
+            self.assertEqual(
+                sorted(os.listdir(tmpdir)),
+                ['workload-bulkTable-5.rml', 'workload-linePlot-5.rml'])
+        finally:
+            shutil.rmtree(tmpdir)
+        with mock.patch.object(sys, 'stdout', io.StringIO()) as stdout:
+            workloads.main(['--kinds', 'linePlot', '--sizes', '5'])
+        self.assertIn('linePlot', stdout.getvalue())
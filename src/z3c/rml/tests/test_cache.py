@@ -0,0 +1,167 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the process-wide caches.
+"""
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import reportlab
+from reportlab import rl_config
+from reportlab.graphics import testshapes
+from reportlab.pdfbase import pdfmetrics
+
+from z3c.rml import cache
+from z3c.rml import rlfix
+from z3c.rml import rml2pdf
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_lookup(self):
+        lru = cache.LRUCache(maxsize=2)
+        self.assertEqual(lru.lookup('a', lambda: 1), 1)
+        self.assertEqual(lru.lookup('a', lambda: 2), 1)
+        self.assertEqual(lru.stats()['hits'], 1)
+        self.assertEqual(lru.stats()['misses'], 1)
+        self.assertEqual(lru.stats()['hitRate'], 0.5)
+
+    def test_maxsize(self):
+        lru = cache.LRUCache(maxsize=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIn('a', lru)
+        self.assertNotIn('b', lru)
+        self.assertEqual(len(lru), 2)
+
+    def test_maxweight(self):
+        lru = cache.LRUCache(maxsize=10, maxweight=5, weigh=len)
+        lru.set('a', b'123')
+        lru.set('b', b'45')
+        lru.set('c', b'6')
+        self.assertNotIn('a', lru)
+        self.assertEqual(lru.weight, 3)
+        # Values larger than the cache are not stored at all.
+        lru.set('d', b'1234567')
+        self.assertNotIn('d', lru)
+
+
+class FontCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fontFile = os.path.join(self.tmpdir, 'Vera.ttf')
+        shutil.copy(
+            os.path.join(os.path.dirname(reportlab.__file__),
+                         'fonts', 'Vera.ttf'),
+            self.fontFile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_getTTFont(self):
+        font = cache.getTTFont('TestVera', self.fontFile)
+        self.assertIs(cache.getTTFont('TestVera', self.fontFile), font)
+        self.assertIsNot(cache.getTTFont('OtherVera', self.fontFile), font)
+
+    def test_getTTFont_modified(self):
+        font = cache.getTTFont('TestVera', self.fontFile)
+        mtime = os.path.getmtime(self.fontFile)
+        os.utime(self.fontFile, (mtime + 10, mtime + 10))
+        self.assertIsNot(cache.getTTFont('TestVera', self.fontFile), font)
+
+    def test_reset(self):
+        rlfix.resetReportLab()
+        font = pdfmetrics.getFont('Vera')
+        rlfix.resetReportLab()
+        self.assertIs(pdfmetrics.getFont('Vera'), font)
+
+    def test_reset_hooks(self):
+        # The reset hooks of ReportLab stay registered for other users.
+        hooks = [ref() for ref in rl_config._registered_resets]
+        self.assertIn(testshapes.resetFonts, hooks)
+        self.assertIn(rlfix.resetFonts, hooks)
+
+
+class ResourceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.imageFile = os.path.join(self.tmpdir, 'logo.gif')
+        shutil.copy(
+            os.path.join(os.path.dirname(__file__), 'input', 'images',
+                         'replogo.gif'),
+            self.imageFile)
+        self.url = 'file:///' + self.imageFile
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_readFile(self):
+        hits = cache.fileCache.hits
+        data = cache.readFile(self.url)
+        self.assertIs(cache.readFile(self.url), data)
+        self.assertEqual(cache.fileCache.hits, hits + 1)
+        with open(self.imageFile, 'rb') as file:
+            self.assertEqual(file.read(), data)
+
+    def test_readFile_modified(self):
+        cache.readFile(self.url)
+        mtime = os.path.getmtime(self.imageFile)
+        os.utime(self.imageFile, (mtime + 10, mtime + 10))
+        misses = cache.fileCache.misses
+        cache.readFile(self.url)
+        self.assertEqual(cache.fileCache.misses, misses + 1)
+
+    def test_readFile_missing(self):
+        url = 'file:///' + os.path.join(self.tmpdir, 'missing.png')
+        self.assertRaises(IOError, cache.readFile, url)
+        self.assertNotIn((url, None), cache.fileCache)
+
+    def test_svg(self):
+        rml = os.path.join(
+            os.path.dirname(__file__), 'input', 'tag-image-svg-vector.rml')
+        rml2pdf.go(rml, io.BytesIO())
+        hits = cache.svgCache.hits
+        rml2pdf.go(rml, io.BytesIO())
+        self.assertGreater(cache.svgCache.hits, hits)
+
+    def test_svg_location(self):
+        # Relative references depend on the location of the SVG, so the
+        # same SVG in two folders is parsed twice.
+        svg = os.path.join(
+            os.path.dirname(__file__), 'input', 'images', 'cylinder.svg')
+        images = []
+        for folder in ('a', 'b'):
+            os.mkdir(os.path.join(self.tmpdir, folder))
+            path = os.path.join(self.tmpdir, folder, 'image.svg')
+            shutil.copy(svg, path)
+            images.append(
+                '<image file="%s" x="0" y="0" width="10" height="10" '
+                'svgMode="vector"/>' % path)
+        rml = (
+            '<document filename="svg.pdf"><pageDrawing>%s</pageDrawing>'
+            '</document>' % ''.join(images))
+        misses = cache.svgCache.misses
+        rml2pdf.parseString(rml)
+        self.assertEqual(cache.svgCache.misses, misses + 2)
+
+    def test_getImageReader(self):
+        reader = cache.getImageReader(self.url)
+        self.assertIs(cache.getImageReader(self.url), reader)
+        self.assertEqual(reader.getSize(), (130, 86))
@@ -0,0 +1,161 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the visual comparison of PDF files.
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from z3c.rml import compare
+from z3c.rml import rml2pdf
+from z3c.rml.benchmark import workloads
+
+
+HAS_GHOSTSCRIPT = shutil.which(compare.GS_COMMAND) is not None
+
+
+class DiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp('z3c.rml-compare')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_diffRatio(self):
+        base = Image.new('RGB', (10, 10), 'white')
+        test = base.copy()
+        self.assertEqual(compare.diffRatio(base, test), 0.0)
+        test.putpixel((1, 1), (250, 255, 255))
+        test.putpixel((2, 2), (0, 0, 0))
+        self.assertEqual(compare.diffRatio(base, test), 0.02)
+        self.assertEqual(
+            compare.diffRatio(base, test, pixelTolerance=10), 0.01)
+        self.assertEqual(
+            compare.diffRatio(base, Image.new('RGB', (10, 11))), 1.0)
+
+    def test_diffRatio_palette(self):
+        # The same colors with different palettes are the same.
+        base = Image.new('RGB', (4, 4), 'white')
+        base.putpixel((0, 0), (255, 0, 0))
+        test = base.quantize(colors=4)
+        self.assertEqual(compare.diffRatio(base.quantize(2), test), 0.0)
+
+    def test_diffImages(self):
+        base = os.path.join(self.tmpdir, 'base.png')
+        test = os.path.join(self.tmpdir, 'test.png')
+        Image.new('RGB', (10, 10), 'white').save(base)
+        image = Image.new('RGB', (10, 10), 'white')
+        image.putpixel((0, 0), (0, 0, 0))
+        image.save(test)
+        self.assertEqual(compare.diffImages(base, test), (0.01, False))
+        self.assertEqual(
+            compare.diffImages(base, test, tolerance=0.01), (0.01, True))
+
+    def test_isSame(self):
+        same = compare.Comparison(
+            'a.pdf', 'b.pdf', [compare.PageDiff(1, 0.0, True)], 1, 1, None)
+        self.assertTrue(compare.isSame(same))
+        self.assertIn('ok', compare.formatComparison(same))
+        differs = same._replace(pages=[compare.PageDiff(1, 0.5, False)])
+        self.assertFalse(compare.isSame(differs))
+        self.assertIn('pages 1', compare.formatComparison(differs))
+        self.assertFalse(compare.isSame(same._replace(testPages=2)))
+        failed = same._replace(error='Cannot run Ghostscript')
+        self.assertFalse(compare.isSame(failed))
+        self.assertIn('ERROR', compare.formatComparison(failed))
+
+    def test_noGhostscript(self):
+        path = os.path.join(self.tmpdir, 'test.pdf')
+        with open(path, 'wb') as pdf:
+            pdf.write(b'%PDF-1.4')
+        with mock.patch.object(compare, 'GS_COMMAND', 'no-such-gs'):
+            self.assertRaises(compare.RasterizeError, compare.rasterize, path)
+            comparison = compare.comparePDFs(path, path)
+        self.assertIn('Cannot run Ghostscript', comparison.error)
+
+    @mock.patch.object(compare, 'gsVersion', return_value='10.01.0')
+    def test_cacheKey(self, gsVersion):
+        cache = compare.RasterCache(self.tmpdir)
+        path = os.path.join(self.tmpdir, 'test.pdf')
+        with open(path, 'wb') as pdf:
+            pdf.write(b'%PDF-1.4')
+        key = cache.key(path, None)
+        self.assertEqual(key, cache.key(path, None))
+        self.assertNotEqual(key, cache.key(path, 150))
+        # Other Ghostscript versions and devices rasterize differently.
+        gsVersion.return_value = '10.02.1'
+        self.assertNotEqual(key, cache.key(path, None))
+        with mock.patch.object(compare, 'GS_DEVICE', 'png16m'):
+            self.assertNotEqual(key, cache.key(path, None))
+        gsVersion.return_value = '10.01.0'
+        with open(path, 'ab') as pdf:
+            pdf.write(b'\n')
+        self.assertNotEqual(key, cache.key(path, None))
+
+    def test_cacheKey_noGhostscript(self):
+        cache = compare.RasterCache(self.tmpdir)
+        path = os.path.join(self.tmpdir, 'test.pdf')
+        with open(path, 'wb') as pdf:
+            pdf.write(b'%PDF-1.4')
+        with mock.patch.object(compare, 'GS_COMMAND', 'no-such-gs'):
+            self.assertRaises(compare.RasterizeError, cache.key, path, None)
+
+
+@unittest.skipUnless(HAS_GHOSTSCRIPT, 'Ghostscript is not installed')
+class ComparePDFsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp('z3c.rml-compare')
+        self.expectedDir = os.path.join(self.tmpdir, 'expected')
+        self.outputDir = os.path.join(self.tmpdir, 'output')
+        os.mkdir(self.expectedDir)
+        os.mkdir(self.outputDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def writePDF(self, directory, name, rml):
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as pdf:
+            pdf.write(rml2pdf.parseString(rml).getvalue())
+        return path
+
+    def test_compareMany(self):
+        story = workloads.story(2)
+        pairs = [
+            (self.writePDF(self.expectedDir, name, rml),
+             self.writePDF(self.outputDir, name, changed))
+            for name, rml, changed in (
+                ('same.pdf', story, story),
+                ('changed.pdf', story, story.replace('Chapter', 'Part')),
+            )]
+        cacheDir = os.path.join(self.tmpdir, 'cache')
+        same, changed = compare.compareMany(pairs, 2, cacheDir=cacheDir)
+        self.assertTrue(compare.isSame(same))
+        self.assertEqual(same.basePages, 3)
+        self.assertFalse(compare.isSame(changed))
+        self.assertEqual(len(os.listdir(cacheDir)), 1)
+
+        args = [self.expectedDir, self.outputDir, '--workers', '1',
+                '--cache-dir', cacheDir]
+        with mock.patch.object(sys, 'stdout', io.StringIO()) as stdout:
+            self.assertEqual(compare.main(args), 1)
+        self.assertIn('1 of 2 files differ', stdout.getvalue())
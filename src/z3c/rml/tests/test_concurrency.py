@@ -0,0 +1,182 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test rendering documents in several threads at once.
+"""
+import concurrent.futures
+import io
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+from lxml import etree
+from reportlab.lib import sequencer
+from reportlab.pdfbase import pdfmetrics
+
+import z3c.rml.tests
+from z3c.rml import document
+from z3c.rml import rlfix
+from z3c.rml.benchmark import workloads
+
+
+INPUT_DIR = os.path.join(os.path.dirname(z3c.rml.tests.__file__), 'input')
+ORIGINAL_GET_SEQUENCER = sequencer.getSequencer
+
+
+def render(path):
+    root = etree.parse(path).getroot()
+    root.set('invariant', '1')
+    output = io.BytesIO()
+    document.Document(root).process(output)
+    return output.getvalue()
+
+
+class FontRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = rlfix.FontRegistry('test', {'a': 1, 'b': 2})
+
+    def test_shared(self):
+        self.registry['c'] = 3
+        self.assertEqual(self.registry.shared, {'a': 1, 'b': 2, 'c': 3})
+
+    def test_layer(self):
+        token = self.registry.push()
+        self.registry['a'] = 10
+        self.registry['c'] = 3
+        del self.registry['b']
+        self.assertEqual(self.registry.copy(), {'a': 10, 'c': 3})
+        self.assertNotIn('b', self.registry)
+        self.assertRaises(KeyError, self.registry.__getitem__, 'b')
+        self.registry.layer.reset(token)
+        self.assertEqual(self.registry.copy(), {'a': 1, 'b': 2})
+
+    def test_clear(self):
+        token = self.registry.push()
+        self.registry['c'] = 3
+        self.registry.clear()
+        self.assertEqual(len(self.registry), 0)
+        self.registry.layer.reset(token)
+        self.assertEqual(len(self.registry), 2)
+
+    def test_document(self):
+        # The document registers ZapfDingbats with the standard encoding,
+        # which is not seen outside of the document.
+        render(os.path.join(INPUT_DIR, 'symbols-set.rml'))
+        self.assertEqual(
+            pdfmetrics.getFont('ZapfDingbats').encName,
+            'ZapfDingbatsEncoding')
+
+    def test_installed(self):
+        # The globals of ReportLab are only replaced while rendering.
+        self.assertIsInstance(pdfmetrics._fonts, dict)
+        self.assertIs(sequencer.getSequencer, ORIGINAL_GET_SEQUENCER)
+        tokens = rlfix.beginRendering({}, 0)
+        try:
+            self.assertIsInstance(pdfmetrics._fonts, rlfix.FontRegistry)
+            self.assertIs(sequencer.getSequencer, rlfix.getSequencer)
+        finally:
+            rlfix.endRendering(tokens)
+        self.assertIsInstance(pdfmetrics._fonts, dict)
+        self.assertIs(sequencer.getSequencer, ORIGINAL_GET_SEQUENCER)
+
+
+class ConcurrentRenderingTest(unittest.TestCase):
+
+    # Documents that change the global state of ReportLab.
+    documents = (
+        'symbols-set.rml',
+        'rml-examples-002-paras.rml',
+        'rml-examples-031-japanese.rml',
+        'rml-examples-045-cmyk.rml',
+        'tag-barChart.rml',
+        'tag-registerTTFont.rml',
+    )
+    rounds = 4
+    threads = 4
+    # The share of the documents that must render on their own.
+    minRendered = 1.0
+
+    def setUp(self):
+        import z3c.rml.tests.module
+        sys.modules['module'] = z3c.rml.tests.module
+        sys.modules['mymodule'] = z3c.rml.tests.module
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        del sys.modules['module']
+        del sys.modules['mymodule']
+        logging.disable(logging.NOTSET)
+
+    def getDocuments(self):
+        return [os.path.join(INPUT_DIR, filename)
+                for filename in self.documents]
+
+    def test_render(self):
+        expected = {}
+        failures = []
+        paths = self.getDocuments()
+        for path in paths:
+            try:
+                expected[path] = render(path)
+            except Exception as err:
+                # Some documents need tools that are not installed.
+                failures.append('%s: %s' % (os.path.basename(path), err))
+        self.assertGreaterEqual(
+            len(expected), len(paths) * self.minRendered,
+            'Too many documents failed to render:\n' + '\n'.join(failures))
+        paths = list(expected) * self.rounds
+        random.Random(0).shuffle(paths)
+        with concurrent.futures.ThreadPoolExecutor(self.threads) as pool:
+            for path, output in zip(paths, pool.map(render, paths)):
+                self.assertEqual(
+                    output, expected[path],
+                    '%s differs' % os.path.basename(path))
+
+
+class ConcurrentCorpusTest(ConcurrentRenderingTest):
+    """Render the entire corpus concurrently."""
+
+    level = 2
+    rounds = 2
+    threads = 8
+    # Images and SVGs need Ghostscript and Cairo.
+    minRendered = 0.9
+
+    def getDocuments(self):
+        return [os.path.join(INPUT_DIR, filename)
+                for filename in sorted(os.listdir(INPUT_DIR))
+                if filename.endswith('.rml')]
+
+
+class ConcurrentWorkloadTest(ConcurrentRenderingTest):
+    """Render synthetic workloads of every kind concurrently."""
+
+    rounds = 2
+    size = 10
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp('z3c.rml-workloads')
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def getDocuments(self):
+        return [workloads.write(kind, self.size, self.tmpdir)
+                for kind in sorted(workloads.WORKLOADS)]
@@ -48,6 +48,134 @@ def test_abort_on_invalid_tag():
     """
 
 
+def test_getAttributeValues():
+    """
+
+    The signature of a directive is compiled into a table of fields once:
+
+      >>> from lxml import etree
+      >>> from z3c.rml import attr, directive, interfaces
+
+      >>> class ISample(interfaces.IRMLDirectiveSignature):
+      ...     name = attr.Text(required=True)
+      ...     size = attr.Integer(required=False, default=10)
+      ...     color = attr.Text(required=False)
+      ...     width = attr.deprecated(
+      ...         'wide', attr.Integer(required=False), 'Use width.')
+
+      >>> class Sample(directive.RMLDirective):
+      ...     signature = ISample
+
+      >>> compiled = directive.compileSignature(ISample)
+      >>> compiled is directive.compileSignature(ISample)
+      True
+      >>> [field.name for field in compiled.fields]
+      ['name', 'size', 'color', 'width']
+
+    Missing attributes use the default and required ones raise an error:
+
+      >>> sample = Sample(etree.fromstring('<sample name="x"/>'), None)
+      >>> sample.getAttributeValues()
+      [('name', 'x'), ('size', 10)]
+      >>> sample.getAttributeValues(includeMissing=True)
+      [('name', 'x'), ('size', 10), ('color', <object ...>),
+       ('width', <object ...>)]
+
+      >>> class Root:
+      ...     parent = None
+      ...     filename = 'sample.rml'
+      >>> Sample(etree.fromstring('<sample/>'), Root()).getAttributeValues()
+      Traceback (most recent call last):
+      ...
+      ValueError: No value for required attribute "name" in directive
+      "sample" (file sample.rml, line 1).
+
+    Selected attributes are returned in the order of the selection:
+
+      >>> sample = Sample(
+      ...     etree.fromstring('<sample name="x" color="red" size="2"/>'),
+      ...     None)
+      >>> sample.getAttributeValues(select=('color', 'name'))
+      [('color', 'red'), ('name', 'x')]
+      >>> sample.getAttributeValues(ignore=('name',), valuesOnly=True)
+      [2, 'red']
+
+    Deprecated attribute names are still supported:
+
+      >>> sample = Sample(etree.fromstring('<sample name="x" wide="3"/>'),
+      ...                 Root())
+      >>> sample.getAttributeValues(select=('width',))
+      [('width', 3)]
+
+    The fields are not bound again for every directive; only the context of
+    the field bound by the first call is set and reset afterwards:
+
+      >>> field = ISample['size']
+      >>> sample = Sample(etree.fromstring('<sample name="x" size="2"/>'),
+      ...                 None)
+      >>> sample.getAttributeValues(select=('size',))
+      [('size', 2)]
+      >>> bound = compiled.byName['size'].bound.field
+      >>> bound is not field and bound.context is None
+      True
+      >>> from unittest import mock
+      >>> with mock.patch.object(type(field), 'bind') as bind:
+      ...     Sample(etree.fromstring('<sample name="x" size="3"/>'),
+      ...            None).getAttributeValues(select=('size',))
+      [('size', 3)]
+      >>> bind.called
+      False
+    """
+
+
+def test_managers():
+    """
+
+    Directives remember their closest managers when they are created:
+
+      >>> from lxml import etree
+      >>> from z3c.rml import attr, document, interfaces, template
+
+      >>> root = etree.fromstring(
+      ...     '<document><template><pageTemplate><pageGraphics/>'
+      ...     '</pageTemplate></template></document>')
+      >>> doc = document.Document(root)
+      >>> tmpl = template.Template(root[0], doc)
+      >>> pt = template.PageTemplate(root[0][0], tmpl)
+      >>> graphics = template.PageGraphics(root[0][0][0], pt)
+
+      >>> attr.getManager(tmpl) is doc
+      True
+      >>> attr.getManager(pt, interfaces.IPostProcessorManager) is doc
+      True
+      >>> attr.getManager(graphics, interfaces.ICanvasManager) is graphics
+      True
+      >>> attr.getManager(graphics) is doc
+      True
+
+    Other interfaces, i.e. of plugins, are still found by walking up the
+    tree:
+
+      >>> import zope.interface
+      >>> from z3c.rml import directive
+      >>> class IPluginManager(zope.interface.Interface):
+      ...     pass
+      >>> @zope.interface.implementer(IPluginManager)
+      ... class Plugin(directive.RMLDirective):
+      ...     pass
+      >>> plugin = Plugin(root[0], doc)
+      >>> child = template.PageTemplate(root[0][0], plugin)
+      >>> attr.getManager(child, IPluginManager) is plugin
+      True
+      >>> attr.getManager(child) is doc
+      True
+      >>> attr.getManager(graphics, interfaces.IRMLDirectiveSignature)
+      Traceback (most recent call last):
+      ...
+      ValueError: The manager could not be found.
+    """
+
+
 def test_suite():
     return doctest.DocTestSuite(
         optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS)
@@ -0,0 +1,383 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the block table processing.
+"""
+import decimal
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import pikepdf
+from lxml import etree
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfgen import canvas
+from reportlab.platypus.tables import TableStyle
+
+from z3c.rml import attr
+from z3c.rml import document
+from z3c.rml import flowable
+from z3c.rml import paraparser
+from z3c.rml import platypus
+from z3c.rml import stylesheet
+from z3c.rml.benchmark import scaling
+from z3c.rml.benchmark import tables
+
+
+ACTIONS = flowable.BlockTable.cellActions
+
+
+class CoalesceCellCommandsTest(unittest.TestCase):
+
+    def test_cellRectangles(self):
+        cells = [(0, 0), (0, 1), (1, 0), (1, 1), (2, 1), (2, 3), (3, 3)]
+        self.assertEqual(
+            sorted(flowable._cellRectangles(cells)),
+            [((0, 0), (1, 1)), ((1, 2), (1, 2)), ((3, 2), (3, 3))])
+
+    def test_merge(self):
+        commands = [
+            ('FONTNAME', [col, row], [col, row], 'Courier')
+            for row in range(3) for col in range(2)]
+        self.assertEqual(
+            flowable.coalesceCellCommands(commands, ACTIONS),
+            [('FONTNAME', [0, 0], [1, 2], 'Courier')])
+
+    def test_order(self):
+        commands = [
+            ('LINEBEFORE', [1, 0], [1, 0], 1, 'red'),
+            ('LINEAFTER', [0, 0], [0, 0], 1, 'blue'),
+            ('BACKGROUND', [0, 0], [0, 0], 'pink'),
+        ]
+        self.assertEqual(
+            [cmd[0] for cmd in flowable.coalesceCellCommands(
+                commands, ACTIONS)],
+            ['BACKGROUND', 'LINEAFTER', 'LINEBEFORE'])
+
+    def test_boundaries(self):
+        commands = [
+            ('BACKGROUND', [0, 0], [0, 0], 'pink'),
+            ('BACKGROUND', [0, 0], [-1, -1], 'white'),
+            ('BACKGROUND', [1, 0], [1, 0], 'pink'),
+            ('BACKGROUND', [1, 0], [1, 0], 'red'),
+            ('BACKGROUND', [2, 0], [2, 0], 'pink'),
+        ]
+        # Ranges and repeated cells keep the commands in order.
+        self.assertEqual(
+            flowable.coalesceCellCommands(commands, ACTIONS), commands)
+
+    def test_benchmark(self):
+        rml = tables.tableRML(10, 3)
+        self.assertEqual(tables.measure(rml, False)[0], 90)
+        self.assertEqual(tables.measure(rml, True)[0], 13)
+
+    def test_benchmark_restoresFlag(self):
+        flowable.BlockTable.coalesceCellStyles = False
+        try:
+            tables.measure(tables.tableRML(2, 2), True)
+            self.assertFalse(flowable.BlockTable.coalesceCellStyles)
+        finally:
+            flowable.BlockTable.coalesceCellStyles = True
+
+
+def drawnOutput(rml):
+    """Return the red horizontal lines and the texts drawn on every page."""
+    output = io.BytesIO()
+    document.Document(etree.fromstring(rml)).process(output)
+    pages = []
+    with pikepdf.open(output) as pdf:
+        for page in pdf.pages:
+            lines, texts, color, path = 0, [], None, []
+            for operands, operator in pikepdf.parse_content_stream(page):
+                operator = str(operator)
+                if operator == 'RG':
+                    color = tuple(float(value) for value in operands)
+                elif operator == 'Tj':
+                    texts.append(bytes(operands[0]))
+                elif operator in ('m', 'l'):
+                    path.append(float(operands[1]))
+                elif operator == 'S':
+                    if color == (1, 0, 0) and len(set(path)) == 1:
+                        lines += 1
+                    path = []
+            pages.append((lines, sorted(texts)))
+    return pages
+
+
+class ChunkedTableTest(unittest.TestCase):
+
+    def getTable(self, rows, commands, chunkRows=10, repeatRows=1):
+        table = platypus.ChunkedTable(
+            [['r%i' % row, row] for row in range(rows)],
+            TableStyle(commands), chunkRows, repeatRows=repeatRows)
+        table.canv = canvas.Canvas(None)
+        return table
+
+    def test_getCommands(self):
+        table = self.getTable(100, [
+            ('GRID', (0, 0), (-1, -1), 0.5, 'grey'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 25), (-1, 26), 'pink'),
+            ('BACKGROUND', (0, 60), (-1, 60), 'red'),
+            ('LINEBELOW', (0, 'splitlast'), (-1, 'splitlast'), 1, 'blue'),
+        ])
+        # The chunk of rows 21 to 30 follows the header in rows 1 to 10.
+        self.assertEqual(table.getCommands(21, 31, 1), [
+            ('GRID', (0, 0), (-1, 10), 0.5, 'grey'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 5), (-1, 6), 'pink'),
+            ('LINEBELOW', (0, 'splitlast'), (-1, 'splitlast'), 1, 'blue'),
+        ])
+        # Without the header, the chunk starts in the first row.
+        self.assertEqual(table.getCommands(55, 65, 0), [
+            ('GRID', (0, 0), (-1, 9), 0.5, 'grey'),
+            ('BACKGROUND', (0, 5), (-1, 5), 'red'),
+            ('LINEBELOW', (0, 'splitlast'), (-1, 'splitlast'), 1, 'blue'),
+        ])
+
+    def test_getCommands_rowBackgrounds(self):
+        table = self.getTable(100, [
+            ('ROWBACKGROUNDS', (0, 0), (-1, -1), ['white', 'grey', 'red']),
+        ])
+        # The header and the chunk are coloured separately, continuing the
+        # colours of the previous rows.
+        self.assertEqual(table.getCommands(11, 21, 1), [
+            ('ROWBACKGROUNDS', (0, 0), (-1, 0), ['white', 'grey', 'red']),
+            ('ROWBACKGROUNDS', (0, 1), (-1, 10), ['red', 'white', 'grey']),
+        ])
+
+    def test_split(self):
+        table = self.getTable(100, [('GRID', (0, 0), (-1, -1), 0.5, 'grey')])
+        # The table of the page grows until it fills the available height.
+        width, height = table.wrap(400, 1000)
+        self.assertGreater(height, 1000)
+        self.assertEqual(len(table.getTable(400, 1000)._cellvalues), 81)
+        first, rest = table.split(400, 1000)
+        self.assertEqual(len(first._cellvalues), 55)
+        self.assertEqual(rest.start, 55)
+        # The next page repeats the header.
+        first, rest = rest.split(400, 5 * 18)
+        self.assertEqual(
+            [row[0] for row in first._cellvalues],
+            ['r0', 'r55', 'r56', 'r57', 'r58'])
+        self.assertEqual(rest.start, 59)
+        # A frame without room for a row is skipped.
+        self.assertEqual(rest.split(400, 10), [])
+        first, rest = rest.split(400, 3 * 18)
+        self.assertEqual(
+            [row[0] for row in first._cellvalues], ['r0', 'r59', 'r60'])
+        # The remaining rows are laid out like a table.
+        self.assertEqual(rest.wrap(400, 1000)[1], 40 * 18)
+        self.assertEqual(rest.split(400, 1000), [rest.getTable(400, 1000)])
+
+    def test_wrap(self):
+        # The real height is reported, e.g. to keep the table together.
+        table = self.getTable(100, [])
+        self.assertEqual(table.wrap(400, 0x7fffffff)[1], 100 * 18)
+
+    def test_spans(self):
+        table = self.getTable(100, [
+            ('SPAN', (0, 8), (0, 12)), ('SPAN', (1, 12), (1, 14))])
+        # Chunks are extended past the spans crossing their end.
+        self.assertEqual(table.chunkEnd(9), 15)
+        self.assertEqual(table.chunkEnd(15), 15)
+        self.assertEqual(table.chunkEnd(200), 100)
+        self.assertEqual(len(table.getTable(400, 18)._cellvalues), 15)
+
+    def test_colWidths(self):
+        table = self.getTable(30, [], chunkRows=10)
+        table.rows[5][0] = 'a much wider cell'
+        table.rows[25][0] = 'an even much wider cell'
+        sample = table.makeTable(1, 11, None)
+        sample.wrap(400, 1000)
+        # The widths are taken from the header and the first chunk.
+        table.wrap(400, 1000)
+        self.assertEqual(
+            table.getTable(400, 1000)._colWidths, sample._colWidths)
+
+    def test_drawn(self):
+        # Boxes and spans are drawn like the ones of a split table.
+        rows = ''.join(
+            '<tr><td>r%i</td><td>%i</td></tr>' % (row, row)
+            for row in range(120))
+        rml = (
+            '<document filename="test.pdf" invariant="1"><template>'
+            '<pageTemplate id="main"><frame id="first" x1="36" y1="36" '
+            'width="523" height="770"/></pageTemplate></template>'
+            '<stylesheet><blockTableStyle id="box">'
+            '<lineStyle kind="BOX" colorName="red" thickness="2" '
+            'start="0,0" stop="-1,-1"/>'
+            '<blockSpan start="0,20" stop="0,24"/>'
+            '<blockSpan start="0,40" stop="0,47"/>'
+            '</blockTableStyle></stylesheet><story><para>Before</para>'
+            '<blockTable style="box" repeatRows="1" colWidths="100 100" %s>'
+            '%s</blockTable><para>After</para></story></document>')
+        expected = drawnOutput(rml % ('', rows))
+        self.assertEqual(len(expected), 3)
+        for chunkRows in (5, 21, 200):
+            self.assertEqual(
+                drawnOutput(rml % ('chunkRows="%i"' % chunkRows, rows)),
+                expected)
+
+    def test_document(self):
+        rows = scaling.tableRML(200, 'chunkRows', 50)
+        self.assertEqual(
+            scaling.measure(rows)[0],
+            scaling.measure(scaling.tableRML(200, 'table'))[0])
+
+
+class ParagraphCacheTest(unittest.TestCase):
+
+    def render(self, story):
+        root = etree.fromstring(
+            '<document filename="test.pdf"><template><pageTemplate id="main">'
+            '<frame id="first" x1="36" y1="36" width="523" height="770"/>'
+            '</pageTemplate></template><story>%s</story></document>' % story)
+        doc = document.Document(root)
+        doc.process(io.BytesIO())
+        return doc.getParagraphCacheStats()
+
+    def test_hits(self):
+        stats = self.render(
+            '<para>Total</para><para>Total</para><para>Sum</para>'
+            '<para>Total</para>')
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+        self.assertEqual(stats['hitRate'], 50)
+
+    def test_overlay(self):
+        stats = self.render(
+            '<para fontSize="8">Total</para><para fontSize="8">Total</para>'
+            '<para fontSize="9">Total</para>')
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_uncacheable(self):
+        stats = self.render(
+            '<para><seq/></para><para><seq/></para>'
+            '<para><pageNumber/></para><para><pageNumber/></para>')
+        self.assertEqual((stats['hits'], stats['misses']), (0, 4))
+
+    def test_styleKey(self):
+        base = ParagraphStyle('base')
+        self.assertEqual(
+            paraparser.styleKey(stylesheet.StyleOverlay(base, fontSize=8)),
+            paraparser.styleKey(stylesheet.StyleOverlay(base, fontSize=8)))
+        self.assertNotEqual(
+            paraparser.styleKey(stylesheet.StyleOverlay(base, fontSize=8)),
+            paraparser.styleKey(stylesheet.StyleOverlay(base, fontSize=9)))
+        self.assertNotEqual(
+            paraparser.styleKey(base),
+            paraparser.styleKey(ParagraphStyle('base')))
+
+
+class ParagraphElementTest(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = document.Document(etree.fromstring('<document/>'))
+        self.doc.styles['marked'] = paraparser.SpanStyle(
+            'marked', underline=1, strike=1, fontSize=12)
+        self.style = ParagraphStyle('test')
+
+    def getFrags(self, content, fromElement=True):
+        element = etree.fromstring('<para>%s</para>' % content)
+        if fromElement:
+            para = paraparser.Z3CParagraph(
+                None, self.style, manager=self.doc, element=element)
+        else:
+            para = paraparser.Z3CParagraph(
+                attr.getXMLContent(element), self.style, manager=self.doc)
+        return [sorted((name, repr(value)) for name, value in vars(f).items())
+                for f in para.frags]
+
+    def assertSameFrags(self, content):
+        frags = self.getFrags(content)
+        self.assertTrue(frags)
+        self.assertEqual(frags, self.getFrags(content, False))
+
+    def test_text(self):
+        self.assertSameFrags('\n  Fish &amp; chips\n\t are &lt;b&gt;  good ')
+
+    def test_markup(self):
+        self.assertSameFrags(
+            '<!-- note --> <b>bold</b> <i> italic </i>\n'
+            '<font color="red" size="12">red</font><br/>last<u>  </u>')
+
+    def test_span(self):
+        self.assertSameFrags('<span style="marked">marked</span> text')
+
+    def test_dynamic(self):
+        self.assertSameFrags(
+            'Page <pageNumber/> of <getName id="last" default="0"/>'
+            '<evalString>1 &lt; <getName id="last"/></evalString>')
+
+    def test_fallback(self):
+        parser = paraparser.Z3CParagraphParser(self.doc)
+        for content in ('<para fontSize="20">big</para>',
+                        '<b xmlns:x="urn:x" x:y="1">bold</b>'):
+            element = etree.fromstring('<para>%s</para>' % content)
+            self.assertIsNone(parser.parseElement(element, self.style))
+            self.assertSameFrags(content)
+
+
+class TableBulkDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def getRows(self, bulkData):
+        root = etree.fromstring(
+            '<document><story><blockTable>%s</blockTable></story>'
+            '</document>' % bulkData)
+        doc = document.Document(root)
+        table = flowable.BlockTable(root[0][0], doc)
+        directive = flowable.TableBulkData(root[0][0][0], table)
+        directive.process()
+        return table.rows
+
+    def test_content(self):
+        self.assertEqual(
+            self.getRows(
+                '<bulkData headerRows="1" columnTypes="str int">'
+                'Product,Units\nWidgets, 34\n</bulkData>'),
+            [['Product', 'Units'], ['Widgets', 34]])
+
+    def test_src(self):
+        path = os.path.join(self.tmpdir, 'ledger.tsv')
+        with open(path, 'w') as file:
+            file.write('Account\tAmount\n"Cash, petty"\t1.50\n\nBank\t\n')
+        self.assertEqual(
+            self.getRows(
+                '<bulkData src="%s" headerRows="1" columnTypes="str decimal"'
+                '/>' % path),
+            [['Account', 'Amount'],
+             ['Cash, petty', decimal.Decimal('1.50')],
+             ['Bank', '']])
+
+    def test_src_fieldDelim(self):
+        path = os.path.join(self.tmpdir, 'ledger.txt')
+        with open(path, 'w') as file:
+            file.write('a;b\n1;2\n')
+        self.assertEqual(
+            self.getRows(
+                '<bulkData src="%s" fieldDelim=";" headerRows="1" '
+                'columnTypes="int float"/>' % path),
+            [['a', 'b'], [1, 2.0]])
+
+    def test_invalid_value(self):
+        self.assertRaises(
+            ValueError, self.getRows,
+            '<bulkData columnTypes="int">one\n</bulkData>')
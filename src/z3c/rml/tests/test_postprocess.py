@@ -0,0 +1,250 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the post-processing pipeline.
+"""
+import io
+import os
+import unittest
+from unittest import mock
+
+import pikepdf
+import zope.interface
+
+from z3c.rml import interfaces
+from z3c.rml import postprocess
+from z3c.rml import rml2pdf
+from z3c.rml.benchmark import workloads
+from z3c.rml.page import mergePage
+
+
+INCLUDE_PDF = os.path.join(
+    os.path.dirname(__file__), 'input', 'data', 'include2.pdf')
+
+RML = '''\
+<!DOCTYPE document SYSTEM "rml.dtd">
+<document filename="test.pdf" invariant="1">
+  <template>
+    <pageTemplate id="main">
+      <mergePage filename="%s" page="0"/>
+      <frame id="first" x1="36" y1="36" width="523" height="770"/>
+    </pageTemplate>
+  </template>
+  <story>
+    <para>Before</para>
+    <includePdfPages filename="%s"/>
+    <para>After</para>
+  </story>
+</document>
+''' % (workloads.MERGE_PDF, workloads.INCLUDE_PDF)
+
+
+@zope.interface.implementer(interfaces.IPdfPostProcessor)
+class PdfProcessor:
+
+    def __init__(self, log):
+        self.log = log
+
+    def processPdf(self, pdf, sources):
+        self.log.append(pdf)
+        pdf.pages.append(pdf.pages[0])
+
+
+@zope.interface.implementer(interfaces.IPostProcessor)
+class FileProcessor:
+
+    def __init__(self, log):
+        self.log = log
+
+    def process(self, inputFile):
+        self.log.append(inputFile)
+        return io.BytesIO(inputFile.read())
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.input = rml2pdf.parseString(workloads.story(1))
+
+    def pages(self, outputFile):
+        with pikepdf.open(outputFile) as pdf:
+            return len(pdf.pages)
+
+    def test_sharedPdf(self):
+        log = []
+        pipeline = postprocess.Pipeline([
+            ('FIRST', PdfProcessor(log)),
+            ('SECOND', PdfProcessor(log)),
+            ('FILE', FileProcessor(log)),
+            ('THIRD', PdfProcessor(log)),
+        ])
+        with mock.patch.object(
+                pikepdf, 'open', wraps=pikepdf.open) as pdfOpen:
+            output = pipeline.process(self.input)
+        # The PDF is opened again only after the file based processor.
+        self.assertEqual(pdfOpen.call_count, 2)
+        self.assertIs(log[0], log[1])
+        self.assertIsInstance(log[2], io.BytesIO)
+        self.assertIsNot(log[3], log[0])
+        self.assertEqual(self.pages(output), 5)
+
+    def test_phase(self):
+        phases = []
+
+        def phase(name):
+            phases.append(name)
+            return mock.MagicMock()
+
+        pipeline = postprocess.Pipeline(
+            [('FIRST', PdfProcessor([]))], phase=phase)
+        pipeline.process(self.input)
+        self.assertEqual(phases, ['FIRST', 'save'])
+
+    def test_saveOptions(self):
+        with pikepdf.open(self.input) as pdf:
+            plain = postprocess.savePdf(pdf, 'disable').getvalue()
+            packed = postprocess.savePdf(pdf, 'generate').getvalue()
+            uncompressed = postprocess.savePdf(
+                pdf, compress=False).getvalue()
+            self.assertRaises(
+                ValueError, postprocess.savePdf, pdf, 'compact')
+        self.assertNotIn(b'/ObjStm', plain)
+        self.assertIn(b'/ObjStm', packed)
+        self.assertLess(len(packed), len(plain))
+        self.assertGreater(len(uncompressed), len(plain))
+
+    def test_document(self):
+        # Including and merging pages saves the PDF once.
+        with mock.patch.object(
+                postprocess, 'savePdf', wraps=postprocess.savePdf) as save:
+            output = rml2pdf.parseString(RML)
+        self.assertEqual(save.call_count, 1)
+        with pikepdf.open(output) as pdf:
+            self.assertEqual(len(pdf.pages), 4)
+            for page in pdf.pages:
+                self.assertIn('/Fx0', page.Resources.XObject)
+
+    def test_documentOptions(self):
+        rml = RML.replace(
+            'invariant="1"', 'invariant="1" objectStreams="generate"')
+        self.assertIn(b'/ObjStm', rml2pdf.parseString(rml).getvalue())
+        self.assertNotIn(b'/ObjStm', rml2pdf.parseString(RML).getvalue())
+        rml = RML.replace(
+            'invariant="1"', 'invariant="1" compressStreams="false"')
+        self.assertGreater(len(rml2pdf.parseString(rml).getvalue()),
+                           len(rml2pdf.parseString(RML).getvalue()))
+
+    def test_documentId(self):
+        def deterministicId(rml):
+            with mock.patch.object(
+                    pikepdf.Pdf, 'save', autospec=True,
+                    side_effect=pikepdf.Pdf.save) as save:
+                rml2pdf.parseString(rml)
+            return save.call_args[1]['deterministic_id']
+
+        # Only the ID of invariant documents is computed from the content;
+        # the others keep a random ID.
+        self.assertTrue(deterministicId(RML))
+        self.assertFalse(deterministicId(RML.replace(' invariant="1"', '')))
+
+    def test_error(self):
+        @zope.interface.implementer(interfaces.IPdfPostProcessor)
+        class FailingProcessor:
+            def processPdf(self, pdf, sources):
+                raise ValueError('Broken')
+
+        pipeline = postprocess.Pipeline([('FAIL', FailingProcessor())])
+        with mock.patch.object(
+                pikepdf.Pdf, 'close', autospec=True) as close:
+            self.assertRaises(ValueError, pipeline.process, self.input)
+        self.assertEqual(close.call_count, 1)
+
+
+class SourcePdfsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = pikepdf.new()
+        self.sources = postprocess.SourcePdfs(self.pdf)
+        with open(INCLUDE_PDF, 'rb') as pdfFile:
+            self.data = pdfFile.read()
+
+    def test_open(self):
+        source = self.sources.open(io.BytesIO(self.data))
+        self.assertIs(self.sources.open(io.BytesIO(self.data)), source)
+        self.assertEqual(len(source.pages), 3)
+
+    def test_copyForeign(self):
+        copy = self.sources.copyForeign(
+            io.BytesIO(self.data), ('page', 1),
+            lambda source: source.pages[1].obj)
+        self.assertEqual(copy.Type, '/Page')
+        self.assertEqual(
+            self.sources.copyForeign(
+                io.BytesIO(self.data), ('page', 1),
+                lambda source: None).objgen,
+            copy.objgen)
+
+    def test_includePdfPages(self):
+        # The pages included several times share their contents.
+        rml = workloads.includePdfPages(3).replace(
+            '.pdf"/>', '.pdf" pages="1-3"/>')
+        with mock.patch.object(
+                pikepdf, 'open', wraps=pikepdf.open) as pdfOpen:
+            output = rml2pdf.parseString(rml)
+        # The output of ReportLab and the included file.
+        self.assertEqual(pdfOpen.call_count, 2)
+        with pikepdf.open(output) as pdf:
+            contents = [page.obj.Contents.objgen for page in pdf.pages]
+        self.assertEqual(len(contents), 10)
+        self.assertEqual(contents[1:4], contents[4:7])
+
+    def test_mergePage(self):
+        with mock.patch.object(
+                pikepdf, 'open', wraps=pikepdf.open) as pdfOpen:
+            output = rml2pdf.parseString(workloads.mergePage(5))
+        self.assertEqual(pdfOpen.call_count, 2)
+        with pikepdf.open(output) as pdf:
+            forms = {page.Resources.XObject.Fx0.objgen for page in pdf.pages}
+        self.assertEqual(len(forms), 1)
+
+    def test_includeAndMerge(self):
+        # A file that is both included and merged is opened once per run and
+        # closed after saving.
+        rml = RML.replace(workloads.MERGE_PDF, workloads.INCLUDE_PDF).replace(
+            '.pdf"/>', '.pdf" pages="1-3"/>')
+        with mock.patch.object(
+                pikepdf, 'open', wraps=pikepdf.open) as pdfOpen, \
+                mock.patch.object(
+                    postprocess.SourcePdfs, 'close', autospec=True,
+                    side_effect=postprocess.SourcePdfs.close) as close:
+            output = rml2pdf.parseString(rml)
+        self.assertEqual(pdfOpen.call_count, 2)
+        self.assertEqual(close.call_count, 1)
+        with pikepdf.open(output) as pdf:
+            self.assertEqual(len(pdf.pages), 4)
+
+    def test_mergePage_sharedResources(self):
+        source = self.sources.open(io.BytesIO(self.data))
+        self.pdf.add_blank_page()
+        self.pdf.add_blank_page()
+        resources = self.pdf.make_indirect(pikepdf.Dictionary())
+        for number, page in enumerate(self.pdf.pages):
+            page.Resources = resources
+            form = self.sources.copyForeign(
+                io.BytesIO(self.data), number,
+                lambda source: source.pages[number].as_form_xobject())
+            mergePage(
+                source.pages[number], page, self.pdf, '/Fx0', form)
+        first, second = self.pdf.pages
+        self.assertNotEqual(first.Resources.XObject.Fx0.objgen,
+                            second.Resources.XObject.Fx0.objgen)
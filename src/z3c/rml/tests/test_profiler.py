@@ -0,0 +1,116 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the rendering profiler.
+"""
+import io
+import json
+import tracemalloc
+import unittest
+
+from lxml import etree
+
+from z3c.rml import document
+from z3c.rml import profiler
+
+
+DOCUMENT_RML = """
+  <!DOCTYPE document SYSTEM "rml_1_0.dtd">
+  <document filename="test.pdf" invariant="1">
+    <stylesheet>
+      <paraStyle name="big" fontSize="20" />
+    </stylesheet>
+    <template>
+      <pageTemplate id="main">
+        <frame id="first" x1="1in" y1="1in" width="7in" height="9in"/>
+      </pageTemplate>
+    </template>
+    <story>
+      <para style="big">Page <pageNumber/> of <getName id="pages"/></para>
+      %s
+      <namedString id="pages"><pageNumber/></namedString>
+    </story>
+  </document>
+""".strip()
+
+
+def render(memory=False, trace=False):
+    root = etree.fromstring(
+        DOCUMENT_RML % ('<para>Paragraph</para>' * 100))
+    doc = document.Document(root)
+    doc.profiler = profiler.Profiler(memory=memory, trace=trace)
+    doc.process(io.BytesIO())
+    return doc.profiler
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_directives(self):
+        prof = render()
+        self.assertEqual(prof.directives['para'].calls, 101)
+        self.assertEqual(prof.directives['paraStyle'].calls, 1)
+        story = prof.directives['story']
+        self.assertEqual(story.calls, 1)
+        self.assertGreater(story.total, story.own)
+        self.assertEqual(prof.lines[(3, 'stylesheet')].calls, 1)
+        self.assertEqual(
+            list(prof.phases), ['processing', 'layout', 'postProcessing'])
+
+    def test_layout(self):
+        prof = render()
+        # The page count is only known in the second pass.
+        self.assertEqual([number for number, time in prof.passes], [1, 2])
+        self.assertEqual(
+            [(number, page) for number, page, time in prof.pages],
+            [(1, 1), (1, 2), (2, 1), (2, 2)])
+
+    def test_memory(self):
+        prof = render(memory=True)
+        self.assertGreater(prof.directives['story'].memory, 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_report(self):
+        prof = render()
+        data = json.loads(prof.toJSON())
+        self.assertEqual(
+            sorted(data), ['directives', 'lines', 'pages', 'passes',
+                           'phases'])
+        own = [entry['own'] for entry in data['directives']]
+        self.assertEqual(own, sorted(own, reverse=True))
+        report = prof.report(limit=2)
+        self.assertIn('  pass 2  ', report)
+        self.assertEqual(report.count(', page '), 2)
+
+    def test_trace(self):
+        self.assertRaises(ValueError, render().asTrace)
+        prof = render(trace=True)
+        output = io.StringIO()
+        prof.writeTrace(output)
+        events = json.loads(output.getvalue())['traceEvents']
+        self.assertEqual(
+            [event['name'] for event in events
+             if event['cat'] in ('document', 'phase')],
+            ['document', 'processing', 'processing', 'layout',
+             'postProcessing'])
+        self.assertEqual(
+            [event['name'] for event in events if event['cat'] == 'layout'],
+            ['pass 1', 'page 1', 'page 2', 'pass 2', 'page 1', 'page 2'])
+        document = events[0]
+        for event in events:
+            self.assertEqual(event['ph'], 'X')
+            self.assertGreaterEqual(event['ts'], document['ts'])
+            self.assertLessEqual(
+                event['ts'] + event['dur'], document['ts'] + document['dur'])
+        stylesheet = [event for event in events
+                      if event['name'] == 'stylesheet']
+        self.assertEqual(stylesheet[0]['args'], {'line': 3})
@@ -16,7 +16,6 @@
 import base64
 import logging
 import os
-import subprocess
 import sys
 import tempfile
 import unittest
@@ -25,16 +24,20 @@ from PIL import Image
 from PIL import ImageChops
 
 import z3c.rml.tests
+from z3c.rml import compare
 from z3c.rml import rml2pdf
 
 
 LOG_FILE = os.path.join(os.path.dirname(__file__), 'render.log')
 
 
-def gs_command(path):
-    return ('gs', '-q', '-sNOPAUSE', '-sDEVICE=png256',
-            '-sOutputFile=%s[Page-%%d].png' % path[:-4],
-            path, '-c', 'quit')
+# The directory caching the rasterized expected files across test runs.
+# Without it, the rasters are kept in the output directory of the run.
+RASTER_CACHE_DIR = os.environ.get('Z3C_RML_RASTER_CACHE')
+
+# Rasterized expected files, keyed by their content; set up by test_suite().
+# Otherwise the rasters are kept next to the rendered file.
+RASTER_CACHE = None
 
 
 class RMLRenderingTestCase(unittest.TestCase):
@@ -78,17 +81,9 @@ class ComparePDFTestCase(unittest.TestCase):
         base_file = open(baseImage, 'rb')
         test_file = open(testImage, 'rb')
         base_image = Image.open(base_file)
-        base = base_image.getdata()
         test_image = Image.open(test_file)
-        test = test_image.getdata()
 
-        has_diff = True
-        for i in range(len(base)):
-            # Stop at first difference
-            if (base[i] - test[i]) != 0:
-                break
-        else:
-            has_diff = False
+        has_diff = compare.diffRatio(base_image, test_image) > 0
 
         if has_diff and 'SHOW_IMAGE_DIFF' in os.environ:
             test_image.show()
@@ -128,24 +123,17 @@ class ComparePDFTestCase(unittest.TestCase):
                 'Image is not the same: %s' % os.path.basename(baseImage))
 
     def runTest(self):
-        # Convert the base PDF to image(s)
-        status = subprocess.Popen(gs_command(self._basePath)).wait()
-        if status:
-            return
-        # Convert the test PDF to image(s)
-        status = subprocess.Popen(gs_command(self._testPath)).wait()
-        if status:
+        # Convert the PDFs to image(s); the expected ones are cached.
+        try:
+            cache = RASTER_CACHE or compare.RasterCache(os.path.join(
+                os.path.dirname(self._testPath), 'rasters'))
+            baseImages = compare.rasterize(self._basePath, cache)
+            testImages = compare.rasterize(self._testPath)
+        except compare.RasterizeError:
             return
         # Go through all pages and ensure their equality
-        n = 1
-        while True:
-            baseImage = self._basePath[:-4] + '[Page-%i].png' % n
-            testImage = self._testPath[:-4] + '[Page-%i].png' % n
-            if os.path.exists(baseImage) and os.path.exists(testImage):
-                self.assertSameImage(baseImage, testImage)
-            else:
-                break
-            n += 1
+        for baseImage, testImage in zip(baseImages, testImages):
+            self.assertSameImage(baseImage, testImage)
 
 
 class CompareFileTestCase(unittest.TestCase):
@@ -180,6 +168,9 @@ def test_suite():
     inputDir = os.path.join(here, 'input')
     outputDir = tempfile.mkdtemp('z3c.rml-output')
     print(f'output dir: {outputDir}')
+    global RASTER_CACHE
+    RASTER_CACHE = compare.RasterCache(
+        RASTER_CACHE_DIR or os.path.join(outputDir, 'rasters'))
     expectDir = os.path.join(here, 'expected')
     for filename in os.listdir(inputDir):
         if not filename.endswith(".rml"):
@@ -15,12 +15,55 @@
 """
 
 import io
+import json
+import os
+import shutil
+import sys
+import tempfile
 import unittest
 from unittest import mock
 
+import pikepdf
+from lxml import etree
+from reportlab.pdfbase import pdfmetrics
+
+from z3c.rml import document
+from z3c.rml import rlfix
 from z3c.rml import rml2pdf
 
 
+SIMPLE_RML = """
+  <?xml version="1.0" encoding="UTF-8" ?>
+  <!DOCTYPE document SYSTEM "rml_1_0.dtd">
+  <document filename="test.pdf" invariant="1">
+    <stylesheet>
+      <paraStyle name="big" fontSize="20" />
+    </stylesheet>
+    <template>
+      <pageTemplate id="main">
+        <frame id="first" x1="1in" y1="1in" width="7in" height="9in"/>
+      </pageTemplate>
+    </template>
+    <story><para style="big">Hello</para></story>
+  </document>
+""".strip()
+
+
+INCLUDE_RML = """
+  <document filename="test.pdf" invariant="1">
+    <template>
+      <pageTemplate id="main">
+        <frame id="first" x1="1in" y1="1in" width="7in" height="9in"/>
+      </pageTemplate>
+    </template>
+    <story>
+      <para>Before</para>
+      <includePdfPages filename="[z3c.rml.tests]/input/data/include2.pdf"/>
+    </story>
+  </document>
+"""
+
+
 class RML2PDFTest(unittest.TestCase):
 
     @mock.patch("z3c.rml.rml2pdf.go")
@@ -59,3 +102,199 @@ class RML2PDFTest(unittest.TestCase):
         """.strip()
         stream = rml2pdf.parseString(rml)
         self.assertEqual(stream.read()[:8], b"%PDF-1.4")
+
+    def test_parseString_useCache(self):
+        rml2pdf.documentCache.clear()
+        expected = rml2pdf.parseString(SIMPLE_RML).read()
+        first = rml2pdf.parseString(SIMPLE_RML, useCache=True).read()
+        second = rml2pdf.parseString(SIMPLE_RML, useCache=True).read()
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertEqual(rml2pdf.documentCache.stats()['hits'], 1)
+        self.assertEqual(rml2pdf.documentCache.stats()['misses'], 1)
+
+    def test_compileString(self):
+        rml2pdf.documentCache.clear()
+        compiled = rml2pdf.compileString(SIMPLE_RML)
+        self.assertIs(rml2pdf.compileString(SIMPLE_RML), compiled)
+        self.assertIn('big', compiled.document.styles)
+        output = io.BytesIO()
+        compiled.render(output)
+        self.assertEqual(output.getvalue()[:8], b"%PDF-1.4")
+
+    def test_compileString_renderError(self):
+        compiled = rml2pdf.compileString(SIMPLE_RML)
+        # A bad file descriptor fails before the rendering starts.
+        self.assertRaises(OSError, compiled.render, 9999)
+        self.assertEqual(rlfix._renderings, 0)
+        self.assertIsInstance(pdfmetrics._fonts, dict)
+
+    def test_process_streams_output(self):
+        doc = document.Document(etree.fromstring(SIMPLE_RML.split('\n', 1)[1]))
+        output = io.BytesIO()
+        doc.process(output)
+        # Without post-processors the PDF is written straight into the
+        # output file.
+        self.assertIs(doc.outputFile.outputFile, output)
+        self.assertIsNone(doc.outputFile.buffer)
+        self.assertEqual(output.getvalue()[:8], b"%PDF-1.4")
+
+    def test_process_unlistedPostProcessor(self):
+        # Post-processors of directives that are not listed are still run on
+        # the buffered PDF.
+        doc = document.Document(etree.fromstring(INCLUDE_RML))
+        doc.postProcessorDirectives = []
+        output = io.BytesIO()
+        doc.process(output)
+        self.assertIsNotNone(doc.outputFile.buffer)
+        with pikepdf.open(output) as pdf:
+            self.assertEqual(len(pdf.pages), 4)
+
+    def test_process_file_descriptor(self):
+        doc = document.Document(etree.fromstring(SIMPLE_RML.split('\n', 1)[1]))
+        fd, path = tempfile.mkstemp('.pdf')
+        try:
+            doc.process(fd)
+            os.close(fd)
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read()[:8], b"%PDF-1.4")
+        finally:
+            os.remove(path)
+
+
+PAGE_COUNT_RML = """
+  <document filename="test.pdf" invariant="1">
+    <template>
+      <pageTemplate id="main">
+        <pageGraphics>
+          <drawRightString
+            x="500" y="30">Page <pageNumber/> of <getName id="pages"
+            default="00"/></drawRightString>
+        </pageGraphics>
+        <frame id="first" x1="1in" y1="1in" width="7in" height="9in"/>
+      </pageTemplate>
+    </template>
+    <story>
+      <para>Total: <getName id="pages" default="0"/> pages</para>
+      <nextPage/>
+      <para>%s</para>
+      <namedString id="pages"><pageNumber/></namedString>
+    </story>
+  </document>
+"""
+
+
+class DeferredNamesTest(unittest.TestCase):
+
+    def render(self, rml, **kw):
+        doc = document.Document(etree.fromstring(rml))
+        output = io.BytesIO()
+        doc.process(output, **kw)
+        self.passes = doc.doc.current_pass
+        output.seek(0)
+        self.pdf = pikepdf.open(output)
+        return [page.Contents.read_bytes() for page in self.pdf.pages]
+
+    def test_deferred(self):
+        pages = self.render(PAGE_COUNT_RML % 'Last page', strategy='deferred')
+        self.assertEqual(self.passes, 1)
+        # Both references share a form per text style, which shows the
+        # final value.
+        self.assertIn(b'(Page 1 of ) Tj', pages[0])
+        self.assertIn(b'(Total: ) Tj', pages[0])
+        self.assertIn(b'(Page 2 of ) Tj', pages[1])
+        # The right aligned string reserves the width of the default "00".
+        self.assertIn(b'1 0 0 1 486.656 30 cm', pages[0])
+        forms = self.pdf.pages[0].Resources.XObject
+        self.assertEqual(len(forms), 2)
+        for name, form in forms.items():
+            self.assertIn(b'(2) Tj', form.read_bytes())
+            self.assertIn(name.encode('ascii') + b' Do', pages[1] + pages[0])
+
+    def test_passes(self):
+        pages = self.render(PAGE_COUNT_RML % 'Last page')
+        self.assertEqual(self.passes, 2)
+        self.assertIn(b'(Page 1 of 2) Tj', pages[0])
+        self.assertIn(b'(Total: 2 pages) Tj', pages[0])
+
+    def test_evaluated(self):
+        # Evaluated names need their values, so another pass is made.
+        pages = self.render(
+            PAGE_COUNT_RML % '<evalString><getName id="pages" default="0"/>'
+                             ' - 1</evalString> more',
+            strategy='deferred')
+        self.assertEqual(self.passes, 2)
+        self.assertIn(b'(1 more) Tj', pages[1])
+        self.assertIn(b'(Page 1 of 2) Tj', pages[0])
+
+    def test_unknown_strategy(self):
+        doc = document.Document(etree.fromstring(PAGE_COUNT_RML % ''))
+        self.assertRaises(ValueError, doc.process, io.BytesIO(), 3, 'guess')
+
+
+class RenderManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp('z3c.rml-many')
+        self.inputs = []
+        for name in ('one', 'two'):
+            path = os.path.join(self.tmpdir, name + '.rml')
+            with open(path, 'w') as file:
+                file.write(SIMPLE_RML)
+            self.inputs.append(path)
+        self.broken = os.path.join(self.tmpdir, 'broken.rml')
+        with open(self.broken, 'w') as file:
+            file.write('<document filename="x.pdf"><template/></document>')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_renderMany(self):
+        results = rml2pdf.renderMany(
+            self.inputs + [self.broken], workers=2)
+        self.assertEqual(
+            [os.path.basename(r.output) for r in results],
+            ['one.pdf', 'two.pdf', 'broken.pdf'])
+        self.assertIsNone(results[0].error)
+        self.assertIsNone(results[1].error)
+        self.assertIn('Traceback', results[2].error)
+        with open(results[0].output, 'rb') as file:
+            self.assertEqual(file.read()[:8], b"%PDF-1.4")
+
+    def test_renderMany_inProcess(self):
+        outDir = os.path.join(self.tmpdir, 'out')
+        os.mkdir(outDir)
+        results = rml2pdf.renderMany(
+            [(self.inputs[0], 'first.pdf')], workers=1, outDir=outDir)
+        self.assertEqual(results[0].output, os.path.join(outDir, 'first.pdf'))
+        self.assertTrue(os.path.exists(results[0].output))
+
+    def test_main_jobs(self):
+        argv = ['rml2pdf', '--jobs', '2'] + self.inputs
+        with mock.patch.object(sys, 'argv', argv):
+            self.assertEqual(rml2pdf.main(), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'two.pdf')))
+
+        argv = ['rml2pdf', '-j', '2', self.broken]
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch.object(sys, 'stderr', io.StringIO()) as stderr:
+            self.assertEqual(rml2pdf.main(), 1)
+        self.assertIn('Failed to render', stderr.getvalue())
+
+    def test_main_profile(self):
+        output = os.path.join(self.tmpdir, 'one.pdf')
+        profile = os.path.join(self.tmpdir, 'profile.json')
+        trace = os.path.join(self.tmpdir, 'trace.json')
+        argv = ['rml2pdf', self.inputs[0], output, '--profile',
+                '--profile-json', profile, '--profile-trace', trace]
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch.object(sys, 'stderr', io.StringIO()) as stderr:
+            rml2pdf.main()
+        self.assertIn('Directives', stderr.getvalue())
+        with open(profile) as file:
+            data = json.load(file)
+        self.assertEqual(data['passes'][0]['pass'], 1)
+        with open(trace) as file:
+            events = json.load(file)['traceEvents']
+        self.assertEqual(events[0]['name'], 'parse')
+        self.assertTrue(os.path.exists(output))
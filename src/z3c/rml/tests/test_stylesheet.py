@@ -0,0 +1,71 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Test the style overlays.
+"""
+import copy
+import unittest
+
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus.tables import TableStyle
+
+from z3c.rml import stylesheet
+
+
+class StyleOverlayTest(unittest.TestCase):
+
+    def test_overlay(self):
+        base = ParagraphStyle('base', fontSize=12)
+        style = stylesheet.StyleOverlay(base, alignment=TA_CENTER)
+        self.assertEqual(style.alignment, TA_CENTER)
+        self.assertEqual(style.fontSize, 12)
+        self.assertEqual(base.alignment, 0)
+        self.assertNotIn('fontSize', style.__dict__)
+
+    def test_deepcopy(self):
+        base = ParagraphStyle('base', fontSize=12)
+        style = copy.deepcopy(
+            stylesheet.StyleOverlay(base, alignment=TA_CENTER))
+        style.firstLineIndent = 10
+        self.assertEqual(style.alignment, TA_CENTER)
+        self.assertEqual(style.fontSize, 12)
+        self.assertEqual(base.firstLineIndent, 0)
+
+
+class TableStyleOverlayTest(unittest.TestCase):
+
+    def test_commands(self):
+        base = TableStyle([('FONT', (0, 0), (-1, -1), 'Courier')])
+        base.keepWithNext = True
+        style = stylesheet.TableStyleOverlay(base)
+        style.add('ALIGN', (0, 0), (-1, -1), 'RIGHT')
+        self.assertEqual(
+            list(style.getCommands()),
+            [('FONT', (0, 0), (-1, -1), 'Courier'),
+             ('ALIGN', (0, 0), (-1, -1), 'RIGHT')])
+        self.assertEqual(len(base.getCommands()), 1)
+        self.assertEqual(style.getCommands()[-1][0], 'ALIGN')
+        self.assertTrue(style.keepWithNext)
+        self.assertFalse(hasattr(style, 'spaceBefore'))
+
+    def test_nested(self):
+        base = TableStyle([('FONT', (0, 0), (-1, -1), 'Courier')])
+        style = stylesheet.TableStyleOverlay(base)
+        style.add('ALIGN', (0, 0), (-1, -1), 'RIGHT')
+        nested = stylesheet.TableStyleOverlay(style)
+        nested.add('VALIGN', (0, 0), (-1, -1), 'TOP')
+        self.assertEqual(
+            [cmd[0] for cmd in nested.getCommands()],
+            ['FONT', 'ALIGN', 'VALIGN'])
+        self.assertEqual(len(style.getCommands()), 2)
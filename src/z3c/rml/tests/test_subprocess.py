@@ -14,7 +14,10 @@
 """Testing all XML Locale functionality.
 """
 import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 import z3c.rml.tests
 from z3c.rml import rml2pdfscript
@@ -22,14 +25,116 @@ from z3c.rml.tests.test_rml import ComparePDFTestCase
 from z3c.rml.tests.test_rml import RMLRenderingTestCase
 
 
+SIMPLE_RML = """\
+<document filename="test.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1in" y1="1in" width="6in" height="9in"/>
+    </pageTemplate>
+  </template>
+  <story>%s</story>
+</document>
+"""
+
+
 class RMLRenderingTestCase(RMLRenderingTestCase):
 
     def runTest(self):
         rml2pdfscript.goSubProcess(self._inPath, self._outPath, True)
 
 
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = rml2pdfscript.WorkerPool(workers=1, maxTasksPerChild=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_parseString(self):
+        pdf = self.pool.parseString(SIMPLE_RML % '<para>Hello</para>')
+        self.assertEqual(pdf[:8], b'%PDF-1.4')
+
+    def test_go(self):
+        tmpdir = tempfile.mkdtemp('z3c.rml-pool')
+        try:
+            inPath = os.path.join(tmpdir, 'in.rml')
+            outPath = os.path.join(tmpdir, 'out.pdf')
+            with open(inPath, 'w') as file:
+                file.write(SIMPLE_RML % '<para>Hello</para>')
+            self.pool.go(inPath, outPath)
+            with open(outPath, 'rb') as file:
+                self.assertEqual(file.read()[:8], b'%PDF-1.4')
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_error(self):
+        pid = self.pool._idle[0].process.pid
+        with self.assertRaises(Exception) as cm:
+            self.pool.parseString('<document filename="x.pdf"><bad')
+        self.assertIn('Subprocess error', str(cm.exception))
+        # The worker survives errors in the document.
+        self.assertEqual(self.pool._idle[0].process.pid, pid)
+
+    def test_maxTasksPerChild(self):
+        pid = self.pool._idle[0].process.pid
+        self.pool.parseString(SIMPLE_RML % '<para>Hello</para>')
+        self.assertEqual(self.pool._idle[0].process.pid, pid)
+        self.pool.parseString(SIMPLE_RML % '<para>Hello</para>')
+        self.assertNotEqual(self.pool._idle[0].process.pid, pid)
+
+    def test_timeout(self):
+        story = '<para>Hello</para>' * 2000
+        pid = self.pool._idle[0].process.pid
+        with self.assertRaises(TimeoutError):
+            self.pool.parseString(SIMPLE_RML % story, timeout=0.001)
+        # The worker that timed out was replaced.
+        self.assertNotEqual(self.pool._idle[0].process.pid, pid)
+        pdf = self.pool.parseString(SIMPLE_RML % '<para>Hello</para>')
+        self.assertEqual(pdf[:8], b'%PDF-1.4')
+
+    def test_restartFailure(self):
+        story = '<para>Hello</para>' * 2000
+        with mock.patch.object(
+                self.pool, '_startWorker', side_effect=OSError('No fork')):
+            with self.assertRaises(TimeoutError):
+                self.pool.parseString(SIMPLE_RML % story, timeout=0.001)
+            # The killed worker is not used again; the slot is empty.
+            self.assertEqual(self.pool._idle, [None])
+            with self.assertRaises(OSError):
+                self.pool.parseString(SIMPLE_RML % '<para>Hello</para>')
+            self.assertEqual(self.pool._idle, [None])
+        pdf = self.pool.parseString(SIMPLE_RML % '<para>Hello</para>')
+        self.assertEqual(pdf[:8], b'%PDF-1.4')
+
+    def test_startFailure(self):
+        workers = []
+
+        def startWorker():
+            if workers:
+                raise OSError('No fork')
+            workers.append(mock.Mock())
+            return workers[-1]
+
+        with mock.patch.object(
+                rml2pdfscript.WorkerPool, '_startWorker',
+                side_effect=startWorker):
+            with self.assertRaises(OSError):
+                rml2pdfscript.WorkerPool(workers=3)
+        # The worker that was started is stopped again.
+        workers[0].stop.assert_called_once_with()
+
+    def test_context(self):
+        self.assertEqual(
+            self.pool.context.get_start_method(),
+            rml2pdfscript.START_METHOD)
+        self.assertNotEqual(rml2pdfscript.START_METHOD, 'fork')
+
+
 def test_suite():
     suite = unittest.TestSuite()
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(
+        WorkerPoolTest))
     if False:
         inputDir = os.path.join(
             os.path.dirname(